@@ -0,0 +1,79 @@
+#PURPOSE OF THIS FILE : compare main.decode against the old pd.DataFrame + pd.to_datetime decode path.
+#Run from the repo root: python -m benchmarks.bench_decode [--bars N]
+
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import main.decode
+
+
+def make_payload(bars, seed=0):
+    """Synthetic Upstox candle response, newest candle first like the real API."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01 09:15", periods=bars, freq="min", tz=main.decode.IST_OFFSET)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars))), 2)
+    candles = [
+        [ts.isoformat(), float(c), float(c) + 0.5, float(c) - 0.5, float(c), int(v), 0]
+        for ts, c, v in zip(index, close, rng.integers(100, 100000, bars))
+    ]
+    return json.dumps({"status": "success", "data": {"candles": candles[::-1]}}).encode()
+
+
+def legacy_decode(payload):
+    data = json.loads(payload)
+    candles = data.get("data", {}).get("candles", [])
+    df = pd.DataFrame(candles, columns=main.decode.CANDLE_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df.set_index("timestamp", inplace=True)
+    df.sort_index(inplace=True)
+    return df
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(bars=50000, repeat=5):
+    payload = make_payload(bars)
+    legacy_s, legacy = _best(lambda: legacy_decode(payload), repeat)
+    fast_s, fast = _best(lambda: main.decode.decode_candles(payload), repeat)
+    compact_s, compact = _best(lambda: main.decode.decode_candles(payload, compact=True), repeat)
+
+    assert (legacy.index == fast.index).all()
+    assert np.allclose(legacy[["open", "high", "low", "close"]], fast[["open", "high", "low", "close"]])
+
+    return {
+        "bars": bars,
+        "payload_bytes": len(payload),
+        "legacy_s": legacy_s,
+        "fast_s": fast_s,
+        "compact_s": compact_s,
+        "legacy_bytes": int(legacy.memory_usage(deep=True).sum()),
+        "fast_bytes": int(fast.memory_usage(deep=True).sum()),
+        "compact_bytes": int(compact.memory_usage(deep=True).sum()),
+        "json_parser": "orjson" if main.decode.orjson is not None else "json",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bars", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    r = run(args.bars, args.repeat)
+    print(f"{r['bars']} bars ({r['payload_bytes']} bytes, {r['json_parser']})")
+    print(f"legacy  {r['legacy_s'] * 1000:8.1f} ms  {r['legacy_bytes']:>10} bytes")
+    print(f"fast    {r['fast_s'] * 1000:8.1f} ms  {r['fast_bytes']:>10} bytes")
+    print(f"compact {r['compact_s'] * 1000:8.1f} ms  {r['compact_bytes']:>10} bytes")
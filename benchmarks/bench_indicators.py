@@ -0,0 +1,71 @@
+#PURPOSE OF THIS FILE : compare moving_average_panel against calling moving_average once per symbol.
+#Run from the repo root: python -m benchmarks.bench_indicators [--symbols N] [--bars T]
+
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import main.indicators
+
+
+def make_frames(symbols, bars, seed=0):
+    """Synthetic hourly candle frames with ragged start dates and a few missing candles."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2020-01-01 09:15", periods=bars, freq="h", tz="Asia/Kolkata")
+    frames = {}
+    for i in range(symbols):
+        start = int(rng.integers(0, bars // 4))
+        keep = rng.random(bars - start) > 0.02
+        idx = index[start:][keep]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(idx))))
+        frames[f"SYM{i}"] = pd.DataFrame(
+            {"open": close, "high": close, "low": close, "close": close, "volume": 1000, "oi": 0},
+            index=idx,
+        )
+    return frames
+
+
+def run(symbols=500, bars=2000, period=20):
+    frames = make_frames(symbols, bars)
+    results = {}
+
+    for ma in ("exponential", "simple"):
+        t0 = time.perf_counter()
+        loop = {s: main.indicators.moving_average(df, period=period, MA=ma) for s, df in frames.items()}
+        loop_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        index, symbols_, panel = main.indicators.align_panel(frames)
+        align_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        batch = main.indicators.moving_average_panel(panel, period=period, MA=ma)
+        batch_s = time.perf_counter() - t0
+
+        max_err = 0.0
+        for col, s in enumerate(symbols_):
+            rows = index.get_indexer(frames[s].index)
+            max_err = max(max_err, float(np.nanmax(np.abs(batch[rows, col] - loop[s].to_numpy()))))
+
+        results[ma] = {
+            "per_symbol_loop_s": loop_s,
+            "align_s": align_s,
+            "panel_s": batch_s,
+            "speedup": loop_s / batch_s if batch_s else float("inf"),
+            "max_abs_error": max_err,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=2000)
+    parser.add_argument("--period", type=int, default=20)
+    args = parser.parse_args()
+
+    for ma, r in run(args.symbols, args.bars, args.period).items():
+        print(f"{ma:12s} loop={r['per_symbol_loop_s']:.3f}s align={r['align_s']:.3f}s "
+              f"panel={r['panel_s']:.3f}s speedup={r['speedup']:.1f}x max_err={r['max_abs_error']:.2e}")
@@ -0,0 +1,264 @@
+#PURPOSE OF THIS FILE : local stand-in for the Upstox v3 historical/intraday candle endpoints,
+#with configurable latency, rate limits and per-token auth, so fetch and scan paths can be
+#measured offline.
+#Run standalone: python -m benchmarks.fake_upstox --port 8765 --latency 0.05
+
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+IST = timezone(timedelta(hours=5, minutes=30))
+UNIT_MINUTES = {"minutes": 1, "hours": 60}
+
+
+def _session_starts(day, unit, interval):
+    """Bar start times for one NSE session (09:15-15:30 IST) at unit/interval."""
+    if unit in UNIT_MINUTES:
+        width = UNIT_MINUTES[unit] * interval
+        start = datetime(day.year, day.month, day.day, 9, 15, tzinfo=IST)
+        end = datetime(day.year, day.month, day.day, 15, 30, tzinfo=IST)
+        starts = []
+        while start < end:
+            starts.append(start)
+            start += timedelta(minutes=width)
+        return starts
+    return [datetime(day.year, day.month, day.day, tzinfo=IST)]
+
+
+def synthetic_candles(instrument_key, unit, interval, from_date, to_date):
+    """
+    Deterministic candles for [from_date, to_date] on weekdays, newest first like the API.
+    The same instrument_key always yields the same price path.
+    """
+    seed = int.from_bytes(hashlib.sha1(instrument_key.encode()).digest()[:4], "little")
+    days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+    days = [d for d in days if d.weekday() < 5]
+    if unit == "weeks":
+        days = sorted({d - timedelta(days=d.weekday()) for d in days})
+    elif unit == "months":
+        days = sorted({d.replace(day=1) for d in days})
+    starts = [s for d in days for s in _session_starts(d, unit, interval)]
+    if not starts:
+        return []
+
+    # Price path depends only on the bar's time, so overlapping requests agree
+    stamps = np.array([s.timestamp() for s in starts])
+    rng = np.random.default_rng(seed)
+    base = 50 + rng.random() * 450
+    drift = np.sin(stamps / 86400.0 / 7.0 + seed % 97) * 0.05 + np.cos(stamps / 3600.0 + seed % 13) * 0.01
+    close = np.round(base * (1 + drift), 2)
+    open_ = np.round(close * (1 - 0.001), 2)
+    high = np.round(np.maximum(open_, close) * 1.002, 2)
+    low = np.round(np.minimum(open_, close) * 0.998, 2)
+    volume = (1000 + (stamps.astype(np.int64) // 60 + seed) % 50000).astype(int)
+
+    rows = [
+        [s.isoformat(), float(o), float(h), float(l), float(c), int(v), 0]
+        for s, o, h, l, c, v in zip(starts, open_, high, low, close, volume)
+    ]
+    return rows[::-1]
+
+
+class FakeUpstoxServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering:
+      GET /v3/historical-candle/:instrument_key/:unit/:interval/:to_date[/:from_date]
+      GET /v3/historical-candle/intraday/:instrument_key/:unit/:interval
+
+    :param address: (host, port); port 0 picks a free port
+    :param latency: seconds added to every response
+    :param jitter: extra uniform random latency in [0, jitter] seconds
+    :param rate_limit: max requests per second before answering 429 (None = unlimited)
+    :param tokens: access tokens accepted (None = any); others get 401. Add or
+        remove entries of server.tokens at runtime to refresh / expire them
+    :param token_rate_limit: max requests per second per access token before answering 429
+    :param retry_after: Retry-After seconds sent with 429 responses
+    :param fixtures: optional directory of recorded responses; a file named
+        "<sha1 of request path>.json" is served verbatim when present
+    :param today: date treated as the current session for intraday requests
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, jitter=0.0, rate_limit=None,
+                 retry_after=1, fixtures=None, today=None, tokens=None, token_rate_limit=None):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.fixtures = Path(fixtures) if fixtures else None
+        self.today = today or datetime.now(IST).date()
+        self.tokens = set(tokens) if tokens is not None else None
+        self.token_rate_limit = token_rate_limit
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.unauthorized = 0
+        self.bytes_sent = 0
+        self.requests_by_token = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._token_windows = {}  # token -> [window start, count]
+        self._rng = np.random.default_rng(0)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def start(self):
+        """Serve in a background thread and return base_url."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "throttled": self.throttled, "unauthorized": self.unauthorized,
+                    "bytes_sent": self.bytes_sent, "requests_by_token": dict(self.requests_by_token)}
+
+    def admit(self, token=None):
+        """
+        Count the request; return 200 if it may be served, 401 for an unknown
+        token, or 429 if it exceeds the server-wide or per-token rate limit.
+        """
+        with self.lock:
+            self.requests += 1
+            if self.tokens is not None and token not in self.tokens:
+                self.unauthorized += 1
+                return 401
+            self.requests_by_token[token] = self.requests_by_token.get(token, 0) + 1
+            now = time.monotonic()
+
+            if self.rate_limit is not None:
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.rate_limit:
+                    self.throttled += 1
+                    return 429
+
+            if self.token_rate_limit is not None:
+                window = self._token_windows.setdefault(token, [now, 0])
+                if now - window[0] >= 1.0:
+                    window[0], window[1] = now, 0
+                window[1] += 1
+                if window[1] > self.token_rate_limit:
+                    self.throttled += 1
+                    return 429
+            return 200
+
+    def delay(self):
+        with self.lock:
+            extra = self._rng.random() * self.jitter if self.jitter else 0.0
+        return self.latency + extra
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        if body and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, compresslevel=1)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"status": "error", "errors": [{"message": message}]}).encode())
+
+    def do_GET(self):
+        server = self.server
+        auth = self.headers.get("Authorization") or ""
+        status = server.admit(auth[len("Bearer "):] if auth.startswith("Bearer ") else None)
+        if status == 401:
+            self._error(401, "Invalid token used to access API")
+            return
+        if status == 429:
+            self._send(429, b"", {"Retry-After": str(server.retry_after)})
+            return
+
+        delay = server.delay()
+        if delay:
+            time.sleep(delay)
+
+        if server.fixtures is not None:
+            fixture = server.fixtures / (hashlib.sha1(self.path.encode()).hexdigest() + ".json")
+            if fixture.exists():
+                self._send(200, fixture.read_bytes())
+                return
+
+        parts = [urllib.parse.unquote(p) for p in urllib.parse.urlparse(self.path).path.split("/") if p]
+        try:
+            if parts[:2] != ["v3", "historical-candle"]:
+                raise ValueError("unknown endpoint")
+            if parts[2] == "intraday":
+                key, unit, interval = parts[3], parts[4], int(parts[5])
+                from_date = to_date = server.today
+            else:
+                key, unit, interval = parts[2], parts[3], int(parts[4])
+                to_date = date.fromisoformat(parts[5])
+                from_date = date.fromisoformat(parts[6]) if len(parts) > 6 else to_date - timedelta(days=365)
+                # Historical data never includes the current session
+                to_date = min(to_date, server.today - timedelta(days=1))
+        except (IndexError, ValueError) as e:
+            self._error(400, f"Invalid request: {e}")
+            return
+
+        candles = synthetic_candles(key, unit, interval, from_date, to_date)
+        self._send(200, json.dumps({"status": "success", "data": {"candles": candles}}).encode())
+
+
+def record_fixture(directory, path, payload):
+    """Save a recorded response so FakeUpstoxServer(fixtures=directory) replays it for `path`."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / (hashlib.sha1(path.encode()).hexdigest() + ".json")
+    target.write_bytes(payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Upstox v3 candle server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--tokens", nargs="*", default=None, help="accepted access tokens (default: any)")
+    parser.add_argument("--token-rate-limit", type=int, default=None, help="requests/second per token")
+    parser.add_argument("--fixtures", default=None)
+    args = parser.parse_args()
+
+    server = FakeUpstoxServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                              rate_limit=args.rate_limit, fixtures=args.fixtures, tokens=args.tokens,
+                              token_rate_limit=args.token_rate_limit)
+    print(f"Serving fake Upstox API at {server.base_url} (UPSTOX_BASE_URL)")
+    server.serve_forever()
@@ -0,0 +1,295 @@
+#PURPOSE OF THIS FILE : offline benchmark suite. Starts a FakeUpstoxServer, points main.fetch
+#at it and measures fetch latency, decode cost, moving_average throughput and end-to-end
+#get_clustered_stocks symbols/second, plus CLI start-up time against a budget and, with
+#--token-accounts, fetch throughput across a pool of rate-limited access tokens. Results are written as JSON for comparison across versions.
+#
+#Run from the repo root:
+#    python -m benchmarks.run --output benchmarks/results.json
+#    python -m benchmarks.run --compare benchmarks/results.json
+
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks import bench_decode, bench_indicators
+from benchmarks.fake_upstox import FakeUpstoxServer
+from tests.support import install_standins, write_instruments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# `python -m main --help` and `lookup` must stay this fast and never load these
+STARTUP_BUDGET_MS = 250
+HEAVY_MODULES = ("pandas", "numpy", "requests", "matplotlib", "scipy", "private")
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        "count": int(len(samples)),
+        "mean_ms": float(samples.mean() * 1000),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p95_ms": float(np.percentile(samples, 95) * 1000),
+        "max_ms": float(samples.max() * 1000),
+    }
+
+
+def bench_fetch(requests, days):
+    """Latency of single historical and intraday requests against the fake server."""
+    import main.fetch
+
+    to_date = datetime.now(main.fetch.IST).date() - timedelta(days=1)
+    from_date = to_date - timedelta(days=days)
+    historical, intraday = [], []
+    for i in range(requests):
+        symbol = f"BENCH{i}"
+        t0 = time.perf_counter()
+        main.fetch.get_historical_candle(symbol, from_date=from_date, to_date=to_date)
+        historical.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        main.fetch.get_intraday_candle(symbol)
+        intraday.append(time.perf_counter() - t0)
+
+    return {"historical": _percentiles(historical), "intraday": _percentiles(intraday)}
+
+
+def bench_scan(symbols, days, workers):
+    """End-to-end get_clustered_stocks throughput, sequential and concurrent."""
+    import main.screener
+
+    result = {}
+    for mode, kwargs in (("sequential", {}), ("threads", {"workers": workers})):
+        # Cold store every run so both modes do the same API work
+        import main.store
+        main.store._default_store = main.store.CandleStore(os.path.join(tempfile.mkdtemp(), "candles.sqlite"))
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            found = main.screener.get_clustered_stocks(days=days, exchanges="NSE", limit=symbols, **kwargs)
+        elapsed = time.perf_counter() - t0
+        result[mode] = {
+            "symbols": symbols,
+            "seconds": elapsed,
+            "symbols_per_second": symbols / elapsed if elapsed else float("inf"),
+            "clusters_found": len(found),
+        }
+    return result
+
+
+def bench_token_pool(requests, accounts, token_rate, workers, days):
+    """
+    Historical fetch throughput with 1 and `accounts` access tokens against a
+    server that enforces `token_rate` requests/second per token.
+    """
+    import main.fetch
+    import main.scanner
+    import main.tokens
+
+    names = [f"account{i}" for i in range(accounts)]
+    server = FakeUpstoxServer(tokens=names, token_rate_limit=token_rate)
+    base_url, saved_url = server.start(), main.fetch.BASE_URL
+    main.fetch.BASE_URL = base_url
+    to_date = datetime.now(main.fetch.IST).date() - timedelta(days=1)
+    from_date = to_date - timedelta(days=days)
+
+    result = {}
+    try:
+        for count in sorted({1, accounts}):
+            pool = main.tokens.TokenPool([(name, name) for name in names[:count]], limits=[(token_rate, 1.0)])
+            main.tokens.set_pool(pool)
+            t0 = time.perf_counter()
+            _, errors = main.scanner.scan(
+                range(requests),
+                lambda i: main.fetch.get_historical_candle(f"BENCH{i % 10}", from_date=from_date, to_date=to_date),
+                workers=workers
+            )
+            elapsed = time.perf_counter() - t0
+            result[f"tokens_{count}"] = {
+                "requests": requests,
+                "seconds": elapsed,
+                "requests_per_second": requests / elapsed if elapsed else float("inf"),
+                "errors": len(errors),
+            }
+        result["server"] = server.stats()
+    finally:
+        main.tokens.set_pool(None)
+        main.fetch.BASE_URL = saved_url
+        server.stop()
+    return result
+
+
+def _time_command(argv, repeat):
+    """Best-of-`repeat` wall time (ms) of running `python argv...` from the repo root."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable] + argv, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def bench_startup(keys_file, budget_ms=STARTUP_BUDGET_MS, repeat=5):
+    """
+    Start-up cost of the CLI. `--help` and `lookup` are checked against
+    budget_ms and must not import any HEAVY_MODULES; `import main.fetch` is
+    recorded for reference (it needs pandas, but no credentials).
+    """
+    probe = (
+        "import sys, contextlib, io, main.__main__ as cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    cli.main(['lookup', 'BENCH0', '--keys', {keys_file!r}])\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    loaded = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout.strip()
+
+    result = {
+        "budget_ms": budget_ms,
+        "cli_help_ms": _time_command(["-m", "main", "--help"], repeat),
+        "cli_lookup_ms": _time_command(["-m", "main", "lookup", "BENCH0", "--keys", keys_file], repeat),
+        "import_fetch_ms": _time_command(["-c", "import main.fetch"], repeat),
+        "heavy_modules_on_lookup": loaded.split(",") if loaded else [],
+    }
+    result["within_budget"] = (
+        result["cli_help_ms"] <= budget_ms
+        and result["cli_lookup_ms"] <= budget_ms
+        and not result["heavy_modules_on_lookup"]
+    )
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    install_standins()
+
+    server = FakeUpstoxServer(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit)
+    base_url = server.start()
+
+    workdir = tempfile.mkdtemp(prefix="yfin-bench-")
+    keys_file = os.path.join(workdir, "keys.json")
+    write_instruments(keys_file, args.symbols)
+
+    import main.client
+    import main.fetch
+    import main.instruments
+    import main.metrics
+
+    main.metrics.REGISTRY.reset()
+    main.fetch.BASE_URL = base_url
+    main.instruments.KEYS_FILE = keys_file
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+        },
+        "startup": bench_startup(keys_file, budget_ms=args.startup_budget_ms),
+        "fetch_latency": bench_fetch(args.fetch_requests, args.days),
+        "decode": bench_decode.run(bars=args.decode_bars, repeat=3),
+        "moving_average": bench_indicators.run(symbols=args.ma_symbols, bars=args.ma_bars),
+        "scan": bench_scan(args.symbols, args.days, args.workers),
+        "server": server.stats(),
+        "metrics": main.metrics.REGISTRY.snapshot(),
+    }
+
+    if args.token_accounts:
+        results["token_pool"] = bench_token_pool(args.token_requests, args.token_accounts, args.token_rate,
+                                                 args.workers, args.days)
+
+    server.stop()
+    main.client.close_session()
+    return results
+
+
+def compare(current, baseline, path=()):
+    """Yield (metric path, baseline, current, ratio) for every numeric leaf present in both."""
+    for key, value in current.items():
+        if key == "meta" or key not in baseline:
+            continue
+        if isinstance(value, dict):
+            yield from compare(value, baseline[key], path + (key,))
+        elif isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)) and baseline[key]:
+            yield ".".join(path + (key,)), baseline[key], value, value / baseline[key]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Offline yFin benchmark suite")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results.json"))
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--symbols", type=int, default=50, help="symbols in the end-to-end scan")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--fetch-requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake server latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rate-limit", type=int, default=None, help="fake server requests/second")
+    parser.add_argument("--decode-bars", type=int, default=20000)
+    parser.add_argument("--ma-symbols", type=int, default=500)
+    parser.add_argument("--ma-bars", type=int, default=500)
+    parser.add_argument("--token-accounts", type=int, default=0,
+                        help="also measure fetch throughput over this many rate-limited tokens vs one")
+    parser.add_argument("--token-rate", type=int, default=20, help="fake server requests/second per token")
+    parser.add_argument("--token-requests", type=int, default=100)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="max CLI start-up time; exceeding it fails the run")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {args.output}")
+
+    scan = results["scan"]
+    print(f"fetch p50: historical {results['fetch_latency']['historical']['p50_ms']:.1f} ms, "
+          f"intraday {results['fetch_latency']['intraday']['p50_ms']:.1f} ms")
+    print(f"scan: sequential {scan['sequential']['symbols_per_second']:.1f} sym/s, "
+          f"threads {scan['threads']['symbols_per_second']:.1f} sym/s")
+
+    if "token_pool" in results:
+        pool = results["token_pool"]
+        rates = ", ".join(f"{key.split('_')[1]} token(s) {value['requests_per_second']:.1f} req/s"
+                          for key, value in pool.items() if key.startswith("tokens_"))
+        print(f"token pool: {rates}")
+
+    startup = results["startup"]
+    print(f"startup: --help {startup['cli_help_ms']:.0f} ms, lookup {startup['cli_lookup_ms']:.0f} ms "
+          f"(budget {startup['budget_ms']:.0f} ms), import main.fetch {startup['import_fetch_ms']:.0f} ms")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for metric, old, new, ratio in compare(results, baseline):
+            print(f"{metric:60s} {old:14.4f} -> {new:14.4f}  ({ratio:6.2f}x)")
+
+    if not startup["within_budget"]:
+        heavy = ", ".join(startup["heavy_modules_on_lookup"]) or "none"
+        print(f"[FAIL] CLI start-up over budget (heavy modules on lookup: {heavy})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,276 @@
+#PURPOSE OF THIS FILE : command line entry point, `python -m main <command>`.
+#   lookup SYMBOL         instrument key and details from the local instrument master
+#   fetch SYMBOL          candles for one symbol (printed or written to CSV)
+#   scan                  EMA cluster screen over the equity universe
+#   watch                 the same screen, updated at every bar close (prints changes only)
+#   chart SYMBOL...       candle + EMA charts as PNG files (downsampled to screen resolution)
+#   backtest              forward returns and hit rates of the EMA cluster signal over history
+#Only the modules a command needs are imported, and only once it runs, so
+#`lookup` and `--help` start without pandas/numpy or credentials.
+
+
+import argparse
+import json
+import logging
+import sys
+
+
+def cmd_lookup(args):
+    from main import instruments
+
+    try:
+        index = instruments.get_index(args.keys)
+    except FileNotFoundError:
+        print(f"Keys file not found: {args.keys or instruments.KEYS_FILE}", file=sys.stderr)
+        return 1
+    instrument = index.lookup(args.symbol.strip().upper(), args.exchange.strip().upper())
+    if instrument is None:
+        print(f"Instrument key not found for symbol '{args.symbol}' on exchange '{args.exchange}'", file=sys.stderr)
+        return 1
+    print(json.dumps(instrument, indent=2) if args.json else instrument.get("instrument_key"))
+    return 0
+
+
+def cmd_fetch(args):
+    from main import fetch
+
+    df = fetch.get_all_candles(
+        args.symbol,
+        exchange=args.exchange,
+        unit=args.unit,
+        interval=args.interval,
+        from_date=args.from_date,
+        to_date=args.to_date,
+        use_store=not args.no_store
+    )
+    if args.output:
+        df.to_csv(args.output)
+        print(f"{len(df)} candles written to {args.output}")
+    else:
+        print(df.tail(args.tail))
+    return 0
+
+
+def cmd_scan(args):
+    from main import screener
+
+    clustered = screener.get_clustered_stocks(
+        days=args.days,
+        exchanges=args.exchanges,
+        ema_accuracy=args.accuracy,
+        workers=args.workers,
+        processes=args.processes,
+        limit=args.limit,
+        checkpoint=args.checkpoint,
+        output=args.output,
+        prescreen={
+            "min_turnover": args.min_turnover,
+            "min_price": args.min_price,
+            "max_price": args.max_price,
+            "max_ema_spread": args.max_ema_spread,
+        } if args.prescreen else None,
+        with_exchange=True
+    )
+    for symbol, _ in clustered:
+        print(symbol)
+    if args.charts and clustered:
+        from datetime import datetime, timedelta
+
+        from main import charts
+        # The bars the scan looked at
+        charts.render_batch(clustered, args.charts, from_date=datetime.now() - timedelta(days=args.days),
+                            workers=args.workers or 1)
+    return 0
+
+
+def cmd_chart(args):
+    from main import charts
+
+    paths, errors = charts.render_batch(
+        [(symbol, args.exchange) for symbol in args.symbols],
+        args.output_dir,
+        unit=args.unit,
+        interval=args.interval,
+        from_date=args.from_date,
+        to_date=args.to_date,
+        workers=args.workers,
+        emas=args.emas,
+        method=args.method,
+        width=args.width,
+        height=args.height
+    )
+    for path in paths.values():
+        print(path)
+    for (symbol, _), e in errors.items():
+        print(f"{symbol}: {e}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_watch(args):
+    from main import daemon, screener
+
+    df = screener.extract_equity_symbols(args.exchanges)
+    if args.limit is not None:
+        df = df.head(args.limit)
+
+    def on_delta(entered, left, at):
+        stamp = at.strftime("%Y-%m-%d %H:%M")
+        for symbol, _ in entered:
+            print(f"{stamp} +{symbol}", flush=True)
+        for symbol, _ in left:
+            print(f"{stamp} -{symbol}", flush=True)
+
+    watcher = daemon.ClusterWatcher(
+        list(zip(df["symbol"], df["exchange"])) if not df.empty else [],
+        unit=args.unit,
+        interval=args.interval,
+        days=args.days,
+        ema_accuracy=args.accuracy,
+        periods=args.periods,
+        sizes=[args.size] if args.size else (3, 4),
+        workers=args.workers,
+        on_delta=on_delta
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_backtest(args):
+    from main import backtest, screener
+
+    df = screener.extract_equity_symbols(args.exchanges)
+    if args.limit is not None:
+        df = df.head(args.limit)
+
+    # The scanner's own conditions unless an explicit EMA set is asked for
+    if args.periods:
+        signal = backtest.ema_cluster_signal(args.periods, size=args.size, accuracy=args.accuracy)
+    else:
+        signal = backtest.scan_signal(args.accuracy, sizes=[args.size] if args.size else (3, 4))
+
+    result = backtest.backtest(
+        list(zip(df["symbol"], df["exchange"])) if not df.empty else [],
+        signal,
+        horizons=args.horizons,
+        unit=args.unit,
+        interval=args.interval,
+        from_date=args.from_date,
+        to_date=args.to_date,
+        workers=args.workers,
+        collect_signals=bool(args.signals)
+    )
+    print(result)
+    print(result.stats.to_string())
+    if args.signals:
+        result.signals.to_csv(args.signals, index=False)
+        print(f"{len(result.signals)} signals written to {args.signals}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m main", description="yFin command line")
+    parser.add_argument("--log-level", default="WARNING", help="DEBUG, INFO, WARNING or ERROR (default WARNING)")
+    parser.add_argument("--json-logs", action="store_true", help="emit log events as JSON lines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    lookup = commands.add_parser("lookup", help="resolve a trading symbol to its instrument key")
+    lookup.add_argument("symbol")
+    lookup.add_argument("--exchange", default="NSE")
+    lookup.add_argument("--json", action="store_true", help="print the full instrument record")
+    lookup.add_argument("--keys", default=None, help="instrument master JSON (default main/resources/keys.json)")
+    lookup.set_defaults(handler=cmd_lookup)
+
+    fetch = commands.add_parser("fetch", help="fetch candles for one symbol")
+    fetch.add_argument("symbol")
+    fetch.add_argument("--exchange", default="NSE")
+    fetch.add_argument("--unit", default="hours", choices=["minutes", "hours", "days", "weeks", "months"])
+    fetch.add_argument("--interval", type=int, default=1)
+    fetch.add_argument("--from", dest="from_date", default=None, help="YYYY-MM-DD")
+    fetch.add_argument("--to", dest="to_date", default=None, help="YYYY-MM-DD")
+    fetch.add_argument("--no-store", action="store_true", help="bypass the local candle store")
+    fetch.add_argument("--output", default=None, help="write all candles to this CSV file")
+    fetch.add_argument("--tail", type=int, default=20, help="rows to print without --output (default 20)")
+    fetch.set_defaults(handler=cmd_fetch)
+
+    scan = commands.add_parser("scan", help="list symbols with EMA clusters")
+    scan.add_argument("--days", type=int, default=5)
+    scan.add_argument("--exchanges", nargs="+", default=["NSE"])
+    scan.add_argument("--accuracy", type=float, default=0.2, help="EMA cluster tolerance in percent")
+    scan.add_argument("--workers", type=int, default=None, help="fetch/evaluate on this many threads")
+    scan.add_argument("--processes", type=int, default=None, help="evaluate conditions on this many processes")
+    scan.add_argument("--limit", type=int, default=None, help="only scan the first N symbols")
+    scan.add_argument("--checkpoint", default=None, help="record progress here and resume from it on re-run")
+    scan.add_argument("--output", default=None, help="write results as a Parquet table (needs --checkpoint, pyarrow)")
+    scan.add_argument("--prescreen", action="store_true", help="shortlist symbols on daily stats before the hourly scan")
+    scan.add_argument("--min-turnover", type=float, default=1e7, help="prescreen: average daily close * volume")
+    scan.add_argument("--min-price", type=float, default=10.0, help="prescreen: lowest last close")
+    scan.add_argument("--max-price", type=float, default=None, help="prescreen: highest last close")
+    scan.add_argument("--max-ema-spread", type=float, default=None,
+                      help="prescreen: widest daily EMA 9/21/50 spread in percent")
+    scan.add_argument("--charts", default=None, help="render a PNG chart per clustered symbol into this directory")
+    scan.set_defaults(handler=cmd_scan)
+
+    watch = commands.add_parser("watch", help="keep the EMA cluster screen up to date at every bar close")
+    watch.add_argument("--exchanges", nargs="+", default=["NSE"])
+    watch.add_argument("--unit", default="hours", choices=["minutes", "hours", "days"])
+    watch.add_argument("--interval", type=int, default=1)
+    watch.add_argument("--accuracy", type=float, default=0.2, help="EMA cluster tolerance in percent")
+    watch.add_argument("--days", type=int, default=5, help="days of bars the cluster checks see, as for scan")
+    watch.add_argument("--size", type=int, default=None, choices=[3, 4],
+                       help="with --periods: only the 3 or 4 EMA cluster (default: either)")
+    watch.add_argument("--periods", type=int, nargs="+", default=None,
+                       help="update this EMA set bar by bar with the built-in band check instead of the scan conditions")
+    watch.add_argument("--workers", type=int, default=8)
+    watch.add_argument("--limit", type=int, default=None, help="only watch the first N symbols")
+    watch.set_defaults(handler=cmd_watch)
+
+    chart = commands.add_parser("chart", help="render candle + EMA charts to PNG files")
+    chart.add_argument("symbols", nargs="+")
+    chart.add_argument("--exchange", default="NSE")
+    chart.add_argument("--unit", default="hours", choices=["minutes", "hours", "days", "weeks", "months"])
+    chart.add_argument("--interval", type=int, default=1)
+    chart.add_argument("--from", dest="from_date", default=None, help="YYYY-MM-DD")
+    chart.add_argument("--to", dest="to_date", default=None, help="YYYY-MM-DD")
+    chart.add_argument("--emas", type=int, nargs="*", default=[], help="EMA periods to overlay (default none)")
+    chart.add_argument("--method", default="ohlc", choices=["ohlc", "lttb", "minmax"],
+                       help="downsampling: candles merged per pixel slot, or a close line (LTTB / min-max)")
+    chart.add_argument("--width", type=int, default=1200, help="pixels")
+    chart.add_argument("--height", type=int, default=600, help="pixels")
+    chart.add_argument("--workers", type=int, default=8)
+    chart.add_argument("--output-dir", default="charts")
+    chart.set_defaults(handler=cmd_chart)
+
+    bt = commands.add_parser("backtest", help="forward returns of the scan's EMA cluster signal over history")
+    bt.add_argument("--exchanges", nargs="+", default=["NSE"])
+    bt.add_argument("--unit", default="hours", choices=["minutes", "hours", "days", "weeks", "months"])
+    bt.add_argument("--interval", type=int, default=1)
+    bt.add_argument("--from", dest="from_date", default=None, help="YYYY-MM-DD")
+    bt.add_argument("--to", dest="to_date", default=None, help="YYYY-MM-DD")
+    bt.add_argument("--size", type=int, default=None, choices=[3, 4],
+                    help="only the EMA 3 or EMA 4 cluster check (default: either, as in scan)")
+    bt.add_argument("--periods", type=int, nargs="+", default=None,
+                    help="test this EMA set with the built-in band check instead of the scan conditions")
+    bt.add_argument("--accuracy", type=float, default=0.2, help="EMA cluster tolerance in percent")
+    bt.add_argument("--horizons", type=int, nargs="+", default=[1, 7, 35], help="forward horizons in bars")
+    bt.add_argument("--workers", type=int, default=8)
+    bt.add_argument("--limit", type=int, default=None, help="only backtest the first N symbols")
+    bt.add_argument("--signals", default=None, help="write every signal bar to this CSV file")
+    bt.set_defaults(handler=cmd_backtest)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from main import metrics
+    metrics.configure_logging(getattr(logging, args.log_level.upper(), logging.WARNING), json_lines=args.json_logs)
+
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
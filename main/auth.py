@@ -1,51 +1,95 @@
+#PURPOSE OF THIS FILE : Upstox login flow - opens the authorization page, exchanges the code
+#for an access token and saves it in the token pool's file (main.tokens.TOKENS_FILE), which
+#running scans re-read.
+#Run `python -m main.auth [app]` once per app / account.
+
+import sys
 import webbrowser
+
 import requests
-from private import credentials
-import os
-
-API_KEY = credentials.API_KEY
-API_SECRET = credentials.API_SECRET
-REDIRECT_URL = credentials.REDIRECT_URL
-ACCESS_TOKEN = getattr(credentials, "ACCESS_TOKEN", "")  # in case not set yet
-
-# Step 1: Generate login URL (v2)
-login_url = (
-    f"https://api.upstox.com/v2/login/authorization/dialog?"
-    f"response_type=code&client_id={API_KEY}&redirect_uri={REDIRECT_URL}"
-)
-
-print("Opening Upstox v2 login page in browser...")
-webbrowser.open(login_url)
-
-# Step 2: Get authorization code from browser
-auth_code = input("Enter the 'code' parameter from redirected URL: ").strip()
-
-# Step 3: Exchange code for access token (v2)
-token_url = "https://api.upstox.com/v2/login/authorization/token"
-data = {
-    "grant_type": "authorization_code",
-    "code": auth_code,
-    "client_id": API_KEY,
-    "client_secret": API_SECRET,
-    "redirect_uri": REDIRECT_URL
-}
-
-try:
-    response = requests.post(token_url, data=data)
+
+from main import tokens
+
+LOGIN_URL = "https://api.upstox.com/v2/login/authorization/dialog"
+TOKEN_URL = "https://api.upstox.com/v2/login/authorization/token"
+
+
+def load_apps(credentials=None):
+    """
+    Apps from private/credentials.py: APPS = {"name": {"API_KEY": ..., "API_SECRET": ...,
+    "REDIRECT_URL": ...}, ...}, or the single API_KEY / API_SECRET / REDIRECT_URL app
+    as "default".
+    """
+    if credentials is None:
+        from private import credentials
+    return getattr(credentials, "APPS", None) or {
+        "default": {
+            "API_KEY": credentials.API_KEY,
+            "API_SECRET": credentials.API_SECRET,
+            "REDIRECT_URL": credentials.REDIRECT_URL,
+        }
+    }
+
+
+def get_app(name=None, apps=None):
+    """
+    (name, app settings) for `name` (default: the first app).
+
+    :raises ValueError: for a name not in the apps
+    """
+    apps = apps if apps is not None else load_apps()
+    name = name or next(iter(apps))
+    if name not in apps:
+        raise ValueError(f"Unknown app '{name}'; expected one of: {', '.join(apps)}")
+    return name, apps[name]
+
+
+def login_url(app):
+    return f"{LOGIN_URL}?response_type=code&client_id={app['API_KEY']}&redirect_uri={app['REDIRECT_URL']}"
+
+
+def exchange_code(app, code):
+    """
+    Trade an authorization code for an access token.
+
+    :raises requests.RequestException: if the token request fails
+    :raises ValueError: if the response holds no access token
+    """
+    response = requests.post(TOKEN_URL, data={
+        "grant_type": "authorization_code",
+        "code": code,
+        "client_id": app["API_KEY"],
+        "client_secret": app["API_SECRET"],
+        "redirect_uri": app["REDIRECT_URL"],
+    })
     response.raise_for_status()
-except requests.exceptions.RequestException as e:
-    print("HTTP request failed:", e)
-    exit()
-
-token_data = response.json()
-print("Access Token Data:", token_data)
-
-# Step 4: Save ACCESS_TOKEN in credentials.py
-access_token = token_data.get("access_token")
-if access_token:
-    credentials_file = os.path.join(os.path.dirname(__file__), "../private/credentials.py")
-    with open(credentials_file, "a") as f:
-        f.write(f"\nACCESS_TOKEN = '{access_token}'\n")
-    print("Access token saved in private/credentials.py")
-else:
-    print("Failed to get access token. Check auth code, redirect URL, and credentials.")
+    access_token = response.json().get("access_token")
+    if not access_token:
+        raise ValueError("Failed to get access token. Check auth code, redirect URL, and credentials.")
+    return access_token
+
+
+def login(name=None, apps=None, path=None):
+    """
+    Interactive login for one app: open the login page, read the code from the
+    redirected URL on stdin and save the access token under the app's name.
+
+    :return: path of the tokens file
+    """
+    name, app = get_app(name, apps)
+    print(f"Opening Upstox v2 login page in browser for '{name}'...")
+    webbrowser.open(login_url(app))
+    code = input("Enter the 'code' parameter from redirected URL: ").strip()
+    return tokens.save_token(name, exchange_code(app, code), path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    name = argv[0] if argv else None
+    path = login(name)
+    print(f"Access token saved in {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+#PURPOSE OF THIS FILE : backtest a signal over the full candle history of many symbols -
+#signal bars per symbol, forward returns per horizon and hit-rate statistics, streamed in
+#chunks of symbols so memory stays bounded for large universes.
+
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+import main.indicators
+import main.metrics
+import main.scanner
+import main.screener
+
+DEFAULT_HORIZONS = (1, 7, 35)   # bars; for hourly candles about 1 hour, 1 day, 1 week
+CHUNK_SYMBOLS = 50              # symbols held in memory at once
+
+
+# -------------------------------
+# Signals
+# -------------------------------
+def scan_signal(ema_accuracy=0.2, sizes=(3, 4)):
+    """
+    Signal function flagging the bars the scanner's own checks report
+    (private.conditions.ema_cluster_3 / ema_cluster_4 through
+    main.screener.evaluate_clusters), for use with backtest(). This is the
+    signal `python -m main scan` lists symbols on.
+
+    :param sizes: which checks count - 3, 4 or both (default both, as in the scan)
+    """
+    picks = [{3: 0, 4: 1}[size] for size in sizes]
+
+    def signal(df):
+        clusters = main.screener.evaluate_clusters(df, ema_accuracy)
+        mask = np.zeros(len(df), dtype=bool)
+        for k in picks:
+            mask |= signal_mask(df, clusters[k])
+        return mask
+    return signal
+
+
+def ema_cluster_signal(periods, size=3, accuracy=0.2, apply_to="close"):
+    """
+    Signal function flagging bars where `size` of the EMAs in `periods`
+    cluster within `accuracy` percent (main.indicators.ema_clusters), for
+    use with backtest(). For the scanner's own conditions use scan_signal().
+    """
+    def signal(df):
+        return main.indicators.ema_clusters(
+            main.indicators.ema_bank(df, periods=periods, apply_to=apply_to), accuracy=accuracy, size=size
+        )
+    return signal
+
+
+def condition_signal(condition, **kwargs):
+    """
+    Wrap a scan condition such as private.conditions.ema_cluster_3 (called as
+    condition(df, task="past", **kwargs), returning signal timestamps) as a signal function.
+    """
+    kwargs.setdefault("task", "past")
+
+    def signal(df):
+        return condition(df, **kwargs)
+    return signal
+
+
+def signal_mask(df, result):
+    """
+    Normalize a signal function's output to a boolean array aligned with df:
+    either a boolean array/Series of len(df), or the signal timestamps.
+    """
+    if isinstance(result, (np.ndarray, pd.Series)) and result.dtype == bool:
+        mask = np.asarray(result)
+        if len(mask) != len(df):
+            raise ValueError(f"signal mask has {len(mask)} rows, candles have {len(df)}")
+        return mask
+    if result is None or result is False:
+        return np.zeros(len(df), dtype=bool)
+    return df.index.isin(pd.DatetimeIndex(list(result)))
+
+
+def forward_returns(open_, close, horizons=DEFAULT_HORIZONS):
+    """
+    Return of a trade taken on every bar's signal: entered at the next bar's
+    open and exited at the close `h` bars after the signal bar.
+
+    A signal is only known once its bar has closed, so the signal bar's own
+    move never counts; with h=1 the trade holds exactly the next bar.
+
+    Parameters:
+    -----------
+    open_, close : np.ndarray
+        1D open and close prices in time order
+    horizons : sequence of int
+        Forward horizons in bars
+
+    Returns:
+    --------
+    np.ndarray
+        Shape (len(close), len(horizons)); NaN where t + h is past the last bar.
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full((len(close), len(horizons)), np.nan)
+    for k, h in enumerate(horizons):
+        if 0 < h < len(close):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[:-h, k] = close[h:] / open_[1:len(close) - h + 1] - 1.0
+    return out
+
+
+# -------------------------------
+# Streaming statistics
+# -------------------------------
+class _Accumulator:
+    """Running count / sum / sum of squares / hits / min / max per horizon."""
+
+    def __init__(self, n):
+        self.count = np.zeros(n, dtype=np.int64)
+        self.sum = np.zeros(n)
+        self.sumsq = np.zeros(n)
+        self.hits = np.zeros(n, dtype=np.int64)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+
+    def add(self, returns):
+        """returns: (rows, horizons) array, NaN = not available."""
+        if not len(returns):
+            return
+        valid = ~np.isnan(returns)
+        filled = np.where(valid, returns, 0.0)
+        self.count += valid.sum(axis=0)
+        self.sum += filled.sum(axis=0)
+        self.sumsq += (filled * filled).sum(axis=0)
+        self.hits += (filled > 0).sum(axis=0)
+        self.min = np.minimum(self.min, np.where(valid, returns, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(valid, returns, -np.inf).max(axis=0))
+
+    def mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count
+
+    def std(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.sumsq - self.sum * self.sum / self.count) / (self.count - 1)
+        return np.sqrt(np.maximum(var, 0.0))
+
+    def hit_rate(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.hits / self.count
+
+
+class BacktestResult:
+    """
+    Outcome of backtest().
+
+    Attributes:
+    -----------
+    stats : pd.DataFrame
+        One row per horizon (bars): signals (signal bars with a return
+        available at that horizon), mean_return, std_return, hit_rate,
+        min_return, max_return, baseline_mean, baseline_hit_rate (over all bars)
+        and edge (mean_return - baseline_mean).
+    signals : pd.DataFrame | None
+        One row per signal bar (symbol, exchange, timestamp, close, return_<h>),
+        when collected; return_<h> is entered at the next bar's open (see forward_returns).
+    signal_bars : int
+        Bars on which the signal fired.
+    symbols : int
+        Symbols with candle data.
+    bars : int
+        Candles processed.
+    errors : dict
+        (symbol, exchange) -> exception for symbols that failed.
+    """
+
+    def __init__(self, stats, signals, signal_bars, symbols, bars, errors):
+        self.stats = stats
+        self.signals = signals
+        self.signal_bars = signal_bars
+        self.symbols = symbols
+        self.bars = bars
+        self.errors = errors
+
+    def __repr__(self):
+        return (f"BacktestResult(signal_bars={self.signal_bars}, symbols={self.symbols}, "
+                f"bars={self.bars}, errors={len(self.errors)})")
+
+
+# -------------------------------
+# Engine
+# -------------------------------
+def evaluate_frame(df, signal, horizons=DEFAULT_HORIZONS):
+    """
+    Signal mask and forward returns for one symbol's candles.
+
+    :return: (mask, returns) - boolean array of len(df), (len(df), len(horizons)) returns
+    """
+    mask = signal_mask(df, signal(df))
+    return mask, forward_returns(df["open"].to_numpy(dtype=np.float64), df["close"].to_numpy(dtype=np.float64),
+                                 horizons)
+
+
+def backtest(pairs, signal, horizons=DEFAULT_HORIZONS, unit="hours", interval=1, from_date=None, to_date=None,
+             chunk_size=CHUNK_SYMBOLS, workers=main.scanner.DEFAULT_WORKERS, collect_signals=True, loader=None):
+    """
+    Backtest `signal` over the candle history of every (symbol, exchange) pair.
+
+    Symbols are processed `chunk_size` at a time: the chunk's candles are
+    fetched on `workers` threads (closed sessions come from the local candle
+    store), evaluated, folded into running statistics and released, so memory
+    does not grow with the size of the universe.
+
+    Parameters:
+    -----------
+    pairs : iterable of (str, str)
+        (symbol, exchange) pairs
+    signal : callable
+        signal(df) -> boolean array aligned with df, or signal timestamps
+        (see scan_signal, ema_cluster_signal, condition_signal)
+    horizons : sequence of int
+        Forward-return horizons in bars (default DEFAULT_HORIZONS)
+    unit, interval : str, int
+        Candle timeframe (default 1 hour)
+    from_date, to_date : str/date/datetime, optional
+        History range (default: earliest available up to today)
+    chunk_size : int
+        Symbols per chunk (default CHUNK_SYMBOLS)
+    workers : int
+        Fetch threads per chunk
+    collect_signals : bool
+        Keep one row per signal bar in result.signals (default True)
+    loader : callable, optional
+        loader(symbol, exchange) -> candle DataFrame, replacing main.fetch.get_all_candles
+
+    Returns:
+    --------
+    BacktestResult
+    """
+    horizons = tuple(int(h) for h in horizons)
+    pairs = list(pairs)
+    to_date = to_date or datetime.now(main.fetch.IST)
+    if loader is None:
+        def loader(symbol, exchange):
+            return main.fetch.get_all_candles(symbol, exchange=exchange, unit=unit, interval=interval,
+                                              from_date=from_date, to_date=to_date)
+
+    on_signal = _Accumulator(len(horizons))
+    baseline = _Accumulator(len(horizons))
+    rows = []
+    errors = {}
+    signal_bars = symbols = bars = 0
+
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        results, chunk_errors = main.scanner.scan(chunk, lambda pair: loader(*pair), workers=workers)
+
+        for result in results:
+            df = result.value
+            if not result.ok or df is None or df.empty:
+                continue
+            try:
+                with main.metrics.timer("backtest_symbol_seconds"):
+                    mask, returns = evaluate_frame(df, signal, horizons)
+            except Exception as e:
+                chunk_errors[result.item] = e
+                continue
+
+            symbols += 1
+            bars += len(df)
+            signal_bars += int(mask.sum())
+            baseline.add(returns)
+            on_signal.add(returns[mask])
+
+            if collect_signals and mask.any():
+                symbol, exchange = result.item
+                hit = np.flatnonzero(mask)
+                frame = pd.DataFrame(returns[hit], columns=[f"return_{h}" for h in horizons])
+                frame.insert(0, "close", df["close"].to_numpy()[hit])
+                frame.insert(0, "timestamp", df.index[hit])
+                frame.insert(0, "exchange", exchange)
+                frame.insert(0, "symbol", symbol)
+                rows.append(frame)
+
+        for (symbol, _), e in chunk_errors.items():
+            main.metrics.log_event("symbol_failed", logging.ERROR, symbol=symbol, error=e)
+        errors.update(chunk_errors)
+        main.metrics.log_event("backtest_progress", done=min(start + chunk_size, len(pairs)), total=len(pairs),
+                               signals=signal_bars)
+
+    stats = pd.DataFrame({
+        "signals": on_signal.count,
+        "mean_return": on_signal.mean(),
+        "std_return": on_signal.std(),
+        "hit_rate": on_signal.hit_rate(),
+        "min_return": np.where(on_signal.count > 0, on_signal.min, np.nan),
+        "max_return": np.where(on_signal.count > 0, on_signal.max, np.nan),
+        "baseline_mean": baseline.mean(),
+        "baseline_hit_rate": baseline.hit_rate(),
+    }, index=pd.Index(horizons, name="horizon"))
+    stats["edge"] = stats["mean_return"] - stats["baseline_mean"]
+
+    signals = None
+    if collect_signals:
+        signals = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(
+            columns=["symbol", "exchange", "timestamp", "close"] + [f"return_{h}" for h in horizons]
+        )
+
+    return BacktestResult(stats, signals, signal_bars, symbols, bars, errors)
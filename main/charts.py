@@ -0,0 +1,277 @@
+#PURPOSE OF THIS FILE : render candle charts with EMA overlays to PNG. Long series are reduced
+#to screen resolution first (OHLC aggregation, LTTB or min/max per pixel bucket) so years of
+#minute bars draw as fast as a few days. matplotlib is imported on first render only.
+
+
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+import main.indicators
+import main.metrics
+import main.scanner
+
+DEFAULT_EMAS = ()      # no overlays unless EMA periods are asked for
+WIDTH = 1200           # pixels
+HEIGHT = 600
+DPI = 100
+CANDLE_PX = 3          # minimum pixels per drawn candle (2px body + 1px gap)
+METHODS = ("ohlc", "lttb", "minmax")
+UP_COLOR = "#26a69a"
+DOWN_COLOR = "#ef5350"
+
+
+# -------------------------------
+# Downsampling
+# -------------------------------
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` points of (x, y) that keep
+    the visual shape of the line (peaks and troughs survive, flat runs thin out).
+
+    Parameters:
+    -----------
+    x, y : np.ndarray
+        1D coordinates, x ascending, no NaN
+    threshold : int
+        Points to keep (first and last are always kept)
+
+    Returns:
+    --------
+    np.ndarray
+        Sorted integer indices of the kept points
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo = edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, buckets):
+    """
+    Indices of the minimum and maximum of `y` in each of `buckets` equal
+    slices (plus the first and last point), sorted. Keeps every spike.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * buckets >= n or buckets < 1:
+        return np.arange(n)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    lows = starts + np.nanargmin(padded, axis=1)
+    highs = starts + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate([[0, n - 1], lows, highs]))
+
+
+def aggregate_ohlc(df, buckets):
+    """
+    Merge consecutive candles into at most `buckets` candles: first open,
+    highest high, lowest low, last close, summed volume.
+
+    Returns:
+    --------
+    tuple (pd.DataFrame, np.ndarray)
+        The aggregated candles (indexed by each group's first timestamp) and
+        the position in df of each group's last candle
+    """
+    n = len(df)
+    if n <= buckets:
+        return df, np.arange(n)
+    starts = np.unique(np.linspace(0, n, buckets, endpoint=False).astype(np.int64))
+    ends = np.r_[starts[1:], n] - 1
+    out = pd.DataFrame({
+        "open": df["open"].to_numpy(dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(dtype=np.float64), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(dtype=np.float64), starts),
+        "close": df["close"].to_numpy(dtype=np.float64)[ends],
+        "volume": np.add.reduceat(df["volume"].to_numpy(dtype=np.float64), starts),
+    }, index=df.index[starts])
+    return out, ends
+
+
+# -------------------------------
+# Rendering
+# -------------------------------
+def _agg_figure(width, height, dpi):
+    # Figure + Agg canvas directly: renders without a display and without
+    # pyplot's global state, and keeps matplotlib off the import path of
+    # everything else in the package
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+    except ImportError:
+        raise ImportError("charts need the 'matplotlib' package: pip install matplotlib")
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _time_ticks(ax, positions, index, count=8):
+    """Label up to `count` x positions with their timestamps."""
+    if not len(positions):
+        return
+    picks = np.unique(np.linspace(0, len(positions) - 1, min(count, len(positions))).astype(np.int64))
+    span = index[-1] - index[0] if len(index) > 1 else pd.Timedelta(0)
+    fmt = "%Y-%m-%d" if span > pd.Timedelta(days=3) else "%d %b %H:%M"
+    ax.set_xticks(np.asarray(positions)[picks])
+    ax.set_xticklabels([index[p].strftime(fmt) for p in picks], rotation=0, fontsize=8)
+
+
+def plot_candles(df, emas=DEFAULT_EMAS, method="ohlc", title=None, width=WIDTH, height=HEIGHT, dpi=DPI):
+    """
+    Draw candles (or the close line) with EMA overlays, downsampled to the
+    figure's pixel width.
+
+    EMAs are computed on the full-resolution closes and then sampled at the
+    kept bars, so the overlays match moving_average() on the raw frame.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Candlestick dataframe as returned by main.fetch.get_all_candles
+    emas : sequence of int
+        EMA periods to overlay (default DEFAULT_EMAS: none)
+    method : str
+        'ohlc' - merge bars into candles of at least CANDLE_PX pixels;
+        'lttb' - close line, one LTTB point per pixel;
+        'minmax' - close line through each pixel pair's min and max
+    title : str, optional
+    width, height, dpi : int
+        Figure size in pixels and resolution
+
+    Returns:
+    --------
+    matplotlib.figure.Figure
+        Attached to an Agg canvas (call savefig() or use render_png())
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    fig = _agg_figure(width, height, dpi)
+    ax = fig.add_subplot(1, 1, 1)
+    if title:
+        ax.set_title(title)
+    if df.empty:
+        return fig
+
+    bank = main.indicators.ema_bank(df, periods=emas) if len(emas) else np.empty((len(df), 0))
+
+    if method == "ohlc":
+        candles, kept = aggregate_ohlc(df, max(width // CANDLE_PX, 1))
+        x = np.arange(len(candles))
+        o, h, l, c = (candles[f].to_numpy(dtype=np.float64) for f in ("open", "high", "low", "close"))
+        colors = np.where(c >= o, UP_COLOR, DOWN_COLOR)
+        # Body width in points: the pixel slot per candle minus a 1px gap
+        slot_px = width * 0.8 / max(len(candles), 1)
+        body = max(slot_px - 1.0, 1.0) * 72.0 / dpi
+        ax.vlines(x, l, h, colors=colors, linewidth=min(body, 0.8))
+        ax.vlines(x, np.minimum(o, c), np.maximum(o, c), colors=colors, linewidth=body)
+        ax.set_xlim(-1, len(candles))
+        _time_ticks(ax, x, candles.index)
+    else:
+        close = df["close"].to_numpy(dtype=np.float64)
+        positions = np.arange(len(df), dtype=np.float64)
+        kept = lttb(positions, close, width) if method == "lttb" else minmax_indices(close, max(width // 2, 1))
+        x = kept
+        ax.plot(x, close[kept], color="#455a64", linewidth=0.8, label="close")
+        ax.set_xlim(0, len(df) - 1)
+        _time_ticks(ax, x, df.index[kept])
+
+    for k, period in enumerate(emas):
+        ax.plot(x, bank[kept, k], linewidth=1.0, label=f"EMA {period}")
+    if len(emas) or method != "ohlc":
+        ax.legend(loc="upper left", fontsize=8)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def render_png(df, path, **kwargs):
+    """plot_candles(df, **kwargs) saved as a PNG at `path`. Returns the path."""
+    start = time.perf_counter()
+    fig = plot_candles(df, **kwargs)
+    fig.savefig(path, dpi=fig.dpi)
+    main.metrics.observe("chart_render_seconds", time.perf_counter() - start)
+    return path
+
+
+def _file_name(symbol, exchange):
+    safe = "".join(ch if ch.isalnum() or ch in "-_&." else "_" for ch in f"{symbol}_{exchange}")
+    return f"{safe}.png"
+
+
+def render_batch(pairs, directory, unit="hours", interval=1, from_date=None, to_date=None,
+                 workers=main.scanner.DEFAULT_WORKERS, loader=None, **kwargs):
+    """
+    Fetch candles for every (symbol, exchange) pair on `workers` threads and
+    render each to <directory>/<symbol>_<exchange>.png as it arrives.
+
+    Parameters:
+    -----------
+    pairs : iterable of (str, str) or str
+        (symbol, exchange) pairs, e.g. from get_clustered_stocks(..., with_exchange=True);
+        bare symbols mean NSE
+    directory : str
+        Output directory (created if missing)
+    unit, interval, from_date, to_date :
+        Candle range, as for main.fetch.get_all_candles
+    workers : int
+        Fetch threads; rendering stays on the calling thread
+    loader : callable, optional
+        loader(symbol, exchange) -> candle DataFrame, replacing main.fetch.get_all_candles
+    **kwargs :
+        Passed to plot_candles (emas, method, width, height, dpi)
+
+    Returns:
+    --------
+    tuple (dict, dict)
+        (pair -> PNG path, pair -> exception for fetch or render failures)
+    """
+    pairs = [(p, "NSE") if isinstance(p, str) else tuple(p) for p in pairs]
+    os.makedirs(directory, exist_ok=True)
+    if loader is None:
+        def loader(symbol, exchange):
+            return main.fetch.get_all_candles(symbol, exchange=exchange, unit=unit, interval=interval,
+                                              from_date=from_date, to_date=to_date)
+
+    paths = {}
+    errors = {}
+    for result in main.scanner.iter_scan(pairs, lambda pair: loader(*pair), workers=workers):
+        symbol, exchange = result.item
+        try:
+            if not result.ok:
+                raise result.error
+            options = dict(kwargs, title=kwargs.get("title") or f"{symbol} ({exchange}) {interval} {unit}")
+            paths[result.item] = render_png(result.value, os.path.join(directory, _file_name(symbol, exchange)),
+                                            **options)
+        except Exception as e:
+            errors[result.item] = e
+            main.metrics.log_event("chart_failed", logging.ERROR, symbol=symbol, error=e)
+
+    main.metrics.log_event("charts_rendered", count=len(paths), failed=len(errors), directory=directory)
+    return {pair: paths[pair] for pair in pairs if pair in paths}, errors
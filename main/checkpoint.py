@@ -0,0 +1,215 @@
+#PURPOSE OF THIS FILE : per-symbol scan progress in an append-only JSON lines file, so an
+#interrupted universe scan can resume where it stopped, and export of the results as a
+#Parquet table (optional pyarrow) that downstream tools can load without re-scanning.
+
+
+import json
+import os
+import threading
+
+HEADER = "header"
+RECORD = "record"
+
+# Symbols with these statuses are not scanned again on resume; errors are retried
+DONE_STATUSES = ("ok", "empty")
+
+
+def read_checkpoint(path):
+    """
+    Read a checkpoint file.
+
+    :return: (params or None if there is no header, {(symbol, exchange): latest record})
+    """
+    header = None
+    records = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from an interrupted run
+            if entry.get("type") == HEADER:
+                header = entry.get("params") or {}
+            elif entry.get("type") == RECORD:
+                records[(entry["symbol"], entry["exchange"])] = entry
+    return header, records
+
+
+def _timestamps(value):
+    """Condition result -> list of ISO timestamp strings; a scalar result (bool, numpy.bool_, ...) as ["true"] or []."""
+    if value is None:
+        return []
+    if isinstance(value, str) or not hasattr(value, "__iter__"):
+        return ["true"] if bool(value) else []
+    out = []
+    for ts in value:
+        out.append(ts.isoformat() if hasattr(ts, "isoformat") else str(ts))
+    return out
+
+
+def _error_text(error):
+    if error is None:
+        return None
+    if isinstance(error, Exception):
+        return f"{type(error).__name__}: {error}"
+    return str(error)
+
+
+class ScanCheckpoint:
+    """
+    Append-only record of a universe scan.
+
+    The first line holds the scan parameters; every following line is one
+    symbol's outcome:
+        {"type": "record", "symbol", "exchange", "status": "ok" | "empty" | "error",
+         "cluster_3": [iso timestamps], "cluster_4": [...],
+         "fetch_seconds", "eval_seconds", "error"}
+
+    Lines are flushed as they are written, so a crash or Ctrl-C loses at most
+    the symbol in flight. A torn last line is ignored on reload. When a symbol
+    appears more than once (an error retried on resume) the last line wins.
+
+    :param path: checkpoint file (created if missing)
+    :param params: scan parameters; resuming with different parameters raises ValueError
+    """
+
+    def __init__(self, path, params=None):
+        self.path = path
+        self.params = dict(params or {})
+        self._lock = threading.Lock()
+        self._records = {}
+
+        header = None
+        if os.path.exists(path):
+            header, self._records = read_checkpoint(path)
+
+        if header is not None and self.params and header != self.params:
+            raise ValueError(
+                f"Checkpoint {path} was written for different scan parameters "
+                f"({header} != {self.params}); remove it or use another path"
+            )
+
+        self._file = open(path, "a", encoding="utf-8")
+        if header is None:
+            self._write({"type": HEADER, "params": self.params})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+
+    def record(self, symbol, exchange, clusters=None, fetch_seconds=None, eval_seconds=None, error=None):
+        """
+        Append one symbol's outcome.
+
+        :param clusters: (cluster_3, cluster_4) condition results, or None if there was no data
+        :param error: exception or message if the symbol failed
+        """
+        if error is not None:
+            status = "error"
+        elif clusters is None:
+            status = "empty"
+        else:
+            status = "ok"
+        cluster_3, cluster_4 = clusters if clusters is not None else (None, None)
+
+        entry = {
+            "type": RECORD,
+            "symbol": symbol,
+            "exchange": exchange,
+            "status": status,
+            "cluster_3": _timestamps(cluster_3),
+            "cluster_4": _timestamps(cluster_4),
+            "fetch_seconds": fetch_seconds,
+            "eval_seconds": eval_seconds,
+            "error": _error_text(error),
+        }
+        with self._lock:
+            self._write(entry)
+            self._records[(symbol, exchange)] = entry
+
+    def is_done(self, symbol, exchange):
+        entry = self._records.get((symbol, exchange))
+        return entry is not None and entry["status"] in DONE_STATUSES
+
+    def pending(self, pairs):
+        """The (symbol, exchange) pairs that still need scanning, in input order."""
+        return [pair for pair in pairs if not self.is_done(*pair)]
+
+    def records(self, pairs=None):
+        """Latest record per symbol, in `pairs` order (default: first-seen order)."""
+        if pairs is None:
+            return list(self._records.values())
+        return [self._records[pair] for pair in pairs if pair in self._records]
+
+    def clustered(self, pairs=None, with_exchange=False):
+        """Symbols (or (symbol, exchange) pairs) whose record has an EMA 3 or EMA 4 cluster."""
+        return [(r["symbol"], r["exchange"]) if with_exchange else r["symbol"]
+                for r in self.records(pairs) if r["status"] == "ok" and (r["cluster_3"] or r["cluster_4"])]
+
+    def write_parquet(self, path, pairs=None):
+        """Write the records as a Parquet table (see records_to_table)."""
+        import pyarrow.parquet as pq
+        pq.write_table(records_to_table(self.records(pairs)), path)
+        return path
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def records_to_table(records):
+    """
+    Checkpoint records -> pyarrow.Table with columns
+    symbol, exchange, status, cluster_3, cluster_4 (list of timestamps, IST),
+    fetch_seconds, eval_seconds, error.
+
+    Needs the optional `pyarrow` package.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Parquet output needs the 'pyarrow' package: pip install pyarrow")
+    import pandas as pd
+
+    def stamps(values):
+        # UTC nanoseconds; non-timestamp results (e.g. "true") are dropped
+        out = []
+        for v in values:
+            try:
+                out.append(pd.Timestamp(v).value)
+            except ValueError:
+                continue
+        return out
+
+    timestamp_list = pa.list_(pa.timestamp("ns", tz="Asia/Kolkata"))
+    return pa.table({
+        "symbol": pa.array([r["symbol"] for r in records], pa.string()),
+        "exchange": pa.array([r["exchange"] for r in records], pa.string()),
+        "status": pa.array([r["status"] for r in records], pa.string()),
+        "cluster_3": pa.array([stamps(r["cluster_3"]) for r in records], timestamp_list),
+        "cluster_4": pa.array([stamps(r["cluster_4"]) for r in records], timestamp_list),
+        "fetch_seconds": pa.array([r["fetch_seconds"] for r in records], pa.float64()),
+        "eval_seconds": pa.array([r["eval_seconds"] for r in records], pa.float64()),
+        "error": pa.array([r["error"] for r in records], pa.string()),
+    })
+
+
+def load_results(path):
+    """
+    Load scan results as a pandas DataFrame from a Parquet file written by
+    write_parquet(), or straight from a checkpoint file.
+    """
+    import pandas as pd
+
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+
+    _, records = read_checkpoint(path)
+    columns = ["symbol", "exchange", "status", "cluster_3", "cluster_4", "fetch_seconds", "eval_seconds", "error"]
+    return pd.DataFrame([{c: r.get(c) for c in columns} for r in records.values()], columns=columns)
@@ -0,0 +1,178 @@
+#PURPOSE OF THIS FILE : shared HTTP client for main.fetch - one pooled keep-alive session,
+#rate limiting, per-request timeouts and retries with backoff on throttling/server errors.
+
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from main import metrics
+from main import ratelimit
+
+POOL_SIZE = 32                  # keep-alive connections kept per host
+TIMEOUT = (5, 30)               # (connect, read) seconds
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5              # seconds, doubled on every attempt
+BACKOFF_MAX = 30.0              # cap for a single wait
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+# Shared by every request in the process so concurrent scans stay inside the API limits
+RATE_LIMITER = ratelimit.RateLimiter(ratelimit.UPSTOX_LIMITS)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide requests.Session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def close_session():
+    """Close the shared session and its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _retry_after(resp):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt, resp=None):
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Honors Retry-After when the server sends it, otherwise uses exponential
+    backoff with full jitter: uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)).
+    """
+    retry_after = _retry_after(resp)
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def get(url, headers=None, timeout=TIMEOUT, retries=MAX_RETRIES, limiter=None, endpoint="other", tokens=None):
+    """
+    GET `url` through the shared session.
+
+    Every attempt waits for the rate limiter first. Connection errors,
+    timeouts and RETRY_STATUSES responses are retried up to `retries` times
+    with backoff_delay() between attempts.
+
+    With a token pool, every attempt instead takes the pool's least-loaded
+    healthy token (whose own limiter replaces `limiter`) and sends it as the
+    Authorization header. A 401 benches that token and a 429 cools it down;
+    both are retried at once on the next token the pool hands out.
+
+    :param url: full URL
+    :param headers: optional extra headers (e.g. Authorization)
+    :param timeout: requests timeout, float or (connect, read) tuple
+    :param retries: maximum number of retries after the first attempt
+    :param limiter: RateLimiter to use; defaults to RATE_LIMITER
+    :param endpoint: label for metrics (e.g. "historical", "intraday")
+    :param tokens: optional main.tokens.TokenPool supplying the Authorization header
+    :return: requests.Response with a 2xx status
+    :raises requests.HTTPError: for non-retryable statuses or when retries run out
+    :raises requests.RequestException: for network errors when retries run out
+    :raises main.tokens.NoHealthyTokenError: when every token in `tokens` has expired
+    """
+    limiter = limiter or RATE_LIMITER
+    session = get_session()
+
+    attempt = 0
+    while True:
+        token = None
+        request_headers = headers
+        if tokens is not None:
+            token = tokens.acquire()
+            request_headers = dict(headers or {}, **token.headers)
+        else:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            resp = session.get(url, headers=request_headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if token is not None:
+                tokens.release(token)
+            metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+            if attempt >= retries:
+                metrics.inc("http_requests_total", endpoint=endpoint, status="error")
+                metrics.log_event("http_request_failed", logging.ERROR, endpoint=endpoint, url=url, error=e)
+                raise
+            delay = backoff_delay(attempt)
+            metrics.inc("http_retries_total", endpoint=endpoint, reason=type(e).__name__)
+            metrics.log_event("http_retry", logging.WARNING, endpoint=endpoint, attempt=attempt + 1,
+                              reason=type(e).__name__, delay=round(delay, 3))
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        if resp.status_code == 429:
+            metrics.inc("http_throttled_total", endpoint=endpoint)
+
+        if token is not None:
+            tokens.release(token, resp.status_code, _retry_after(resp))
+            if resp.status_code in (401, 429) and attempt < retries:
+                # The pool benched or cooled this token; the next acquire() picks another or waits
+                metrics.inc("http_retries_total", endpoint=endpoint, reason=resp.status_code)
+                metrics.log_event("http_retry", logging.WARNING, endpoint=endpoint, attempt=attempt + 1,
+                                  reason=resp.status_code, token=token.name)
+                resp.close()
+                attempt += 1
+                continue
+
+        if resp.status_code in RETRY_STATUSES and attempt < retries:
+            delay = backoff_delay(attempt, resp)
+            metrics.inc("http_retries_total", endpoint=endpoint, reason=resp.status_code)
+            metrics.log_event("http_retry", logging.WARNING, endpoint=endpoint, attempt=attempt + 1,
+                              reason=resp.status_code, delay=round(delay, 3))
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        metrics.inc("http_requests_total", endpoint=endpoint, status=resp.status_code)
+        # Content-Length is the on-the-wire (possibly gzipped) size
+        size = resp.headers.get("Content-Length")
+        metrics.inc("http_response_bytes_total", int(size) if size and size.isdigit() else len(resp.content),
+                    endpoint=endpoint)
+
+        resp.raise_for_status()
+        return resp
@@ -0,0 +1,113 @@
+#PURPOSE OF THIS FILE : share work between concurrent callers of main.fetch - single-flight
+#de-duplication of identical in-flight requests and a small TTL cache for responses.
+
+
+import threading
+import time
+
+from main import metrics
+
+
+class _Call:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run a function at most once per key at a time.
+
+    The first caller for a key (the leader) runs it; callers arriving while
+    it is in flight wait and receive the same result or exception. Once it
+    completes the key is forgotten, so later calls run it again.
+
+    :param name: label for the requests_coalesced_total metric
+    """
+
+    def __init__(self, name="default"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        :return: (value, shared) - shared is True when the value came from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc("requests_coalesced_total", flight=self.name)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.value, False
+
+
+class TTLCache:
+    """
+    Thread-safe key -> value cache whose entries expire after a time-to-live.
+
+    :param ttl: default lifetime in seconds
+    :param max_entries: size bound; expired entries go first, then the oldest
+    :param name: label for the cache_requests_total metric
+    """
+
+    def __init__(self, ttl, max_entries=4096, name="default", clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+        metrics.inc("cache_requests_total", cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Cache `value` for `ttl` seconds (default self.ttl); ttl <= 0 stores nothing."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        now = self._clock()
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                for k in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[k]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,284 @@
+#PURPOSE OF THIS FILE : long-running EMA cluster screen. Seeds each symbol's scan window once,
+#then wakes at every bar close of the NSE session, fetches only the newest bars per symbol,
+#re-runs the scanner's cluster conditions (or updates streaming EMAs for an explicit EMA set)
+#and reports the symbols entering or leaving the set.
+
+
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+import main.indicators
+import main.metrics
+import main.scanner
+import main.screener
+from main import sessions
+
+SETTLE_SECONDS = 5.0      # wait after a bar closes so the API has published it
+
+
+class _SymbolState:
+    __slots__ = ("candles", "clusters", "timestamp", "emas", "hits")
+
+    def __init__(self):
+        self.candles = None    # completed bars inside the scan window (conditions mode)
+        self.clusters = None   # (cluster_3, cluster_4) for the window, None without data
+        self.timestamp = None  # start time of the latest completed bar applied
+        self.emas = None       # StreamingMovingAverage per period (periods mode)
+        self.hits = None       # size -> bar timestamps inside the window where `size` EMAs cluster
+
+
+class ClusterWatcher:
+    """
+    Incremental version of the EMA cluster screen (see main.screener).
+
+    Every symbol keeps the completed bars of the scan's window (the last
+    `days` days, as in get_clustered_stocks). After each bar close only the
+    newest bars are fetched, appended and the window trimmed; the scanner's
+    own checks (private.conditions.ema_cluster_3 / ema_cluster_4, through
+    main.screener.evaluate_clusters) then run on the updated window, so a
+    symbol is in the set exactly when a scan at that bar close would list it.
+
+    With an explicit EMA set (`periods`) the screen is fully incremental
+    instead: every symbol keeps a main.indicators.StreamingMovingAverage per
+    period and the timestamps of the bars inside the window where `size` of
+    them cluster within `ema_accuracy` percent (the band check of
+    main.indicators.ema_clusters). Each new bar costs one update per EMA; no
+    candles are kept. The EMAs run on from the seed rather than restarting
+    at every window start.
+
+    Typical use:
+        watcher = ClusterWatcher(pairs, on_delta=print_delta)
+        watcher.run(stop_event)          # blocks; seed() + poll() at every bar close
+
+    Parameters:
+    -----------
+    pairs : list[tuple[str, str]]
+        (symbol, exchange) pairs to watch
+    unit, interval : str, int
+        Candle timeframe; unit 'minutes', 'hours' or 'days' (default 1 hour)
+    days : int
+        Days of bars the conditions see, as for get_clustered_stocks (default 5)
+    ema_accuracy : float
+        EMA cluster tolerance percentage (default 0.2)
+    periods : sequence of int, optional
+        EMA set for the incremental band check; None runs the scanner's conditions
+    sizes : sequence of int
+        With `periods`: cluster sizes reported as (cluster_3, cluster_4) (default (3, 4))
+    workers : int
+        Threads used for fetching (default main.scanner.DEFAULT_WORKERS)
+    on_delta : callable, optional
+        Called as on_delta(entered, left, at) after every poll that changes the set
+    """
+
+    def __init__(self, pairs, unit="hours", interval=1, days=5, ema_accuracy=0.2, periods=None, sizes=(3, 4),
+                 workers=main.scanner.DEFAULT_WORKERS, on_delta=None):
+        if unit not in ("minutes", "hours", "days"):
+            raise ValueError("unit must be one of: minutes, hours, days")
+        if periods is not None and max(sizes) > len(periods):
+            raise ValueError(f"cluster size {max(sizes)} needs at least as many EMA periods")
+        self.pairs = list(pairs)
+        self.unit = unit
+        self.interval = int(interval)
+        self.days = days
+        self.ema_accuracy = ema_accuracy
+        self.periods = tuple(int(p) for p in periods) if periods is not None else None
+        self.sizes = tuple(sizes)
+        self.workers = workers
+        self.on_delta = on_delta
+
+        self.states = {}
+        self.members = set()
+
+    # -------------------------------
+    # State updates
+    # -------------------------------
+    def _completed(self, df, now):
+        """Rows of df whose bar has closed by `now`."""
+        if df.empty:
+            return df
+        # Same rule as sessions.bar_close(), vectorized
+        session_close = df.index.normalize() + pd.Timedelta(hours=sessions.SESSION_CLOSE.hour,
+                                                            minutes=sessions.SESSION_CLOSE.minute)
+        if self.unit == "days":
+            closes = session_close
+        else:
+            ends = df.index + sessions.bar_width(self.unit, self.interval)
+            closes = ends.where(ends < session_close, session_close)
+        return df[closes <= pd.Timestamp(now)]
+
+    def _window_start(self, now):
+        # get_clustered_stocks fetches from the date `days` before now
+        return pd.Timestamp((now - timedelta(days=self.days)).date()).tz_localize(sessions.IST)
+
+    def _apply(self, state, df, now):
+        """
+        Apply the completed bars newer than the state and re-evaluate the
+        window. Returns the number of bars applied.
+        """
+        df = self._completed(df, now)
+        if state.timestamp is not None:
+            df = df[df.index > state.timestamp]
+        if self.periods is None:
+            self._apply_window(state, df, now)
+        else:
+            self._apply_streaming(state, df, now)
+        if len(df):
+            state.timestamp = df.index[-1]
+        return len(df)
+
+    def _apply_window(self, state, df, now):
+        """Append to the window, trim it and re-run the conditions if it changed."""
+        candles = df
+        if state.candles is not None:
+            candles = pd.concat([state.candles, df]) if len(df) else state.candles
+        window = candles[candles.index >= self._window_start(now)]
+
+        # Bars dropping out of the window change the result as much as new ones
+        if state.candles is None or len(df) or len(window) != len(candles):
+            state.candles = window
+            state.clusters = main.screener.evaluate_clusters(window, self.ema_accuracy) if len(window) else None
+
+    def _apply_streaming(self, state, df, now):
+        """Feed new bars to the streaming EMAs, record cluster bars and drop those outside the window."""
+        if state.emas is None:
+            state.emas = [main.indicators.StreamingMovingAverage(period) for period in self.periods]
+            state.hits = {size: deque() for size in self.sizes}
+        for timestamp, close in zip(df.index, df["close"].to_numpy(dtype=np.float64)):
+            values = np.array([[ema.update(close, timestamp=timestamp) for ema in state.emas]])
+            for size, hits in state.hits.items():
+                if main.indicators.ema_clusters(values, self.ema_accuracy, size)[0]:
+                    hits.append(timestamp)
+
+        start = self._window_start(now)
+        for hits in state.hits.values():
+            while hits and hits[0] < start:
+                hits.popleft()
+        if state.timestamp is None and not len(df):
+            state.clusters = None
+        else:
+            clusters = [list(state.hits[size]) for size in self.sizes]
+            state.clusters = tuple(clusters + [[]] * (2 - len(clusters)))
+
+    def _current_members(self):
+        return {pair for pair, state in self.states.items() if main.screener.is_clustered(state.clusters)}
+
+    # -------------------------------
+    # Fetching
+    # -------------------------------
+    def _newest_bars(self, pair, now):
+        """Only the bars after the state's latest one: intraday for today, historical for any gap."""
+        symbol, exchange = pair
+        state = self.states[pair]
+        today = now.date()
+        frames = []
+
+        # Missed bars of earlier sessions (daemon was down, or daily bars, which
+        # the historical endpoint publishes after the session): fill the gap.
+        # A symbol seeded without any bar yet gets its whole window.
+        previous_day = sessions.previous_trading_day(today)
+        if state.timestamp is None:
+            start = self._window_start(now).date()
+            if start <= previous_day:
+                frames.append(main.fetch.get_historical_candle(
+                    symbol, exchange=exchange, unit=self.unit, interval=self.interval,
+                    from_date=start, to_date=previous_day
+                ))
+        else:
+            applied = sessions.bar_close(state.timestamp.to_pydatetime(), self.unit, self.interval)
+            if applied < sessions.bar_closes(previous_day, self.unit, self.interval)[-1]:
+                frames.append(main.fetch.get_historical_candle(
+                    symbol, exchange=exchange, unit=self.unit, interval=self.interval,
+                    from_date=applied.date(), to_date=previous_day
+                ))
+
+        if self.unit in sessions.UNIT_MINUTES and sessions.is_trading_day(today):
+            frames.append(main.fetch.get_intraday_candle(symbol, exchange=exchange, unit=self.unit, interval=self.interval))
+
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=["open", "high", "low", "close", "volume", "oi"])
+        df = pd.concat(frames)
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    def _fetch_all(self, pairs, fetch_one):
+        results, errors = main.scanner.scan(pairs, fetch_one, workers=self.workers)
+        for (symbol, _), e in errors.items():
+            main.metrics.log_event("symbol_failed", logging.ERROR, symbol=symbol, error=e)
+        return [(r.item, r.value) for r in results if r.ok]
+
+    def _seed_pairs(self, pairs, now):
+        """Fetch the scan window of `pairs` and build their state; pairs whose fetch fails stay unseeded."""
+        fetched = self._fetch_all(pairs, lambda pair: main.fetch.get_all_candles(
+            pair[0], exchange=pair[1], unit=self.unit, interval=self.interval,
+            from_date=self._window_start(now).date(), to_date=now
+        ))
+        for pair, df in fetched:
+            state = _SymbolState()
+            self._apply(state, df, now)
+            self.states[pair] = state
+        return len(fetched)
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    def seed(self, now=None):
+        """Fetch the scan window per symbol and evaluate the conditions. Returns the initial set."""
+        now = sessions.to_ist(now)
+        self._seed_pairs(self.pairs, now)
+
+        self.members = self._current_members()
+        main.metrics.log_event("watch_seeded", symbols=len(self.states), clustered=len(self.members))
+        return set(self.members)
+
+    def poll(self, now=None):
+        """
+        Apply the bars that closed since the last poll and report the change.
+        Symbols whose seed fetch failed are seeded again first.
+
+        :return: (entered, left) sorted lists of (symbol, exchange) pairs
+        """
+        now = sessions.to_ist(now)
+        seeded = [pair for pair in self.pairs if pair in self.states]
+        unseeded = [pair for pair in self.pairs if pair not in self.states]
+        if unseeded:
+            main.metrics.log_event("watch_reseeded", seeded=self._seed_pairs(unseeded, now), missing=len(unseeded))
+
+        fetched = self._fetch_all(seeded, lambda pair: self._newest_bars(pair, now))
+
+        bars = 0
+        for pair, df in fetched:
+            bars += self._apply(self.states[pair], df, now)
+
+        current = self._current_members()
+        entered = sorted(current - self.members)
+        left = sorted(self.members - current)
+        self.members = current
+
+        main.metrics.inc("watch_polls_total")
+        main.metrics.inc("watch_bars_total", bars)
+        main.metrics.log_event("watch_polled", at=now.isoformat(timespec="seconds"), bars=bars,
+                               entered=len(entered), left=len(left), clustered=len(current))
+        if (entered or left) and self.on_delta is not None:
+            self.on_delta(entered, left, now)
+        return entered, left
+
+    def run(self, stop_event=None, settle=SETTLE_SECONDS):
+        """
+        Seed, then poll `settle` seconds after every bar close of the NSE
+        session until `stop_event` is set. Sleeps through nights, weekends
+        and holidays.
+        """
+        stop_event = stop_event or threading.Event()
+        self.seed()
+        while not stop_event.is_set():
+            wake = sessions.next_bar_close(unit=self.unit, interval=self.interval) + timedelta(seconds=settle)
+            main.metrics.log_event("watch_sleeping", logging.DEBUG, until=wake.isoformat(timespec="seconds"))
+            if stop_event.wait(max(0.0, (wake - sessions.to_ist()).total_seconds())):
+                break
+            self.poll()
@@ -0,0 +1,116 @@
+#PURPOSE OF THIS FILE : turn Upstox candle payloads into DataFrames quickly - fast JSON
+#parsing, column arrays filled in one go and vectorized IST timestamp parsing.
+
+
+import json
+from datetime import timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from main import metrics
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional speed-up, the stdlib parser works too
+    orjson = None
+    _loads = json.loads
+
+CANDLE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "oi"]
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Upstox timestamps are always IST, e.g. "2025-10-03T11:15:00+05:30"
+IST_OFFSET = timezone(timedelta(hours=5, minutes=30))
+_IST_SUFFIX = "+05:30"
+_IST_DELTA = np.timedelta64(5 * 3600 + 30 * 60, "s")
+
+
+def parse_timestamps(values):
+    """
+    Parse Upstox ISO timestamps into a tz-aware DatetimeIndex (UTC+05:30).
+
+    Strings with the usual "+05:30" suffix are parsed in bulk by NumPy; any
+    other format falls back to pd.to_datetime.
+
+    :param values: sequence of ISO-8601 strings
+    :return: pd.DatetimeIndex with nanosecond resolution
+    """
+    strings = np.asarray(values, dtype="U25")
+    if len(strings) == 0:
+        return pd.DatetimeIndex([], dtype="datetime64[ns, UTC]").tz_convert(IST_OFFSET)
+
+    if not np.char.endswith(strings, _IST_SUFFIX).all():
+        parsed = pd.DatetimeIndex(pd.to_datetime(list(values), utc=True))
+        return parsed.tz_convert(IST_OFFSET).as_unit("ns")
+
+    # Drop the offset, parse the local wall time and shift it to UTC
+    local = strings.astype("U19").astype("datetime64[s]")
+    utc = (local - _IST_DELTA).astype("datetime64[ns]")
+    return pd.DatetimeIndex(utc).tz_localize("UTC").tz_convert(IST_OFFSET)
+
+
+def _column(values, dtype, count):
+    if dtype is None:
+        # Let NumPy infer like pandas would: all-int -> int64, otherwise float64
+        return np.array(values)
+    return np.fromiter(values, dtype=dtype, count=count)
+
+
+def candles_to_frame(candles, compact=False):
+    """
+    Build a candle DataFrame from Upstox candle rows.
+
+    :param candles: list of [timestamp, open, high, low, close, volume, oi] rows
+    :param compact: use float32 prices, int64 volume and uint32 oi (default False:
+                    float64 prices, volume/oi inferred as int64 or float64)
+    :return: pandas DataFrame indexed by timestamp (IST), sorted ascending
+    """
+    n = len(candles)
+    if n == 0:
+        df = pd.DataFrame({c: np.empty(0, dtype=np.float64) for c in CANDLE_COLUMNS[1:]})
+        df.index = parse_timestamps([])
+        df.index.name = "timestamp"
+        return df
+
+    # Transpose rows into columns in C, then fill each typed column in one call
+    columns = list(zip(*candles))
+    if len(columns) == 6:
+        columns.append((0,) * n)  # some payloads omit oi
+
+    price_dtype = np.float32 if compact else np.float64
+    data = {name: _column(columns[i + 1], price_dtype, n) for i, name in enumerate(PRICE_COLUMNS)}
+    data["volume"] = _column(columns[5], np.int64 if compact else None, n)
+    data["oi"] = _column(columns[6], np.uint32 if compact else None, n)
+    index = parse_timestamps(columns[0])
+
+    # Upstox returns newest first; reversing is cheaper than sorting
+    stamps = index.asi8
+    if n > 1 and not (np.diff(stamps) >= 0).all():
+        if (np.diff(stamps) <= 0).all():
+            order = slice(None, None, -1)
+        else:
+            order = np.argsort(stamps, kind="stable")
+        index = index[order]
+        data = {name: col[order] for name, col in data.items()}
+
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.index.name = "timestamp"
+    return df
+
+
+def decode_candles(payload, compact=False):
+    """
+    Decode an Upstox candle response body into a DataFrame.
+
+    :param payload: raw response body (bytes or str)
+    :param compact: see candles_to_frame()
+    :return: pandas DataFrame indexed by timestamp (IST)
+    """
+    with metrics.timer("decode_seconds"):
+        data = _loads(payload)
+        # candles are under data["candles"], each row = [timestamp, open, high, low, close, volume, oi]
+        candles = (data.get("data") or {}).get("candles") or []
+        df = candles_to_frame(candles, compact=compact)
+    metrics.inc("candles_decoded_total", len(df))
+    return df
@@ -1,20 +1,51 @@
-import requests
-from private import credentials
 import json
-from pathlib import Path
-import requests
+import os
 import urllib.parse
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
-
-BASE_URL = "https://api.upstox.com/v3"
-HEADERS = {"Authorization": f"Bearer {credentials.ACCESS_TOKEN}"}
+from main import instruments
+from main import store as candle_store
+from main import client
+from main import decode
+from main import planner
+from main import metrics
+from main import coalesce
+from main import sessions
+from main import tokens
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Overridable so the fetch layer can be pointed at a local stub server
+BASE_URL = os.environ.get("UPSTOX_BASE_URL", "https://api.upstox.com/v3")
 IST = ZoneInfo("Asia/Kolkata")
+CHUNK_WORKERS = 4  # windows of one long historical range fetched at once
+INTRADAY_TTL = 15.0  # seconds an intraday response is reused (never past the next bar close)
+
+# Identical requests in flight at the same time share one API call
+_inflight = coalesce.SingleFlight("fetch")
+_intraday_cache = coalesce.TTLCache(INTRADAY_TTL, name="intraday")
+
+def get_token_pool():
+    """
+    The process-wide access token pool (see main.tokens).
+
+    Tokens are read on first use (not at import) from UPSTOX_ACCESS_TOKENS /
+    UPSTOX_ACCESS_TOKEN, else private.credentials, plus the tokens file that
+    main.auth writes, which is re-read when it changes. Importing main.fetch
+    therefore works without credentials.
+    """
+    return tokens.get_pool()
+
+
+def get_headers():
+    """Authorization headers for the pool's least-loaded healthy token (for callers outside client.get)."""
+    return get_token_pool().peek().headers
+
 
 def get_instrument_key(symbol, exchange="NSE"):
     """
     Fetch the instrument_key for a given stock symbol and exchange
-    from the local JSON file.
+    from the in-memory index of the local JSON file (see main.instruments).
 
     :param symbol: Trading symbol of the stock (e.g., "ACC")
     :param exchange: Exchange name (default "NSE")
@@ -24,28 +55,22 @@ def get_instrument_key(symbol, exchange="NSE"):
     symbol = symbol.strip().upper()
     exchange = exchange.strip().upper()
 
-    # Path to JSON file
-    keys_file = Path(__file__).parent / "resources" / "keys.json"
-
     try:
-        with open(keys_file, "r", encoding="utf-8") as f:
-            instruments = json.load(f)
+        index = instruments.get_index()
     except FileNotFoundError:
-        print(f"Keys file not found: {keys_file}")
+        metrics.log_event("keys_file_missing", logging.ERROR, path=instruments.KEYS_FILE)
         return None
     except json.JSONDecodeError:
-        print(f"Error decoding JSON in keys file: {keys_file}")
+        metrics.log_event("keys_file_invalid", logging.ERROR, path=instruments.KEYS_FILE)
         return None
 
-    # Search for the instrument
-    for instrument in instruments:
-        trading_symbol = (instrument.get("trading_symbol") or instrument.get("asset_symbol") or "").strip().upper()
-        instrument_exchange = (instrument.get("exchange") or "").strip().upper()
-        if trading_symbol == symbol and instrument_exchange == exchange:
-            return instrument.get("instrument_key")
+    # O(1) lookup in the process-wide instrument index
+    instrument = index.lookup(symbol, exchange)
+    if instrument:
+        return instrument.get("instrument_key")
 
     # If not found
-    print(f"Instrument key not found for symbol '{symbol}' on exchange '{exchange}'")
+    metrics.log_event("instrument_key_not_found", logging.WARNING, symbol=symbol, exchange=exchange)
     return None
 
 
@@ -59,9 +84,20 @@ def _normalize_date(d):
         return d.isoformat()
     raise ValueError("from_date/to_date must be str, date or datetime")
 
+
+def _as_date(d):
+    """Convert a str/date/datetime to a date in IST."""
+    if isinstance(d, str):
+        return date.fromisoformat(d[:10])
+    if isinstance(d, datetime):
+        return d.astimezone(IST).date()
+    if isinstance(d, date):
+        return d
+    raise ValueError("from_date/to_date must be str, date or datetime")
+
 import pandas as pd
 #gets all candles excluding current trading day
-def get_historical_candle(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None):
+def get_historical_candle(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None, compact=False):
     """
     Fetch historical candle data from Upstox v3 using the trading symbol and exchange.
     Internally resolves instrument_key.
@@ -79,6 +115,7 @@ def get_historical_candle(symbol, exchange="NSE", unit="hours", interval=1, from
     :param interval: numeric interval as int (e.g., 1)
     :param from_date: optional, str/date/datetime
     :param to_date: optional, str/date/datetime
+    :param compact: float32 prices, int64 volume and uint32 oi (default False)
     :return: pandas DataFrame of candles
     """
     # Resolve instrument_key internally
@@ -102,28 +139,131 @@ def get_historical_candle(symbol, exchange="NSE", unit="hours", interval=1, from
     else:
         url = f"{BASE_URL}/historical-candle/{encoded_key}/{unit}/{interval}/{to_str}"
 
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
+    def fetch():
+        # Pooled keep-alive session with rate limiting, timeouts and retries
+        resp = client.get(url, tokens=get_token_pool(), endpoint="historical")
+
+        # Fast decode straight into typed columns, timestamps parsed as IST
+        return decode.decode_candles(resp.content, compact=compact)
+
+    df, shared = _inflight.do(("historical", url, compact), fetch)
+    return df.copy() if shared else df
+#long historical ranges split into API-legal windows and fetched concurrently
+def get_historical_candle_chunked(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None,
+                                  workers=CHUNK_WORKERS, progress=None, compact=False):
+    """
+    Same as get_historical_candle, but splits [from_date, to_date] into the
+    windows a single request may cover (see main.planner) and fetches them
+    concurrently. Windows are stitched back in order and candles repeated at
+    window boundaries are kept once.
+
+    With from_date=None the range is unknown, so a single request is made.
+
+    :param workers: maximum windows fetched at once (default CHUNK_WORKERS)
+    :param progress: optional callback progress(done, total) called as windows complete
+    :return: pandas DataFrame of candles
+    """
+    unit = unit.lower()
+    to_date = to_date or datetime.now(IST)
+
+    windows = []
+    if from_date is not None:
+        windows = planner.plan_windows(unit, interval, _as_date(from_date), _as_date(to_date))
+    if not windows:
+        windows = [(from_date, to_date)]
+
+    def fetch_window(window):
+        return get_historical_candle(symbol, exchange=exchange, unit=unit, interval=interval,
+                                     from_date=window[0], to_date=window[1], compact=compact)
+
+    if len(windows) <= 1:
+        df = fetch_window(windows[0])
+        if progress is not None:
+            progress(1, 1)
+        return df
+
+    frames = [None] * len(windows)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as pool:
+        futures = {pool.submit(fetch_window, w): i for i, w in enumerate(windows)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            frames[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(windows))
+
+    non_empty = [f for f in frames if not f.empty]
+    if not non_empty:
+        return frames[0]
+
+    df = pd.concat(non_empty)
+    df = df[~df.index.duplicated(keep="last")]
+    if not df.index.is_monotonic_increasing:
+        df.sort_index(inplace=True)
 
-    # candles are under data["candles"], each row = [timestamp, open, high, low, close, volume, oi]
-    candles = data.get("data", {}).get("candles", [])
+    return df
+#historical candles served from the local store, fetching only missing sessions
+def get_stored_historical_candle(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None, store=None):
+    """
+    Same as get_historical_candle, but reads closed sessions from the local
+    candle store (see main.store) and only requests the missing date ranges
+    from the API. Fetched closed sessions are written back to the store.
+
+    Falls back to a plain get_historical_candle call when the range is open
+    ended (from_date is None) or the unit is not cacheable (weeks, months).
+
+    :param store: optional CandleStore; defaults to main.store.get_store()
+    :return: pandas DataFrame of candles
+    """
+    unit = unit.lower()
+    interval = int(interval)
+    to_date = to_date or datetime.now(IST)
+
+    if from_date is None or unit not in candle_store.CACHEABLE_UNITS:
+        return get_historical_candle_chunked(symbol, exchange=exchange, unit=unit, interval=interval,
+                                             from_date=from_date, to_date=to_date)
+
+    instrument_key = get_instrument_key(symbol, exchange)
+    if not instrument_key:
+        raise ValueError(f"Could not find instrument key for symbol '{symbol}' on exchange '{exchange}'")
 
-    # Convert to DataFrame
-    df = pd.DataFrame(candles, columns=["timestamp", "open", "high", "low", "close", "volume", "oi"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"])  # IST aware from API
-    df.set_index("timestamp", inplace=True)
+    store = store or candle_store.get_store()
+    start, end = _as_date(from_date), _as_date(to_date)
+    today = datetime.now(IST).date()
+
+    stored = store.read(instrument_key, unit, interval, start, min(end, today - timedelta(days=1)))
+    frames = [stored]
+    for gap_start, gap_end in store.missing_ranges(instrument_key, unit, interval, start, end, today):
+        # One progress tick per API window, so api_calls counts real requests
+        gap_df = get_historical_candle_chunked(symbol, exchange=exchange, unit=unit, interval=interval,
+                                               from_date=gap_start, to_date=gap_end,
+                                               progress=lambda done, total: store.record_api_call())
+
+        # Only closed sessions are persisted; anything from today on may still change
+        closed = gap_df[gap_df.index < pd.Timestamp(today, tz=IST)]
+        store.write(instrument_key, unit, interval, closed)
+        store.mark_closed(instrument_key, unit, interval, gap_start, gap_end, today,
+                          with_data=closed.index.date)
+        frames.append(gap_df)
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return stored
+
+    df = pd.concat(frames)
+    df = df[~df.index.duplicated(keep="last")]
     df.sort_index(inplace=True)
 
     return df
 #get all candles of current trading day
-def get_intraday_candle(symbol, exchange="NSE", unit="hours", interval=1):
+def get_intraday_candle(symbol, exchange="NSE", unit="hours", interval=1, compact=False):
     """
     Fetch intraday candle data from Upstox v3 using the trading symbol and exchange.
     Always returns today's intraday data (live session).
 
     Path format: /v3/historical-candle/intraday/:instrument_key/:unit/:interval
 
+    Concurrent identical calls share one request, and responses are reused
+    for INTRADAY_TTL seconds (but not past the next bar close).
+
     Columns: timestamp (datetime, IST), open, high, low, close, volume, oi
     Index: timestamp
 
@@ -131,6 +271,7 @@ def get_intraday_candle(symbol, exchange="NSE", unit="hours", interval=1):
     :param exchange: Exchange name (default "NSE")
     :param unit: "minutes" or "hours" (default "hours")
     :param interval: numeric interval as int (e.g., 1)
+    :param compact: float32 prices, int64 volume and uint32 oi (default False)
     :return: pandas DataFrame of intraday candles
     """
     # Resolve instrument_key internally
@@ -148,33 +289,42 @@ def get_intraday_candle(symbol, exchange="NSE", unit="hours", interval=1):
     # Build URL
     url = f"{BASE_URL}/historical-candle/intraday/{encoded_key}/{unit}/{interval}"
 
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
+    key = ("intraday", url, compact)
+    cached = _intraday_cache.get(key)
+    if cached is not None:
+        return cached.copy()
 
-    # candles are under data["candles"], each row = [timestamp, open, high, low, close, volume, oi]
-    candles = data.get("data", {}).get("candles", [])
+    def fetch():
+        # Pooled keep-alive session with rate limiting, timeouts and retries
+        resp = client.get(url, tokens=get_token_pool(), endpoint="intraday")
 
-    # Convert to DataFrame
-    df = pd.DataFrame(candles, columns=["timestamp", "open", "high", "low", "close", "volume", "oi"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"])  # IST aware from API
-    df.set_index("timestamp", inplace=True)
-    df.sort_index(inplace=True)
+        # Fast decode straight into typed columns, timestamps parsed as IST
+        df = decode.decode_candles(resp.content, compact=compact)
 
-    return df
+        # Never serve a cached response past a bar close: it would miss the closed bar
+        now = datetime.now(IST)
+        until_close = (sessions.next_bar_close(now, unit, int(interval)) - now).total_seconds()
+        _intraday_cache.set(key, df, ttl=min(INTRADAY_TTL, until_close))
+        return df
+
+    # Cached and shared frames are copied so callers can modify what they get
+    df, _ = _inflight.do(key, fetch)
+    return df.copy()
 
 #collate both dataframs to get continous df
-def get_all_candles(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None):
+def get_all_candles(symbol, exchange="NSE", unit="hours", interval=1, from_date=None, to_date=None, use_store=True):
     """
     Fetch a continuous dataset of candles by combining:
       - Historical candles (till yesterday or up to to_date if given)
       - Intraday candles (today's data, only for 'minutes'/'hours')
 
-    Handles edge cases:
-      - If intraday is not supported (unit not minutes/hours), intraday is skipped.
-      - If from_date/to_date not provided, fetches max available range.
+    Only the endpoints the range needs are called (see main.planner.plan_fetch):
+      - Intraday is skipped when to_date is before today, today is a weekend
+        or holiday, the session has not opened, or the unit is not minutes/hours.
+      - Historical is skipped when the range holds no closed trading session.
+      - If from_date is not provided, fetches max available range.
       - Duplicates/overlaps at day boundary are removed safely.
-      - Errors in intraday fetch won't break execution.
+    Errors from either endpoint are raised to the caller.
 
     Parameters
     ----------
@@ -190,6 +340,10 @@ def get_all_candles(symbol, exchange="NSE", unit="hours", interval=1, from_date=
         Start date for historical candles
     to_date : str/date/datetime, optional
         End date for historical candles (defaults to today)
+    use_store : bool
+        Serve closed sessions from the local candle store and only fetch
+        missing ranges (default True). See get_stored_historical_candle.
+        Either way, long ranges are fetched in concurrent API-legal windows.
 
     Returns
     -------
@@ -200,53 +354,57 @@ def get_all_candles(symbol, exchange="NSE", unit="hours", interval=1, from_date=
     """
 
     # -------------------------------
-    # Step 1: Normalize params
+    # Step 1: Normalize params and plan
     # -------------------------------
     unit = unit.lower()
     interval = int(interval)
 
-    # Default to_date = today
-    to_date = to_date or datetime.now(IST)
-    # Historical API already defaults from_date to earliest if None
-    # so no need to manually handle it
+    now = datetime.now(IST)
+    plan = planner.plan_fetch(
+        unit,
+        _as_date(from_date) if from_date is not None else None,
+        _as_date(to_date or now),
+        now
+    )
+    metrics.log_event("fetch_planned", logging.DEBUG, symbol=symbol, historical=plan.historical, intraday=plan.intraday)
+
+    frames = []
 
     # -------------------------------
-    # Step 2: Fetch historical data
+    # Step 2: Fetch historical data (closed sessions only)
     # -------------------------------
-    try:
-        hist_df = get_historical_candle(
+    if plan.historical is not None:
+        fetch_historical = get_stored_historical_candle if use_store else get_historical_candle_chunked
+        frames.append(fetch_historical(
             symbol,
             exchange=exchange,
             unit=unit,
             interval=interval,
-            from_date=from_date,
-            to_date=to_date
-        )
-    except Exception as e:
-        print(f"[Error] Failed to fetch historical data: {e}")
-        return pd.DataFrame()  # bail out completely, no continuity possible
+            from_date=plan.historical[0],
+            to_date=plan.historical[1]
+        ))
 
     # -------------------------------
-    # Step 3: Fetch intraday data (only for today, if supported)
+    # Step 3: Fetch intraday data (only for today's open session)
     # -------------------------------
-    intra_df = pd.DataFrame()  # default empty
-    if unit in ("minutes", "hours"):
-        try:
-            intra_df = get_intraday_candle(
-                symbol,
-                exchange=exchange,
-                unit=unit,
-                interval=interval
-            )
-        except Exception as e:
-            print(f"[Warning] Could not fetch intraday data: {e}")
-    else:
-        print(f"[Info] Intraday not supported for unit '{unit}', skipping intraday fetch.")
+    if plan.intraday:
+        frames.append(get_intraday_candle(
+            symbol,
+            exchange=exchange,
+            unit=unit,
+            interval=interval
+        ))
 
     # -------------------------------
     # Step 4: Merge & Clean
     # -------------------------------
-    combined = pd.concat([hist_df, intra_df])
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return decode.candles_to_frame([])
+    if len(frames) == 1:
+        return frames[0]
+
+    combined = pd.concat(frames)
 
     # Remove duplicates in case of overlap (boundary of today/yesterday)
     combined = combined[~combined.index.duplicated(keep="last")]
@@ -257,7 +415,6 @@ def get_all_candles(symbol, exchange="NSE", unit="hours", interval=1, from_date=
     return combined
 
 
-
 if __name__ == "__main__":
     # Example usage for intraday data (NBCC, NSE)
 
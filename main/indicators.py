@@ -2,6 +2,10 @@
 
 
 import pandas as pd
+import numpy as np
+from collections import deque
+
+from main import metrics
 
 def moving_average(df, period=14, MA="exponential", apply_to="close"):
     """
@@ -34,13 +38,407 @@ def moving_average(df, period=14, MA="exponential", apply_to="close"):
     price_series = df[apply_to]
 
     # Calculate moving average based on type
-    if MA.lower() == "simple":
-        # Simple Moving Average: mean of last 'period' values
-        ma_series = price_series.rolling(window=period, min_periods=1).mean()
-    elif MA.lower() == "exponential":
-        # Exponential Moving Average: more weight to recent prices
-        ma_series = price_series.ewm(span=period, adjust=False).mean()
-    else:
-        raise ValueError("MA must be either 'simple' or 'exponential'")
+    with metrics.timer("indicator_seconds", indicator="moving_average"):
+        if MA.lower() == "simple":
+            # Simple Moving Average: mean of last 'period' values
+            ma_series = price_series.rolling(window=period, min_periods=1).mean()
+        elif MA.lower() == "exponential":
+            # Exponential Moving Average: more weight to recent prices
+            ma_series = price_series.ewm(span=period, adjust=False).mean()
+        else:
+            raise ValueError("MA must be either 'simple' or 'exponential'")
 
     return ma_series
+
+
+def align_panel(frames, apply_to="close"):
+    """
+    Align a dict of candle DataFrames onto one (time x symbol) NumPy panel.
+
+    Parameters:
+    -----------
+    frames : dict[str, pd.DataFrame]
+        symbol -> candlestick dataframe indexed by timestamp (as returned by main.fetch)
+    apply_to : str, optional
+        Which price column to take: 'open', 'high', 'low', 'close' (default='close')
+
+    Returns:
+    --------
+    tuple (pd.DatetimeIndex, list[str], np.ndarray)
+        The sorted union of all timestamps, the symbols (column order) and a
+        float64 array of shape (len(index), len(symbols)). Timestamps where a
+        symbol has no candle are NaN.
+    """
+    if apply_to not in ["open", "high", "low", "close"]:
+        raise ValueError("apply_to must be one of 'open', 'high', 'low', 'close'")
+
+    symbols = list(frames)
+    if not symbols:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0))
+
+    # One concatenation and one indexer lookup for all symbols instead of one per symbol
+    first = frames[symbols[0]].index
+    stacked = first.append([frames[s].index for s in symbols[1:]])
+    index = stacked.unique().sort_values()
+
+    rows = index.get_indexer(stacked)
+    cols = np.repeat(np.arange(len(symbols)), [len(frames[s]) for s in symbols])
+    values = np.concatenate([frames[s][apply_to].to_numpy(dtype=np.float64) for s in symbols])
+
+    panel = np.full((len(index), len(symbols)), np.nan)
+    panel[rows, cols] = values
+
+    return index, symbols, panel
+
+
+def _compact(panel):
+    """
+    Move every column's non-NaN values to the top, keeping their order.
+
+    Returns the compacted panel, the permutation used (to scatter results back)
+    and the per-column count of valid values.
+    """
+    valid = ~np.isnan(panel)
+    if valid.all():
+        return panel, None, np.full(panel.shape[1:], panel.shape[0])
+    order = np.argsort(~valid, axis=0, kind="stable")
+    return np.take_along_axis(panel, order, axis=0), order, valid.sum(axis=0)
+
+
+def _scatter(compact_result, order, counts):
+    """Inverse of _compact: put results back at their original rows, NaN elsewhere."""
+    if order is None:
+        return compact_result
+    rows = np.arange(compact_result.shape[0])[:, None]
+    compact_result = np.where(rows < counts, compact_result, np.nan)
+    out = np.empty_like(compact_result)
+    np.put_along_axis(out, order, compact_result, axis=0)
+    return out
+
+
+def _ema_compact(compact, alpha):
+    """
+    EMA with adjust=False down the rows of a compacted panel (one pass over time, all columns at once).
+
+    `alpha` may be an array that broadcasts against a row, e.g. rows of shape
+    (symbols, 1) with alphas of shape (periods,) give a (time, symbols, periods) result.
+    """
+    row_shape = np.broadcast_shapes(compact.shape[1:], np.shape(alpha))
+    out = np.empty((compact.shape[0],) + row_shape)
+    if compact.shape[0] == 0:
+        return out
+    weighted = np.broadcast_to(compact[0], row_shape).astype(np.float64)
+    out[0] = weighted
+    for t in range(1, compact.shape[0]):
+        weighted += alpha * (compact[t] - weighted)
+        out[t] = weighted
+    return out
+
+
+def _sma_compact(compact, counts, period):
+    """Rolling mean with min_periods=1 down the rows of a compacted panel."""
+    rows = np.arange(compact.shape[0])[:, None]
+    filled = np.where(rows < counts, compact, 0.0)
+    csum = np.cumsum(filled, axis=0)
+    shifted = np.zeros_like(csum)
+    shifted[period:] = csum[:-period]
+    window = np.minimum(rows + 1, period)
+    return (csum - shifted) / window
+
+
+def moving_average_panel(panel, period=14, MA="exponential", apply_to="close"):
+    """
+    Calculate a moving average (SMA or EMA) for many symbols in one vectorized pass.
+
+    Each column is treated as its own series: NaN cells (ragged starts,
+    missing candles after alignment) are skipped, so every column matches
+    moving_average() on that symbol's own DataFrame to float tolerance.
+
+    Parameters:
+    -----------
+    panel : np.ndarray | dict[str, pd.DataFrame]
+        Either a (time x symbol) float array, NaN-padded, or a dict of
+        symbol -> candlestick dataframe which is aligned with align_panel().
+    period : int, optional
+        Number of candlesticks to consider for moving average (default=14)
+    MA : str, optional
+        Type of moving average: 'simple' or 'exponential' (default='exponential')
+    apply_to : str, optional
+        Price column to use when `panel` is a dict (default='close')
+
+    Returns:
+    --------
+    np.ndarray | pd.DataFrame
+        Same shape as the input panel with NaN where the input is NaN.
+        A DataFrame (timestamp index, one column per symbol) when a dict was passed.
+    """
+    index = symbols = None
+    if isinstance(panel, dict):
+        index, symbols, panel = align_panel(panel, apply_to=apply_to)
+
+    values = np.asarray(panel, dtype=np.float64)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+
+    with metrics.timer("indicator_seconds", indicator="moving_average_panel"):
+        compact, order, counts = _compact(values)
+
+        if MA.lower() == "simple":
+            result = _sma_compact(compact, counts, period)
+        elif MA.lower() == "exponential":
+            result = _ema_compact(compact, 2.0 / (period + 1.0))
+        else:
+            raise ValueError("MA must be either 'simple' or 'exponential'")
+
+        result = _scatter(result, order, counts)
+    if squeeze:
+        result = result[:, 0]
+
+    if symbols is not None:
+        return pd.DataFrame(result, index=index, columns=symbols)
+    return result
+
+
+def ema_bank(data, periods, apply_to="close"):
+    """
+    Calculate several EMAs (adjust=False) of the same price series in one pass.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame | np.ndarray | dict[str, pd.DataFrame]
+        A candlestick dataframe, a 1D price array, a (time x symbol) NaN-padded
+        panel, or a dict of symbol -> candlestick dataframe (aligned with align_panel()).
+    periods : sequence of int
+        EMA periods to compute
+    apply_to : str, optional
+        Price column to use for DataFrame/dict input (default='close')
+
+    Returns:
+    --------
+    np.ndarray
+        Shape (time, periods) for a single series, (time, symbol, periods) for a panel.
+        Column k of the last axis equals moving_average(df, periods[k]) for that symbol;
+        NaN where the input is NaN.
+    """
+    if isinstance(data, pd.DataFrame):
+        if apply_to not in ["open", "high", "low", "close"]:
+            raise ValueError("apply_to must be one of 'open', 'high', 'low', 'close'")
+        data = data[apply_to].to_numpy(dtype=np.float64)
+    elif isinstance(data, dict):
+        data = align_panel(data, apply_to=apply_to)[2]
+
+    values = np.asarray(data, dtype=np.float64)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+
+    alphas = 2.0 / (np.asarray(periods, dtype=np.float64) + 1.0)
+    with metrics.timer("indicator_seconds", indicator="ema_bank"):
+        compact, order, counts = _compact(values)
+        bank = _ema_compact(compact[:, :, None], alphas)
+
+        # Scatter each period's slice back to the original rows
+        if order is not None:
+            bank = np.stack([_scatter(bank[:, :, k], order, counts) for k in range(len(alphas))], axis=-1)
+
+    return bank[:, 0, :] if squeeze else bank
+
+
+def ema_clusters(bank, accuracy=0.2, size=3):
+    """
+    Flag the timestamps where at least `size` EMAs lie within an `accuracy` percent band.
+
+    For every timestamp the EMA values are sorted and every run of `size`
+    neighbours is checked: a cluster exists if (highest - lowest) / lowest * 100
+    <= accuracy for any such run.
+
+    Parameters:
+    -----------
+    bank : np.ndarray
+        Output of ema_bank(): EMA periods on the last axis.
+    accuracy : float, optional
+        Band width as a percentage of the lowest EMA in the run (default=0.2)
+    size : int, optional
+        Number of EMAs that must cluster, e.g. 3 or 4 (default=3)
+
+    Returns:
+    --------
+    np.ndarray
+        Boolean array of shape bank.shape[:-1].
+    """
+    n = bank.shape[-1]
+    if size > n:
+        raise ValueError(f"size ({size}) cannot exceed the number of EMA periods ({n})")
+
+    ordered = np.sort(bank, axis=-1)  # NaNs sort last and never form a cluster
+    low = ordered[..., : n - size + 1]
+    high = ordered[..., size - 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spread = (high - low) / np.abs(low) * 100.0
+    return (spread <= accuracy).any(axis=-1)
+
+
+def find_ema_clusters(df, periods, accuracy=0.2, size=3, apply_to="close"):
+    """
+    Return the timestamps of a candlestick DataFrame where `size` of the
+    EMAs in `periods` cluster within `accuracy` percent.
+
+    Returns:
+    --------
+    pd.DatetimeIndex
+    """
+    mask = ema_clusters(ema_bank(df, periods=periods, apply_to=apply_to), accuracy=accuracy, size=size)
+    return df.index[mask]
+
+
+class StreamingMovingAverage:
+    """
+    Stateful SMA/EMA that is updated one candle at a time.
+
+    Uses the same semantics as moving_average(): EMA with adjust=False
+    (alpha = 2 / (period + 1)) and SMA as a rolling mean with min_periods=1.
+    Each update is O(1) in the length of the history.
+
+    Typical use:
+        ema = StreamingMovingAverage.from_dataframe(df, period=20)
+        ema.update(candle_close, timestamp=candle_time)   # new candle -> append
+        ema.update(new_close, timestamp=candle_time)      # same timestamp -> revise
+
+    Parameters:
+    -----------
+    period : int, optional
+        Number of candlesticks to consider for moving average (default=14)
+    MA : str, optional
+        Type of moving average: 'simple' or 'exponential' (default='exponential')
+    apply_to : str, optional
+        Price column used by seed() and update_candle(): 'open', 'high', 'low', 'close' (default='close')
+    """
+
+    def __init__(self, period=14, MA="exponential", apply_to="close"):
+        if apply_to not in ["open", "high", "low", "close"]:
+            raise ValueError("apply_to must be one of 'open', 'high', 'low', 'close'")
+        if MA.lower() not in ("simple", "exponential"):
+            raise ValueError("MA must be either 'simple' or 'exponential'")
+
+        self.period = int(period)
+        self.MA = MA.lower()
+        self.apply_to = apply_to
+        self.alpha = 2.0 / (self.period + 1.0)
+
+        self.count = 0            # candles seen so far
+        self.timestamp = None     # timestamp of the latest (possibly still forming) candle
+        self.value = None         # moving average including the latest candle
+        self._prev_value = None   # EMA before the latest candle, used to revise it
+        self._window = deque(maxlen=self.period)  # SMA: last `period` prices
+        self._sum = 0.0
+
+    @classmethod
+    def from_dataframe(cls, df, period=14, MA="exponential", apply_to="close"):
+        """Create an instance seeded from a historical candlestick DataFrame."""
+        state = cls(period=period, MA=MA, apply_to=apply_to)
+        state.seed(df)
+        return state
+
+    def seed(self, df):
+        """
+        Reset the state from a full candlestick DataFrame.
+
+        The resulting value equals moving_average(df, ...).iloc[-1].
+        """
+        prices = df[self.apply_to].dropna()
+        self.__init__(self.period, self.MA, self.apply_to)
+        if prices.empty:
+            return self
+
+        self.count = len(prices)
+        self.timestamp = prices.index[-1]
+
+        if self.MA == "exponential":
+            ema = prices.ewm(span=self.period, adjust=False).mean()
+            self.value = float(ema.iloc[-1])
+            self._prev_value = float(ema.iloc[-2]) if len(ema) > 1 else None
+        else:
+            self._window.extend(prices.iloc[-self.period:].tolist())
+            self._sum = sum(self._window)
+            self.value = self._sum / len(self._window)
+        return self
+
+    def update(self, price, timestamp=None):
+        """
+        Feed one candle's price.
+
+        If `timestamp` equals the timestamp of the latest candle, that candle
+        is still forming and is revised in place; otherwise a new candle is appended.
+
+        :return: the updated moving average value
+        """
+        if timestamp is not None and self.timestamp is not None and timestamp == self.timestamp:
+            return self.revise(price)
+
+        price = float(price)
+        self.count += 1
+        self.timestamp = timestamp
+
+        if self.MA == "exponential":
+            self._prev_value = self.value
+            self.value = price if self._prev_value is None else self._prev_value + self.alpha * (price - self._prev_value)
+        else:
+            if len(self._window) == self.period:
+                self._sum -= self._window[0]
+            self._window.append(price)
+            self._sum += price
+            self.value = self._sum / len(self._window)
+        return self.value
+
+    def update_candle(self, candle, timestamp=None):
+        """Feed a candle row (dict or pandas Series with an `apply_to` field)."""
+        if timestamp is None:
+            timestamp = getattr(candle, "name", None)
+        return self.update(candle[self.apply_to], timestamp=timestamp)
+
+    def revise(self, price):
+        """
+        Replace the price of the latest candle (a still-forming intraday candle).
+
+        :return: the updated moving average value
+        """
+        if self.count == 0:
+            raise ValueError("No candle to revise; call update() first")
+
+        price = float(price)
+        if self.MA == "exponential":
+            self.value = price if self._prev_value is None else self._prev_value + self.alpha * (price - self._prev_value)
+        else:
+            self._sum += price - self._window[-1]
+            self._window[-1] = price
+            self.value = self._sum / len(self._window)
+        return self.value
+
+    def to_dict(self):
+        """Return a JSON-serializable snapshot of the state."""
+        return {
+            "period": self.period,
+            "MA": self.MA,
+            "apply_to": self.apply_to,
+            "count": self.count,
+            "timestamp": None if self.timestamp is None else pd.Timestamp(self.timestamp).isoformat(),
+            "value": self.value,
+            "prev_value": self._prev_value,
+            "window": list(self._window),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an instance from to_dict() output."""
+        state = cls(period=data["period"], MA=data["MA"], apply_to=data["apply_to"])
+        state.count = data["count"]
+        state.timestamp = None if data["timestamp"] is None else pd.Timestamp(data["timestamp"])
+        state.value = data["value"]
+        state._prev_value = data["prev_value"]
+        state._window.extend(data["window"])
+        state._sum = sum(state._window)
+        return state
+
+    def __repr__(self):
+        return f"StreamingMovingAverage(period={self.period}, MA='{self.MA}', value={self.value}, count={self.count})"
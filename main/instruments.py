@@ -0,0 +1,156 @@
+#PURPOSE OF THIS FILE : keep the Upstox instrument master (resources/keys.json) in memory
+#as a set of lookup indexes so symbol resolution does not re-read the file on every call.
+
+
+import json
+import os
+import threading
+from pathlib import Path
+
+KEYS_FILE = Path(__file__).parent / "resources" / "keys.json"
+
+_lock = threading.Lock()
+_index = None
+
+
+class InstrumentIndex:
+    """
+    In-memory view of the instrument master.
+
+    Attributes:
+    -----------
+    path : Path
+        File the index was built from.
+    mtime : float
+        Modification time of `path` when it was loaded.
+    instruments : list[dict]
+        Raw instrument dictionaries, in file order.
+    by_symbol : dict[(str, str), dict]
+        (SYMBOL, EXCHANGE) -> instrument, both upper-cased and stripped.
+        The first match in file order wins, like the old linear scan.
+    by_type : dict[str, list[dict]]
+        instrument_type -> instruments of that type.
+    by_exchange : dict[str, list[dict]]
+        exchange -> instruments listed on it. Prefix filters (e.g. 'NSE'
+        matching 'NSE' and 'NSE_EQ') walk the handful of exchange names
+        instead of every instrument.
+    """
+
+    def __init__(self, path, mtime, instruments):
+        self.path = path
+        self.mtime = mtime
+        self.instruments = instruments
+        self.by_symbol = {}
+        self.by_type = {}
+        self.by_exchange = {}
+        self._type_positions = {}
+
+        for pos, instrument in enumerate(instruments):
+            trading_symbol = (instrument.get("trading_symbol") or instrument.get("asset_symbol") or "").strip().upper()
+            exchange = (instrument.get("exchange") or "").strip().upper()
+            self.by_symbol.setdefault((trading_symbol, exchange), instrument)
+
+            instr_type = instrument.get("instrument_type")
+            if instr_type:
+                self.by_type.setdefault(instr_type, []).append(instrument)
+                self._type_positions.setdefault(instr_type, []).append(pos)
+
+            raw_exchange = instrument.get("exchange")
+            if raw_exchange:
+                self.by_exchange.setdefault(raw_exchange, []).append(instrument)
+
+    def lookup(self, symbol, exchange="NSE"):
+        """Return the instrument dict for (symbol, exchange), or None."""
+        return self.by_symbol.get((symbol.strip().upper(), exchange.strip().upper()))
+
+    def exchanges_with_prefix(self, prefixes):
+        """Return the exchange names starting with any of `prefixes` (None means all)."""
+        if prefixes is None:
+            return list(self.by_exchange)
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        return [name for name in self.by_exchange if any(name.startswith(p) for p in prefixes)]
+
+    def filter(self, instrument_types=None, exchanges=None):
+        """
+        Return instruments matching any of `instrument_types` whose exchange
+        starts with any of `exchanges`. Either filter may be None to skip it.
+        Results keep file order.
+        """
+        if isinstance(instrument_types, str):
+            instrument_types = [instrument_types]
+
+        if instrument_types is None:
+            candidates = self.instruments
+        elif len(instrument_types) == 1:
+            candidates = self.by_type.get(instrument_types[0], [])
+        else:
+            # Merge the per-type buckets back into file order
+            positions = [pos for t in set(instrument_types) for pos in self._type_positions.get(t, [])]
+            candidates = [self.instruments[pos] for pos in sorted(positions)]
+
+        if exchanges is None:
+            return list(candidates)
+
+        allowed = set(self.exchanges_with_prefix(exchanges))
+        return [i for i in candidates if i.get("exchange") in allowed]
+
+
+def _load(path):
+    mtime = os.path.getmtime(path)
+    with open(path, "r", encoding="utf-8") as f:
+        instruments = json.load(f)
+
+    if not isinstance(instruments, list):
+        raise ValueError("Expected a list of instrument dictionaries in JSON file.")
+
+    return InstrumentIndex(Path(path), mtime, instruments)
+
+
+def get_index(path=None):
+    """
+    Return the process-wide InstrumentIndex, loading it on first use and
+    reloading it whenever the file's mtime changes.
+
+    :param path: optional path to an instrument master; defaults to KEYS_FILE
+    :return: InstrumentIndex
+    :raises FileNotFoundError: if the keys file does not exist
+    :raises json.JSONDecodeError: if the keys file is not valid JSON
+    """
+    global _index
+    path = Path(path or KEYS_FILE)
+
+    # Cheap stat on every call; the lock is only taken when a (re)load is needed
+    mtime = os.path.getmtime(path)
+    current = _index
+    if current is not None and current.path == path and current.mtime == mtime:
+        return current
+
+    with _lock:
+        current = _index
+        if current is None or current.path != path or current.mtime != os.path.getmtime(path):
+            _index = _load(path)
+        return _index
+
+
+def clear_index():
+    """Drop the cached index so the next call reloads from disk."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def resolve_keys(pairs, path=None):
+    """
+    Resolve many (symbol, exchange) pairs at once.
+
+    :param pairs: iterable of (symbol, exchange) tuples
+    :param path: optional path to an instrument master
+    :return: dict mapping each (symbol, exchange) pair to its instrument_key or None
+    """
+    index = get_index(path)
+    result = {}
+    for symbol, exchange in pairs:
+        instrument = index.lookup(symbol, exchange)
+        result[(symbol, exchange)] = instrument.get("instrument_key") if instrument else None
+    return result
@@ -0,0 +1,269 @@
+#PURPOSE OF THIS FILE : lightweight metrics (counters, timers) and structured log events for
+#the fetch, indicator and scan paths, with a Prometheus text exporter. Can be switched to no-op.
+
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+LOGGER_NAME = "yfin"
+logger = logging.getLogger(LOGGER_NAME)
+# Library default: events stay silent (rather than reaching stderr through
+# logging.lastResort) until the application calls configure_logging()
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+def _labels(pairs):
+    """Format label pairs as {k="v",...} with Prometheus escaping."""
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process metrics.
+
+    Counters and histograms are identified by name plus keyword labels:
+        registry.inc("http_requests_total", endpoint="historical", status=200)
+        with registry.timer("http_request_seconds", endpoint="historical"):
+            ...
+
+    When disabled every call returns immediately, so instrumentation can stay
+    in hot paths.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name, text):
+        """Set the HELP text exported for a metric."""
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        """Add `value` to a counter."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one observation (e.g. seconds) in a histogram."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timer(self, name, **labels):
+        """Context manager recording the elapsed seconds of its block in histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(name, labels)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def snapshot(self):
+        """
+        Return all metrics as plain data:
+        {"counters": {name: {labels: value}}, "histograms": {name: {labels: {"count", "sum"}}}}
+        where labels is a "k=v,k=v" string.
+        """
+        with self._lock:
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = value
+            histograms = {}
+            for (name, labels), hist in self._histograms.items():
+                histograms.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = {
+                    "count": hist.count, "sum": hist.sum,
+                }
+        return {"counters": counters, "histograms": histograms}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                by_name.setdefault(name, []).append((labels, value))
+            for name, series in by_name.items():
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+
+            by_name = {}
+            for (name, labels), hist in sorted(self._histograms.items(), key=lambda item: item[0]):
+                by_name.setdefault(name, []).append((labels, hist))
+            for name, series in by_name.items():
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, hist in series:
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {hist.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+# Process-wide registry used by main.fetch, main.client, main.indicators and the scanner
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+render_prometheus = REGISTRY.render_prometheus
+
+REGISTRY.describe("http_requests_total", "HTTP requests by endpoint and final status.")
+REGISTRY.describe("http_request_seconds", "HTTP request latency per attempt.")
+REGISTRY.describe("http_response_bytes_total", "Response body bytes received.")
+REGISTRY.describe("http_retries_total", "HTTP attempts retried after throttling or errors.")
+REGISTRY.describe("http_throttled_total", "HTTP 429 responses received.")
+REGISTRY.describe("requests_coalesced_total", "Requests answered by an identical request already in flight.")
+REGISTRY.describe("cache_requests_total", "Response cache lookups by result (hit/miss).")
+REGISTRY.describe("decode_seconds", "Time spent decoding candle payloads.")
+REGISTRY.describe("candles_decoded_total", "Candles decoded from API payloads.")
+REGISTRY.describe("indicator_seconds", "Time spent computing indicators.")
+REGISTRY.describe("scan_symbol_seconds", "Total time per scanned symbol.")
+REGISTRY.describe("scan_symbols_total", "Scanned symbols by outcome.")
+REGISTRY.describe("backtest_symbol_seconds", "Signal and forward-return evaluation time per backtested symbol.")
+REGISTRY.describe("watch_polls_total", "Incremental scan polls (main.daemon).")
+REGISTRY.describe("watch_bars_total", "New bars applied by incremental scan polls.")
+REGISTRY.describe("prescreen_stage_seconds", "Time per universe screening stage (main.prescreen).")
+REGISTRY.describe("token_requests_total", "Requests sent per access token of the token pool (main.tokens).")
+REGISTRY.describe("token_failures_total", "Access token responses that benched (401) or cooled down (429) a token.")
+REGISTRY.describe("chart_render_seconds", "Time to downsample and render one chart PNG (main.charts).")
+REGISTRY.describe("panel_rows_appended_total", "Time rows added to memory-mapped universe panels (main.panel).")
+
+
+def set_enabled(enabled):
+    """Turn metrics on or off; off makes inc/observe/timer no-ops. Log events follow logging levels."""
+    REGISTRY.enabled = bool(enabled)
+
+
+def enabled():
+    return REGISTRY.enabled
+
+
+# -------------------------------
+# Structured log events
+# -------------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event and any extra fields."""
+
+    def format(self, record):
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable "[LEVEL] event key=value ..." lines, close to the old print output."""
+
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        return f"[{record.levelname}] {record.getMessage()}" + (f" {fields}" if fields else "")
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """
+    Emit a structured log event on the 'yfin' logger.
+
+    :param event: short event name, e.g. "historical_fetch_failed"
+    :param level: logging level (default INFO)
+    :param fields: extra key/value pairs attached to the record
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def configure_logging(level=logging.INFO, json_lines=False, stream=None):
+    """
+    Attach a stderr handler to the 'yfin' logger (idempotent).
+
+    :param level: minimum level to emit
+    :param json_lines: emit JSON objects instead of text lines
+    :param stream: optional stream (default sys.stderr)
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter() if json_lines else TextFormatter())
+    for old in list(logger.handlers):
+        if getattr(old, "_yfin", False):
+            logger.removeHandler(old)
+    handler._yfin = True
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
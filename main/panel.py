@@ -0,0 +1,452 @@
+#PURPOSE OF THIS FILE : out-of-core candle store for a whole instrument universe - one
+#memory-mapped (time x instrument) float64 array per candle field on disk, appended to as
+#new bars arrive and sliced by time range and instrument without loading it into RAM.
+
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+import main.instruments
+import main.metrics
+import main.scanner
+from main import decode
+
+FIELDS = ["open", "high", "low", "close", "volume", "oi"]
+META_FILE = "meta.json"
+TIMESTAMPS_FILE = "timestamps.i8"
+MIN_CAPACITY = 1024  # rows preallocated on disk; capacity doubles when full
+
+
+def _field_file(field):
+    return f"{field}.f8"
+
+
+def _to_ns(index):
+    """IST DatetimeIndex -> int64 UTC nanoseconds."""
+    return index.tz_convert("UTC").as_unit("ns").asi8
+
+
+def _to_index(ns):
+    index = pd.DatetimeIndex(np.asarray(ns).view("datetime64[ns]")).tz_localize("UTC").tz_convert(decode.IST_OFFSET)
+    index.name = "timestamp"
+    return index
+
+
+def _positions(keys, selection):
+    """
+    Column positions for `selection` as a slice when it is a contiguous run (so
+    indexing stays a view), else as an integer array.
+    """
+    positions = np.asarray([keys[k] for k in selection], dtype=np.int64)
+    if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+        return slice(int(positions[0]), int(positions[0]) + len(positions))
+    return positions
+
+
+class UniversePanel:
+    """
+    Candles of many instruments on one shared time axis, stored as
+    memory-mapped arrays in a directory:
+
+        meta.json        unit, interval, instrument keys / symbols, row count
+        timestamps.i8    int64 UTC nanoseconds, one per row (ascending)
+        <field>.f8       float64 (capacity x instruments) per field in FIELDS;
+                         NaN where an instrument has no bar at that timestamp
+
+    Rows are time-major, so appending a bar for the whole universe is one
+    contiguous write per field at the end of each file. Files are
+    preallocated in chunks (capacity doubles when full) and meta.json is
+    rewritten last, so readers never see rows that are not written yet.
+    One process may write at a time; any number may read.
+
+    Create with UniversePanel.create() or from_instruments(), re-open with
+    UniversePanel(path) (mode 'r' for read-only).
+
+    Attributes:
+    -----------
+    path : Path
+        Panel directory
+    unit, interval : str, int
+        Candle timeframe of the panel
+    instrument_keys : list[str]
+        Instrument axis (column order)
+    symbols : list[tuple[str, str]]
+        (trading_symbol, exchange) per column
+    """
+
+    def __init__(self, path, mode="r+"):
+        if mode not in ("r", "r+"):
+            raise ValueError("mode must be 'r' or 'r+'")
+        self.path = Path(path)
+        self.mode = mode
+        with open(self.path / META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.unit = meta["unit"]
+        self.interval = meta["interval"]
+        self.instrument_keys = list(meta["instrument_keys"])
+        self.symbols = [tuple(pair) for pair in meta["symbols"]]
+        self.rows = meta["rows"]
+        self.capacity = meta["capacity"]
+        self.columns = {key: i for i, key in enumerate(self.instrument_keys)}
+        self.by_symbol = {pair: key for pair, key in zip(self.symbols, self.instrument_keys)}
+        self._map()
+
+    # -------------------------------
+    # Creation
+    # -------------------------------
+    @classmethod
+    def create(cls, path, instrument_keys, symbols=None, unit="hours", interval=1, capacity=MIN_CAPACITY):
+        """
+        Create an empty panel directory.
+
+        Parameters:
+        -----------
+        path : str | Path
+            Directory to create (must not already hold a panel)
+        instrument_keys : sequence of str
+            Instrument axis, e.g. 'NSE_EQ|INE002A01018'
+        symbols : sequence of (str, str), optional
+            (trading_symbol, exchange) per instrument key, needed by refresh()
+        unit, interval : str, int
+            Candle timeframe (default 1 hour)
+        capacity : int
+            Rows to preallocate (default MIN_CAPACITY)
+
+        Returns:
+        --------
+        UniversePanel
+            Opened in 'r+' mode
+        """
+        path = Path(path)
+        if (path / META_FILE).exists():
+            raise FileExistsError(f"{path} already holds a panel")
+        instrument_keys = list(instrument_keys)
+        if len(set(instrument_keys)) != len(instrument_keys):
+            raise ValueError("instrument_keys must be unique")
+        symbols = [tuple(pair) for pair in symbols] if symbols is not None else [(None, None)] * len(instrument_keys)
+        if len(symbols) != len(instrument_keys):
+            raise ValueError("symbols must have one (symbol, exchange) pair per instrument key")
+
+        os.makedirs(path, exist_ok=True)
+        capacity = max(int(capacity), 1)
+        width = max(len(instrument_keys), 1)
+        with open(path / TIMESTAMPS_FILE, "wb") as f:
+            f.truncate(capacity * 8)
+        for field in FIELDS:
+            with open(path / _field_file(field), "wb") as f:
+                f.truncate(capacity * width * 8)
+
+        cls._write_meta(path, {
+            "unit": unit,
+            "interval": int(interval),
+            "instrument_keys": instrument_keys,
+            "symbols": [list(pair) for pair in symbols],
+            "rows": 0,
+            "capacity": capacity,
+        })
+        return cls(path)
+
+    @classmethod
+    def from_instruments(cls, path, exchanges="NSE", instrument_types=("EQ", "SM"), unit="hours", interval=1,
+                         capacity=MIN_CAPACITY):
+        """Create a panel whose instrument axis is the matching instruments of the instrument master (file order)."""
+        index = main.instruments.get_index()
+        keys, symbols, seen = [], [], set()
+        for item in index.filter(instrument_types=list(instrument_types), exchanges=exchanges):
+            key = item.get("instrument_key")
+            if key and item.get("trading_symbol") and key not in seen:
+                seen.add(key)
+                keys.append(key)
+                symbols.append((item["trading_symbol"], item.get("exchange")))
+        return cls.create(path, keys, symbols, unit=unit, interval=interval, capacity=capacity)
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp = Path(path) / (META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, Path(path) / META_FILE)
+
+    # -------------------------------
+    # Memory maps
+    # -------------------------------
+    def _map(self):
+        width = max(len(self.instrument_keys), 1)
+        self._timestamps = np.memmap(self.path / TIMESTAMPS_FILE, dtype=np.int64, mode=self.mode,
+                                     shape=(self.capacity,))
+        self._fields = {
+            field: np.memmap(self.path / _field_file(field), dtype=np.float64, mode=self.mode,
+                             shape=(self.capacity, width))
+            for field in FIELDS
+        }
+
+    def _grow(self, rows):
+        """Extend the files so at least `rows` rows fit."""
+        if rows <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, rows)
+        width = max(len(self.instrument_keys), 1)
+        self.flush()
+        self._timestamps = self._fields = None
+        with open(self.path / TIMESTAMPS_FILE, "r+b") as f:
+            f.truncate(capacity * 8)
+        for field in FIELDS:
+            with open(self.path / _field_file(field), "r+b") as f:
+                f.truncate(capacity * width * 8)
+        self.capacity = capacity
+        self._map()
+
+    def flush(self):
+        """Write the mapped arrays and meta.json to disk."""
+        if self.mode == "r":
+            return
+        self._timestamps.flush()
+        for values in self._fields.values():
+            values.flush()
+        self._write_meta(self.path, {
+            "unit": self.unit,
+            "interval": self.interval,
+            "instrument_keys": self.instrument_keys,
+            "symbols": [list(pair) for pair in self.symbols],
+            "rows": self.rows,
+            "capacity": self.capacity,
+        })
+
+    def close(self):
+        self.flush()
+        self._timestamps = self._fields = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.rows
+
+    def __repr__(self):
+        return (f"UniversePanel({str(self.path)!r}, unit={self.unit!r}, interval={self.interval}, "
+                f"instruments={len(self.instrument_keys)}, rows={self.rows})")
+
+    # -------------------------------
+    # Appends
+    # -------------------------------
+    def append(self, frames):
+        """
+        Write candles of many instruments. Bars newer than the last stored
+        timestamp become new rows (NaN for instruments without that bar);
+        bars at an existing timestamp overwrite it, e.g. a re-fetched
+        in-progress bar.
+
+        Parameters:
+        -----------
+        frames : dict
+            instrument_key or (symbol, exchange) -> candle DataFrame (as returned by main.fetch)
+
+        Returns:
+        --------
+        int
+            Rows added
+
+        Raises:
+        -------
+        KeyError
+            For an instrument not on the panel's axis
+        ValueError
+            For a bar older than the last row that is not already on the time axis
+        """
+        if self.mode == "r":
+            raise ValueError("panel is open read-only")
+        frames = {self._key(k): df for k, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return 0
+
+        stamps = {key: _to_ns(df.index) for key, df in frames.items()}
+        existing = self._timestamps[:self.rows]
+        last = existing[-1] if self.rows else np.iinfo(np.int64).min
+        new = np.unique(np.concatenate([ns[ns > last] for ns in stamps.values()]))
+        for key, ns in stamps.items():
+            old = ns[ns <= last]
+            if len(old) and not np.isin(old, existing).all():
+                raise ValueError(f"{key}: bars older than the panel's last row are missing from its time axis")
+
+        start = self.rows
+        self._grow(start + len(new))
+        self._timestamps[start:start + len(new)] = new
+        for values in self._fields.values():
+            values[start:start + len(new)] = np.nan
+        self.rows = start + len(new)
+
+        timestamps = self._timestamps[:self.rows]
+        for key, df in frames.items():
+            rows = np.searchsorted(timestamps, stamps[key])
+            column = self.columns[key]
+            for field in FIELDS:
+                self._fields[field][rows, column] = df[field].to_numpy(dtype=np.float64) if field in df else 0.0
+
+        self.flush()
+        main.metrics.inc("panel_rows_appended_total", len(new))
+        return len(new)
+
+    def _key(self, item):
+        if isinstance(item, tuple):
+            if item not in self.by_symbol:
+                raise KeyError(f"{item} is not on the panel's instrument axis")
+            return self.by_symbol[item]
+        if item not in self.columns:
+            raise KeyError(f"{item} is not on the panel's instrument axis")
+        return item
+
+    def last_rows(self, field="close", block=4096):
+        """
+        Row of every instrument's latest bar (-1 for instruments without any),
+        scanning back from the end `block` rows at a time so only the tail of
+        the file is read while every instrument is current.
+        """
+        width = len(self.instrument_keys)
+        last = np.full(width, -1, dtype=np.int64)
+        values = self._fields[field]
+        end = self.rows
+        while end > 0 and (last < 0).any():
+            start = max(0, end - block)
+            valid = ~np.isnan(values[start:end, :width])
+            found = valid.any(axis=0) & (last < 0)
+            # Last valid row per column: flip, argmax finds the first True from the end
+            last[found] = end - 1 - np.argmax(valid[::-1, found], axis=0)
+            end = start
+        return last
+
+    def refresh(self, to_date=None, from_date=None, workers=main.scanner.DEFAULT_WORKERS):
+        """
+        Fetch every instrument's bars since its own latest bar through
+        main.fetch.get_all_candles and append them. Instruments without any
+        bar yet (new to the panel, or failing on every earlier refresh) are
+        fetched from `from_date`, or from the panel's first row; their bars
+        older than the last row are kept where the time axis has that row.
+        `from_date` is required for an empty panel.
+
+        :return: (rows added, errors dict of (symbol, exchange) -> exception)
+        """
+        to_date = to_date or datetime.now(decode.IST_OFFSET)
+        if not self.rows and from_date is None:
+            raise ValueError("from_date is required to fill an empty panel")
+
+        starts = {}
+        if self.rows:
+            index = self.index
+            backfill_from = from_date or index[0].date()
+            for pair, row in zip(self.symbols, self.last_rows()):
+                starts[pair] = index[row].date() if row >= 0 else backfill_from
+
+        pairs = [pair for pair in self.symbols if pair[0] is not None]
+        results, errors = main.scanner.scan(pairs, lambda pair: main.fetch.get_all_candles(
+            pair[0], exchange=pair[1], unit=self.unit, interval=self.interval,
+            from_date=starts.get(pair, from_date), to_date=to_date
+        ), workers=workers)
+        for (symbol, _), e in errors.items():
+            main.metrics.log_event("symbol_failed", logging.ERROR, symbol=symbol, error=e)
+
+        frames = {r.item: self._on_axis(r.item, r.value) for r in results if r.ok}
+        added = self.append(frames)
+        main.metrics.log_event("panel_refreshed", rows=added, total_rows=self.rows, errors=len(errors))
+        return added, errors
+
+    def _on_axis(self, pair, df):
+        """df without bars older than the last row that the time axis has no row for (append() rejects those)."""
+        if not self.rows or df is None or df.empty:
+            return df
+        existing = self._timestamps[:self.rows]
+        ns = _to_ns(df.index)
+        keep = (ns > existing[-1]) | np.isin(ns, existing)
+        if not keep.all():
+            main.metrics.log_event("panel_bars_dropped", logging.WARNING, symbol=pair[0], bars=int((~keep).sum()))
+        return df[keep]
+
+    # -------------------------------
+    # Views
+    # -------------------------------
+    @property
+    def index(self):
+        """Time axis as an IST DatetimeIndex."""
+        return _to_index(self._timestamps[:self.rows])
+
+    def rows_between(self, start=None, end=None):
+        """Row slice covering timestamps in [start, end] (datetimes or dates; None = open-ended)."""
+        timestamps = self._timestamps[:self.rows]
+        lo, hi = 0, self.rows
+        if start is not None:
+            lo = int(np.searchsorted(timestamps, self._bound(start, False), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(timestamps, self._bound(end, True), side="right"))
+        return slice(lo, max(lo, hi))
+
+    @staticmethod
+    def _bound(value, end):
+        stamp = pd.Timestamp(value)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize(decode.IST_OFFSET)
+        if end and stamp == stamp.normalize() and not isinstance(value, (datetime, pd.Timestamp)):
+            stamp += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")  # a date includes that whole day
+        return stamp.tz_convert("UTC").as_unit("ns").value
+
+    def window(self, field="close", start=None, end=None, instruments=None):
+        """
+        A (time x instrument) block of one field.
+
+        The result is a view of the memory map (nothing is read until it is
+        used) when `instruments` is None or a contiguous run of the axis;
+        other instrument subsets are gathered into a copy of just that window.
+
+        Parameters:
+        -----------
+        field : str
+            One of FIELDS (default 'close')
+        start, end : datetime | date | str, optional
+            Inclusive time range (default: all rows)
+        instruments : sequence, optional
+            instrument_keys or (symbol, exchange) pairs (default: all)
+
+        Returns:
+        --------
+        tuple (pd.DatetimeIndex, list[str], np.ndarray)
+            Same shape as main.indicators.align_panel(), so the array can go
+            straight to moving_average_panel() or ema_bank()
+        """
+        if field not in FIELDS:
+            raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+        rows = self.rows_between(start, end)
+        values = self._fields[field][:self.rows][rows, :len(self.instrument_keys)]
+        keys = self.instrument_keys
+        if instruments is not None:
+            keys = [self._key(item) for item in instruments]
+            values = values[:, _positions(self.columns, keys)]
+        return _to_index(self._timestamps[rows]), list(keys), values
+
+    def frame(self, instrument, start=None, end=None):
+        """
+        One instrument's candles as a DataFrame in main.fetch's format (rows
+        where it has no bar are dropped).
+        """
+        column = self.columns[self._key(instrument)]
+        rows = self.rows_between(start, end)
+        data = {field: self._fields[field][rows, column] for field in FIELDS}
+        df = pd.DataFrame(data, index=_to_index(self._timestamps[rows]))
+        return df[~np.isnan(df["close"].to_numpy())]
+
+    def frames(self, instruments=None, start=None, end=None):
+        """dict of instrument_key -> frame() for `instruments` (default: all with data)."""
+        keys = self.instrument_keys if instruments is None else [self._key(item) for item in instruments]
+        out = {}
+        for key in keys:
+            df = self.frame(key, start, end)
+            if instruments is not None or not df.empty:
+                out[key] = df
+        return out
@@ -0,0 +1,248 @@
+#PURPOSE OF THIS FILE : evaluate scan conditions on a process pool. Candles are packed once
+#into shared memory so workers rebuild each DataFrame from views instead of unpickling it.
+
+
+import importlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from main import decode
+
+FIELDS = ["open", "high", "low", "close", "volume", "oi"]
+
+
+def _attach_block(name):
+    """
+    Open an existing shared memory block without registering it with the
+    resource tracker. Only the creator may unlink it; a tracker that saw an
+    attach would unlink it when that process exits (own tracker) or lose the
+    creator's registration on unregister (tracker shared with the pool).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedCandlePanel:
+    """
+    Candles of many symbols packed back to back in two shared-memory blocks:
+    an int64 array of UTC nanosecond timestamps and a float64 (rows x FIELDS) array.
+    `offsets[i]:offsets[i + 1]` are the rows of symbols[i].
+
+    Create it in the parent with from_frames(), hand `spec` to workers and
+    rebuild it there with attach(). The creator must call unlink() when done.
+    """
+
+    def __init__(self, symbols, offsets, ts_shm, values_shm, owner):
+        self.symbols = list(symbols)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._ts_shm = ts_shm
+        self._values_shm = values_shm
+        self._owner = owner
+
+        rows = int(self.offsets[-1]) if len(self.offsets) else 0
+        self.timestamps = np.ndarray((rows,), dtype=np.int64, buffer=ts_shm.buf)
+        self.values = np.ndarray((rows, len(FIELDS)), dtype=np.float64, buffer=values_shm.buf)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Pack a dict of symbol -> candle DataFrame (as returned by main.fetch) into shared memory.
+        """
+        symbols = list(frames)
+        lengths = [len(frames[s]) for s in symbols]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        rows = int(offsets[-1])
+
+        # Shared memory blocks cannot be empty
+        ts_shm = shared_memory.SharedMemory(create=True, size=max(rows * 8, 1))
+        values_shm = shared_memory.SharedMemory(create=True, size=max(rows * 8 * len(FIELDS), 1))
+        panel = cls(symbols, offsets, ts_shm, values_shm, owner=True)
+
+        for i, symbol in enumerate(symbols):
+            df = frames[symbol]
+            start, end = offsets[i], offsets[i + 1]
+            if start == end:
+                continue
+            panel.timestamps[start:end] = df.index.tz_convert("UTC").as_unit("ns").asi8
+            for j, field in enumerate(FIELDS):
+                panel.values[start:end, j] = df[field].to_numpy(dtype=np.float64) if field in df else 0.0
+        return panel
+
+    @property
+    def spec(self):
+        """Small picklable description used by attach()."""
+        return {
+            "symbols": self.symbols,
+            "offsets": self.offsets.tolist(),
+            "ts_name": self._ts_shm.name,
+            "values_name": self._values_shm.name,
+        }
+
+    @classmethod
+    def attach(cls, spec):
+        """Map an existing panel created by from_frames() in another process."""
+        ts_shm = _attach_block(spec["ts_name"])
+        values_shm = _attach_block(spec["values_name"])
+        return cls(spec["symbols"], spec["offsets"], ts_shm, values_shm, owner=False)
+
+    def frame(self, i):
+        """
+        Return symbols[i]'s candles as a DataFrame backed by the shared arrays.
+
+        Index: timestamp (datetime, IST); columns: open, high, low, close, volume, oi
+        """
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        index = pd.DatetimeIndex(self.timestamps[start:end].view("datetime64[ns]"))
+        index = index.tz_localize("UTC").tz_convert(decode.IST_OFFSET)
+        index.name = "timestamp"
+        return pd.DataFrame(self.values[start:end], index=index, columns=FIELDS, copy=False)
+
+    def close(self):
+        # Drop the NumPy views before closing the mmaps they point into
+        self.timestamps = self.values = None
+        self._ts_shm.close()
+        self._values_shm.close()
+
+    def unlink(self):
+        """Close and free the shared memory (creator only)."""
+        self.close()
+        if self._owner:
+            self._ts_shm.unlink()
+            self._values_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+
+def _resolve(condition):
+    """Accept a callable or a 'module:function' / 'module.function' string."""
+    if callable(condition):
+        return condition
+    module, _, name = condition.replace(":", ".").rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+# -------------------------------
+# Worker side
+# -------------------------------
+_worker_panel = None
+
+
+def _init_worker(spec):
+    global _worker_panel
+    _worker_panel = SharedCandlePanel.attach(spec)
+
+
+def _panel_for(spec):
+    """The worker's mapping of `spec`; a pool reused across panels re-attaches when the panel changes."""
+    global _worker_panel
+    if _worker_panel is None or _worker_panel._ts_shm.name != spec["ts_name"]:
+        if _worker_panel is not None:
+            _worker_panel.close()
+        _worker_panel = SharedCandlePanel.attach(spec)
+    return _worker_panel
+
+
+def _evaluate_chunk(spec, positions, conditions, kwargs):
+    """Run every condition on the given symbol positions; errors are returned, not raised."""
+    panel = _panel_for(spec)
+    conditions = [_resolve(c) for c in conditions]
+    out = []
+    for i in positions:
+        try:
+            df = panel.frame(i)
+            out.append((i, [c(df, **kwargs) for c in conditions], None))
+        except Exception as e:
+            out.append((i, None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def process_pool(processes=None):
+    """A process pool for evaluate_conditions(pool=...), reusable across many calls."""
+    return ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1)
+
+
+def evaluate_conditions(frames, conditions, processes=None, chunksize=None, pool=None, **kwargs):
+    """
+    Evaluate condition functions for every symbol on a process pool.
+
+    Candles are copied once into shared memory; each worker attaches to it on
+    its first task and rebuilds per-symbol DataFrames from views, so
+    DataFrames are never pickled. Only symbol positions and condition results
+    cross process boundaries. Empty frames are skipped.
+
+    Parameters:
+    -----------
+    frames : dict[str, pd.DataFrame]
+        symbol -> candle DataFrame
+    conditions : list
+        Module-level functions (or 'module:function' strings) called as
+        condition(df, **kwargs). Return values must be picklable.
+    processes : int, optional
+        Worker processes (default: os.cpu_count()); the size of `pool` when given
+    chunksize : int, optional
+        Symbols per task (default: spread evenly, about 4 tasks per worker)
+    pool : concurrent.futures.ProcessPoolExecutor, optional
+        Run on this pool (see process_pool()) instead of starting one for this
+        call, e.g. to evaluate many batches without respawning workers.
+        The caller shuts it down.
+    **kwargs
+        Passed to every condition, e.g. task="past", accuracy=0.2
+
+    Returns:
+    --------
+    tuple (dict, dict)
+        results: symbol -> list of condition results, in the input symbol order
+        errors: symbol -> error message for symbols whose evaluation raised
+    """
+    processes = processes or os.cpu_count() or 1
+    conditions = list(conditions)
+
+    with SharedCandlePanel.from_frames(frames) as panel:
+        positions = [i for i, s in enumerate(panel.symbols) if len(frames[s])]
+        if not positions:
+            return {}, {}
+
+        chunksize = chunksize or max(1, len(positions) // (processes * 4))
+        chunks = [positions[i:i + chunksize] for i in range(0, len(positions), chunksize)]
+        spec = panel.spec
+
+        merged = []
+        owned = pool is None
+        if owned:
+            pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(spec,))
+        try:
+            futures = [pool.submit(_evaluate_chunk, spec, chunk, conditions, kwargs) for chunk in chunks]
+            for future in futures:
+                merged.extend(future.result())
+        finally:
+            if owned:
+                pool.shutdown()
+
+        # Deterministic merge: input order regardless of which worker finished first
+        merged.sort(key=lambda item: item[0])
+        results = {}
+        errors = {}
+        for i, values, error in merged:
+            if error is None:
+                results[panel.symbols[i]] = values
+            else:
+                errors[panel.symbols[i]] = error
+        return results, errors
@@ -0,0 +1,378 @@
+#PURPOSE OF THIS FILE : compute several indicators on a candle DataFrame in one pass. The
+#declared indicators are planned into a dependency graph of intermediate series (EMAs,
+#rolling moments, true range, ...) so every shared intermediate is computed once.
+
+
+import numpy as np
+import pandas as pd
+
+from main import indicators, metrics
+
+PRICES = ("open", "high", "low", "close")
+
+
+# -------------------------------
+# Graph nodes
+# -------------------------------
+# A node is a hashable tuple (op, *args); args that are tuples are other nodes
+# (its dependencies). Equal tuples are the same intermediate, which is how
+# e.g. MACD's EMA 12 and a declared EMA(12) end up computed once.
+def _column(name):
+    return ("column", name)
+
+
+def _ewm(values, alpha):
+    """EMA with adjust=False over a 1D array, starting at its first non-NaN value."""
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid):
+        start = valid[0]
+        out[start:] = indicators._ema_compact(values[start:, None], alpha)[:, 0]
+    return out
+
+
+def _shift(values):
+    out = np.empty_like(values)
+    out[:1] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+
+def _rolling_moments(values, period):
+    """
+    Rolling mean and population variance over `period` rows (min_periods=1),
+    plus the window size, as a (3, n) array. Uses running sums of the values
+    centered on the first one, which keeps the variance accurate at price scale.
+    """
+    n = len(values)
+    centered = values - (values[0] if n else 0.0)
+    csum = np.cumsum(centered)
+    csq = np.cumsum(centered * centered)
+    prev_sum = np.zeros(n)
+    prev_sq = np.zeros(n)
+    prev_sum[period:] = csum[:-period]
+    prev_sq[period:] = csq[:-period]
+    count = np.minimum(np.arange(1, n + 1), period).astype(np.float64)
+    mean_c = (csum - prev_sum) / count
+    var = np.maximum((csq - prev_sq) / count - mean_c * mean_c, 0.0)
+    return np.stack([mean_c + (values[0] if n else 0.0), var, count])
+
+
+def _true_range(df):
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    prev_close = _shift(df["close"].to_numpy(dtype=np.float64))
+    ranges = np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    return np.nanmax(ranges, axis=0) if len(df) else high - low
+
+
+def _vwap(df, typical):
+    """Cumulative volume-weighted typical price, restarting every session (calendar day)."""
+    volume = df["volume"].to_numpy(dtype=np.float64)
+    cum_pv = np.cumsum(typical * volume)
+    cum_v = np.cumsum(volume)
+    if len(df):
+        days = df.index.normalize()
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        first = np.repeat(starts, np.diff(np.r_[starts, len(df)]))
+        before_pv = np.r_[0.0, cum_pv][first]
+        before_v = np.r_[0.0, cum_v][first]
+        cum_pv = cum_pv - before_pv
+        cum_v = cum_v - before_v
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+
+
+def _rsi(avg_gain, avg_loss):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100.0 * avg_gain / (avg_gain + avg_loss)
+
+
+def _std(moments, period):
+    return np.where(moments[2] >= period, np.sqrt(moments[1]), np.nan)
+
+
+# op -> function(df, *args) with node args replaced by their computed arrays
+_OPS = {
+    "column": lambda df, name: df[name].to_numpy(dtype=np.float64),
+    "ema": lambda df, values, span: _ewm(values, 2.0 / (span + 1)),
+    "rma": lambda df, values, period: _ewm(values, 1.0 / period),
+    "shift": lambda df, values: _shift(values),
+    "sub": lambda df, a, b: a - b,
+    "gain": lambda df, change: np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)),
+    "loss": lambda df, change: np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)),
+    "moments": lambda df, values, period: _rolling_moments(values, period),
+    "sma": lambda df, moments: moments[0],
+    "std": lambda df, moments, period: _std(moments, period),
+    "band": lambda df, mid, std, width: np.where(np.isnan(std), np.nan, mid + width * std),
+    "rsi": lambda df, avg_gain, avg_loss: _rsi(avg_gain, avg_loss),
+    "true_range": lambda df: _true_range(df),
+    "typical": lambda df, high, low, close: (high + low + close) / 3.0,
+    "vwap": lambda df, typical: _vwap(df, typical),
+}
+
+
+def _dependencies(node):
+    return [arg for arg in node[1:] if isinstance(arg, tuple)]
+
+
+def plan(nodes):
+    """
+    Order the nodes and all their intermediates so every node comes after its
+    dependencies, each exactly once.
+
+    Parameters:
+    -----------
+    nodes : iterable of tuple
+        Output nodes (see the indicator classes' columns())
+
+    Returns:
+    --------
+    list[tuple]
+        Nodes in evaluation order
+    """
+    order = []
+    seen = set()
+    for root in nodes:
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if node in seen:
+                continue
+            if node[0] not in _OPS:
+                raise ValueError(f"unknown pipeline op: {node[0]!r}")
+            seen.add(node)
+            stack.append((node, True))
+            stack.extend((dep, False) for dep in reversed(_dependencies(node)) if dep not in seen)
+    return order
+
+
+# -------------------------------
+# Indicators
+# -------------------------------
+def _price(apply_to):
+    if apply_to not in PRICES:
+        raise ValueError("apply_to must be one of 'open', 'high', 'low', 'close'")
+    return _column(apply_to)
+
+
+def _ema(apply_to, span):
+    return ("ema", _price(apply_to), int(span))
+
+
+def _moments(apply_to, period):
+    return ("moments", _price(apply_to), int(period))
+
+
+def _suffix(apply_to):
+    return "" if apply_to == "close" else f"_{apply_to}"
+
+
+class EMA:
+    """Exponential moving average, same values as moving_average(MA='exponential'). Column: ema_<period>."""
+
+    def __init__(self, period=14, apply_to="close", name=None):
+        self.period = period
+        self.apply_to = apply_to
+        self.name = name or f"ema_{period}{_suffix(apply_to)}"
+
+    def columns(self):
+        return {self.name: _ema(self.apply_to, self.period)}
+
+
+class SMA:
+    """Simple moving average, same values as moving_average(MA='simple'). Column: sma_<period>."""
+
+    def __init__(self, period=14, apply_to="close", name=None):
+        self.period = period
+        self.apply_to = apply_to
+        self.name = name or f"sma_{period}{_suffix(apply_to)}"
+
+    def columns(self):
+        return {self.name: ("sma", _moments(self.apply_to, self.period))}
+
+
+class MACD:
+    """
+    MACD line (EMA fast - EMA slow), its signal line (EMA of the MACD line)
+    and histogram. Columns: macd, macd_signal, macd_hist.
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9, apply_to="close", name="macd"):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.apply_to = apply_to
+        self.name = name
+
+    def columns(self):
+        line = ("sub", _ema(self.apply_to, self.fast), _ema(self.apply_to, self.slow))
+        signal = ("ema", line, int(self.signal))
+        return {
+            self.name: line,
+            f"{self.name}_signal": signal,
+            f"{self.name}_hist": ("sub", line, signal),
+        }
+
+
+class RSI:
+    """
+    Relative strength index with Wilder smoothing (EMA with alpha = 1/period)
+    of gains and losses; NaN on the first bar. Column: rsi_<period>.
+    """
+
+    def __init__(self, period=14, apply_to="close", name=None):
+        self.period = period
+        self.apply_to = apply_to
+        self.name = name or f"rsi_{period}{_suffix(apply_to)}"
+
+    def columns(self):
+        price = _price(self.apply_to)
+        change = ("sub", price, ("shift", price))
+        period = int(self.period)
+        return {self.name: ("rsi", ("rma", ("gain", change), period), ("rma", ("loss", change), period))}
+
+
+class ATR:
+    """Average true range with Wilder smoothing. Column: atr_<period>."""
+
+    def __init__(self, period=14, name=None):
+        self.period = period
+        self.name = name or f"atr_{period}"
+
+    def columns(self):
+        return {self.name: ("rma", ("true_range",), int(self.period))}
+
+
+class Bollinger:
+    """
+    Bollinger Bands: SMA `period` +/- `width` population standard deviations.
+    NaN until `period` bars are available. Columns: bb_<period>_mid, _upper, _lower.
+    """
+
+    def __init__(self, period=20, width=2.0, apply_to="close", name=None):
+        self.period = period
+        self.width = width
+        self.apply_to = apply_to
+        self.name = name or f"bb_{period}{_suffix(apply_to)}"
+
+    def columns(self):
+        moments = _moments(self.apply_to, self.period)
+        mid = ("sma", moments)
+        std = ("std", moments, int(self.period))
+        return {
+            f"{self.name}_mid": ("band", mid, std, 0.0),
+            f"{self.name}_upper": ("band", mid, std, float(self.width)),
+            f"{self.name}_lower": ("band", mid, std, -float(self.width)),
+        }
+
+
+class VWAP:
+    """Volume-weighted average typical price ((high + low + close) / 3), reset every session. Column: vwap."""
+
+    def __init__(self, name="vwap"):
+        self.name = name
+
+    def columns(self):
+        typical = ("typical", _column("high"), _column("low"), _column("close"))
+        return {self.name: ("vwap", typical)}
+
+
+INDICATORS = {
+    "ema": EMA,
+    "sma": SMA,
+    "macd": MACD,
+    "rsi": RSI,
+    "atr": ATR,
+    "bollinger": Bollinger,
+    "vwap": VWAP,
+}
+
+
+def _resolve(spec):
+    """An indicator instance, a name ('rsi') or a tuple of name and arguments (('bollinger', 20, 2))."""
+    if hasattr(spec, "columns"):
+        return spec
+    name, args = (spec, ()) if isinstance(spec, str) else (spec[0], tuple(spec[1:]))
+    if name.lower() not in INDICATORS:
+        raise ValueError(f"unknown indicator {name!r}; expected one of {', '.join(INDICATORS)}")
+    return INDICATORS[name.lower()](*args)
+
+
+# -------------------------------
+# Pipeline
+# -------------------------------
+class Pipeline:
+    """
+    A set of indicators computed together on candle DataFrames.
+
+    The plan is built once when the pipeline is created and reused for every
+    frame, so a scan can create one Pipeline and run it per symbol:
+
+        pipe = Pipeline([MACD(), RSI(14), ATR(14), Bollinger(20, 2), VWAP(), EMA(12)])
+        columns = pipe.run(df)                # EMA 12 is computed once for both MACD and EMA(12)
+
+    Parameters:
+    -----------
+    specs : iterable
+        Indicator instances (EMA, SMA, MACD, RSI, ATR, Bollinger, VWAP), names
+        ('rsi') or tuples of name and arguments (('bollinger', 20, 2))
+    """
+
+    def __init__(self, specs):
+        self.indicators = [_resolve(spec) for spec in specs]
+        self.outputs = {}
+        for indicator in self.indicators:
+            for column, node in indicator.columns().items():
+                if self.outputs.get(column, node) != node:
+                    raise ValueError(f"two indicators produce column {column!r}; pass name= to tell them apart")
+                self.outputs[column] = node
+        self.plan = plan(self.outputs.values())
+
+    def __repr__(self):
+        return f"Pipeline(columns={list(self.outputs)}, nodes={len(self.plan)})"
+
+    def compute(self, df):
+        """
+        Evaluate the plan on one candle DataFrame.
+
+        Returns:
+        --------
+        dict[str, np.ndarray]
+            column -> float64 array aligned with df's rows
+        """
+        values = {}
+        with metrics.timer("indicator_seconds", indicator="pipeline"):
+            for node in self.plan:
+                args = [values[arg] if isinstance(arg, tuple) else arg for arg in node[1:]]
+                values[node] = _OPS[node[0]](df, *args)
+        return {column: values[node] for column, node in self.outputs.items()}
+
+    def run(self, df, join=False):
+        """
+        Evaluate the plan on one candle DataFrame.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Candlestick dataframe as returned by main.fetch (VWAP and ATR also
+            need 'high', 'low' and 'volume')
+        join : bool, optional
+            Return df with the indicator columns appended (default False: only
+            the indicator columns)
+
+        Returns:
+        --------
+        pd.DataFrame
+            Indicator columns in declaration order, aligned with df's index
+        """
+        out = pd.DataFrame(self.compute(df), index=df.index)
+        return df.join(out) if join else out
+
+
+def compute(df, *specs, join=False):
+    """One-off Pipeline(specs).run(df, join); build a Pipeline to reuse the plan across frames."""
+    return Pipeline(specs).run(df, join=join)
@@ -0,0 +1,134 @@
+#PURPOSE OF THIS FILE : decide which Upstox v3 endpoints a candle request needs and split
+#historical requests into date windows the API accepts in a single call.
+
+
+from datetime import timedelta
+
+from main import sessions
+
+# Longest date range (in days) one historical-candle request may cover, per unit.
+# Upstox v3: minutes 1-15 -> 1 month, minutes > 15 and hours -> 1 quarter,
+# days -> 1 decade, weeks/months -> no limit.
+MAX_WINDOW_DAYS = {
+    "minutes": 30,
+    "hours": 90,
+    "days": 3650,
+    "weeks": None,
+    "months": None,
+}
+LONG_MINUTE_INTERVAL = 15
+LONG_MINUTE_WINDOW_DAYS = 90
+
+
+def max_window_days(unit, interval):
+    """
+    Return the longest range in days a single request may cover, or None for no limit.
+
+    :param unit: "minutes", "hours", "days", "weeks", "months"
+    :param interval: numeric interval
+    """
+    unit = unit.lower()
+    if unit not in MAX_WINDOW_DAYS:
+        raise ValueError("unit must be one of: minutes, hours, days, weeks, months")
+    if unit == "minutes" and int(interval) > LONG_MINUTE_INTERVAL:
+        return LONG_MINUTE_WINDOW_DAYS
+    return MAX_WINDOW_DAYS[unit]
+
+
+def plan_windows(unit, interval, from_date, to_date):
+    """
+    Split [from_date, to_date] (inclusive dates) into consecutive, non-overlapping
+    windows that each fit in one request.
+
+    :param unit: candle unit
+    :param interval: numeric interval
+    :param from_date: datetime.date start (inclusive)
+    :param to_date: datetime.date end (inclusive)
+    :return: list of (start, end) date tuples in chronological order
+    """
+    if from_date > to_date:
+        return []
+
+    span = max_window_days(unit, interval)
+    if span is None:
+        return [(from_date, to_date)]
+
+    windows = []
+    start = from_date
+    while start <= to_date:
+        end = min(start + timedelta(days=span - 1), to_date)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+class FetchPlan:
+    """
+    Endpoints a get_all_candles() request needs.
+
+    Attributes:
+    -----------
+    historical : tuple | None
+        (from_date, to_date) for the historical endpoint (from_date None = earliest
+        available), or None when the range holds no closed trading session.
+    intraday : bool
+        True when today's session is in range and has started, for minutes/hours units.
+    """
+
+    __slots__ = ("historical", "intraday")
+
+    def __init__(self, historical=None, intraday=False):
+        self.historical = historical
+        self.intraday = intraday
+
+    @property
+    def empty(self):
+        return self.historical is None and not self.intraday
+
+    def __repr__(self):
+        return f"FetchPlan(historical={self.historical!r}, intraday={self.intraday})"
+
+
+def _has_trading_day(from_date, to_date):
+    day = to_date
+    while day >= from_date:
+        if sessions.is_trading_day(day):
+            return True
+        day -= timedelta(days=1)
+    return False
+
+
+def plan_fetch(unit, from_date, to_date, now):
+    """
+    Work out which endpoints cover [from_date, to_date].
+
+    The historical endpoint never has today's session, so its range ends
+    yesterday at the latest and is dropped when it contains only weekends
+    and holidays (see main.sessions). The intraday endpoint (minutes/hours
+    only) is used when to_date reaches today, today is a trading day and
+    the session has opened.
+
+    :param unit: candle unit
+    :param from_date: datetime.date start (inclusive), or None for the earliest data
+    :param to_date: datetime.date end (inclusive)
+    :param now: timezone-aware datetime of the request
+    :return: FetchPlan
+    """
+    now = sessions.to_ist(now)
+    today = now.date()
+
+    intraday = (
+        unit in sessions.UNIT_MINUTES
+        and to_date >= today
+        and sessions.is_trading_day(today)
+        and now >= sessions.session_bounds(today)[0]
+    )
+
+    historical = None
+    end = min(to_date, today - timedelta(days=1))
+    if from_date is None:
+        historical = (None, end)
+    elif from_date <= end and _has_trading_day(from_date, end):
+        historical = (from_date, end)
+
+    return FetchPlan(historical, intraday)
@@ -0,0 +1,284 @@
+#PURPOSE OF THIS FILE : cheap first stages of the universe scan. Daily candles (served from
+#the local candle store after the first run) or a daily UniversePanel give per-symbol
+#liquidity / price / EMA-spread stats; vectorized filters shortlist the symbols that get
+#the hourly fetch and the full cluster check.
+
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+import main.indicators
+import main.metrics
+import main.scanner
+from main import sessions
+
+LOOKBACK_DAYS = 90               # calendar days of daily candles behind the stats
+TURNOVER_BARS = 20               # daily bars averaged for avg_turnover
+SPREAD_PERIODS = (9, 21, 50)     # daily EMAs compared by the coarse spread filter
+MIN_TURNOVER = 1e7               # rupees traded per day (close * volume), i.e. 1 crore
+MIN_PRICE = 10.0
+
+STAT_COLUMNS = ["symbol", "exchange", "bars", "last_close", "avg_turnover", "ema_spread"]
+
+
+class StageReport:
+    """Timing and survivor count of one screening stage."""
+
+    __slots__ = ("name", "seconds", "candidates", "survivors")
+
+    def __init__(self, name, seconds, candidates, survivors):
+        self.name = name
+        self.seconds = seconds
+        self.candidates = candidates
+        self.survivors = survivors
+
+    def __repr__(self):
+        return (f"StageReport({self.name!r}, seconds={self.seconds:.3f}, "
+                f"candidates={self.candidates}, survivors={self.survivors})")
+
+
+def log_stage(report):
+    """Emit a stage report as the prescreen_stage log event and metrics."""
+    main.metrics.observe("prescreen_stage_seconds", report.seconds, stage=report.name)
+    main.metrics.log_event("prescreen_stage", stage=report.name, seconds=round(report.seconds, 3),
+                           candidates=report.candidates, survivors=report.survivors)
+    return report
+
+
+class PrescreenResult:
+    """
+    Outcome of prescreen().
+
+    Attributes:
+    -----------
+    shortlist : list[tuple[str, str]]
+        (symbol, exchange) pairs that passed every stage, in input order
+    stats : pd.DataFrame
+        One row per input pair (STAT_COLUMNS); NaN where no daily data
+    reports : list[StageReport]
+        One per stage, in order
+    errors : dict
+        (symbol, exchange) -> exception for pairs whose daily fetch failed;
+        their stats are NaN, so they are not in the shortlist
+    """
+
+    def __init__(self, shortlist, stats, reports, errors=None):
+        self.shortlist = shortlist
+        self.stats = stats
+        self.reports = reports
+        self.errors = errors or {}
+
+    def __repr__(self):
+        return (f"PrescreenResult(shortlist={len(self.shortlist)}, stages={[r.name for r in self.reports]}, "
+                f"errors={len(self.errors)})")
+
+
+# -------------------------------
+# Stats
+# -------------------------------
+def _last_valid(values):
+    """Value at each column's last non-NaN row of a (time x symbol) array (NaN for empty columns)."""
+    valid = ~np.isnan(values)
+    if not len(values):
+        return np.full(values.shape[1:], np.nan)
+    last = values.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    out = np.take_along_axis(values, last[None, ...], axis=0)[0]
+    return np.where(valid.any(axis=0), out, np.nan)
+
+
+def stats_from_arrays(pairs, close, volume, periods=SPREAD_PERIODS, turnover_bars=TURNOVER_BARS):
+    """
+    Per-symbol screening stats from aligned (time x symbol) daily arrays.
+
+    Parameters:
+    -----------
+    pairs : list[tuple[str, str]]
+        (symbol, exchange) per column
+    close, volume : np.ndarray
+        NaN-padded daily closes and volumes, shape (days, len(pairs))
+    periods : sequence of int
+        Daily EMA periods for ema_spread
+    turnover_bars : int
+        Trailing rows averaged for avg_turnover
+
+    Returns:
+    --------
+    pd.DataFrame
+        STAT_COLUMNS: bars (daily candles), last_close, avg_turnover (mean
+        close * volume over the last `turnover_bars` rows) and ema_spread
+        (max - min of the daily EMAs at the last bar, percent of last_close)
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(-1, len(pairs))
+    volume = np.asarray(volume, dtype=np.float64).reshape(-1, len(pairs))
+    last_close = _last_valid(close)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        turnover = (close * volume)[-turnover_bars:]
+        counts = (~np.isnan(turnover)).sum(axis=0)
+        avg_turnover = np.where(counts > 0, np.nansum(turnover, axis=0) / np.maximum(counts, 1), np.nan)
+
+        bank = main.indicators.ema_bank(close, periods=periods)                     # (days, symbols, periods)
+        last_emas = np.stack([_last_valid(bank[:, :, k]) for k in range(len(periods))], axis=-1)
+        ema_spread = (last_emas.max(axis=-1) - last_emas.min(axis=-1)) / last_close * 100.0
+
+    return pd.DataFrame({
+        "symbol": [p[0] for p in pairs],
+        "exchange": [p[1] for p in pairs],
+        "bars": (~np.isnan(close)).sum(axis=0),
+        "last_close": last_close,
+        "avg_turnover": avg_turnover,
+        "ema_spread": ema_spread,
+    }, columns=STAT_COLUMNS)
+
+
+def _stats_window(to_date, lookback_days):
+    # Today's daily bar is incomplete and never comes from the candle store;
+    # ending at the last closed session keeps repeat runs off the API.
+    if to_date is None:
+        to_date = sessions.previous_trading_day(datetime.now(sessions.IST).date())
+    to_date = pd.Timestamp(to_date).date()
+    return to_date - timedelta(days=lookback_days), to_date
+
+
+def _align(frames, width, fields=("close", "volume")):
+    """Stack frames (column position -> candle DataFrame) into NaN-padded (days x width) arrays per field."""
+    if not frames:
+        return [np.full((0, width), np.nan) for _ in fields]
+    indexes = [df.index for df in frames.values()]
+    index = indexes[0].append(indexes[1:]).unique().sort_values()
+    out = [np.full((len(index), width), np.nan) for _ in fields]
+    for column, df in frames.items():
+        rows = index.get_indexer(df.index)
+        for values, field in zip(out, fields):
+            values[rows, column] = df[field].to_numpy(dtype=np.float64)
+    return out
+
+
+def daily_stats(pairs, to_date=None, lookback_days=LOOKBACK_DAYS, periods=SPREAD_PERIODS,
+                workers=main.scanner.DEFAULT_WORKERS):
+    """
+    stats_from_arrays() over `lookback_days` of daily candles fetched with
+    main.fetch.get_all_candles (closed sessions come from the candle store).
+
+    :return: (stats DataFrame, errors dict of pair -> exception)
+    """
+    pairs = list(pairs)
+    from_date, to_date = _stats_window(to_date, lookback_days)
+    results, errors = main.scanner.scan(pairs, lambda pair: main.fetch.get_all_candles(
+        pair[0], exchange=pair[1], unit="days", interval=1, from_date=from_date, to_date=to_date
+    ), workers=workers)
+    for (symbol, _), e in errors.items():
+        main.metrics.log_event("symbol_failed", logging.ERROR, symbol=symbol, error=e)
+
+    frames = {i: r.value for i, r in enumerate(results) if r.ok and not r.value.empty}
+    close, volume = _align(frames, len(pairs))
+    return stats_from_arrays(pairs, close, volume, periods), errors
+
+
+def panel_stats(panel, pairs=None, to_date=None, lookback_days=LOOKBACK_DAYS, periods=SPREAD_PERIODS):
+    """
+    stats_from_arrays() from a daily main.panel.UniversePanel instead of the API.
+
+    :param pairs: (symbol, exchange) pairs to report (default: the panel's whole axis)
+    """
+    if panel.unit != "days":
+        raise ValueError("panel_stats needs a panel of daily candles")
+    pairs = list(pairs) if pairs is not None else [p for p in panel.symbols if p[0] is not None]
+    from_date, to_date = _stats_window(to_date, lookback_days)
+    known = [p for p in pairs if p in panel.by_symbol]
+    _, _, close = panel.window("close", from_date, to_date, instruments=known)
+    _, _, volume = panel.window("volume", from_date, to_date, instruments=known)
+
+    columns = [i for i, p in enumerate(pairs) if p in panel.by_symbol]
+    full_close = np.full((close.shape[0], len(pairs)), np.nan)
+    full_volume = np.full_like(full_close, np.nan)
+    full_close[:, columns] = close
+    full_volume[:, columns] = volume
+    return stats_from_arrays(pairs, full_close, full_volume, periods)
+
+
+# -------------------------------
+# Stages
+# -------------------------------
+def stages(min_turnover=MIN_TURNOVER, min_price=MIN_PRICE, max_price=None, max_ema_spread=None, min_bars=1):
+    """
+    The vectorized filter stages as (name, function(stats) -> boolean mask)
+    pairs; None thresholds are skipped.
+    """
+    out = [("has_data", lambda s: s["bars"].to_numpy() >= min_bars)]
+    if min_turnover is not None:
+        out.append(("liquidity", lambda s: s["avg_turnover"].to_numpy() >= min_turnover))
+    if min_price is not None or max_price is not None:
+        low = -np.inf if min_price is None else min_price
+        high = np.inf if max_price is None else max_price
+        out.append(("price_band", lambda s: (s["last_close"].to_numpy() >= low) & (s["last_close"].to_numpy() <= high)))
+    if max_ema_spread is not None:
+        out.append(("ema_spread", lambda s: s["ema_spread"].to_numpy() <= max_ema_spread))
+    return out
+
+
+def prescreen(pairs, min_turnover=MIN_TURNOVER, min_price=MIN_PRICE, max_price=None, max_ema_spread=None,
+              lookback_days=LOOKBACK_DAYS, to_date=None, workers=main.scanner.DEFAULT_WORKERS, panel=None, stats=None):
+    """
+    Shortlist the (symbol, exchange) pairs worth a full hourly scan.
+
+    Stage 'daily_stats' fetches daily candles (or reads `panel`, or takes
+    precomputed `stats`), then each filter stage keeps the symbols meeting
+    its threshold. Every stage is reported through log_stage().
+
+    Parameters:
+    -----------
+    pairs : iterable of (str, str)
+        Candidate (symbol, exchange) pairs, e.g. from screener.extract_equity_symbols()
+    min_turnover : float | None
+        Minimum average daily close * volume (default MIN_TURNOVER)
+    min_price, max_price : float | None
+        Last close price band (default MIN_PRICE and no upper bound)
+    max_ema_spread : float | None
+        Maximum spread of the daily SPREAD_PERIODS EMAs in percent of the
+        close (default None: not applied)
+    lookback_days : int
+        Calendar days of daily candles behind the stats (default LOOKBACK_DAYS)
+    to_date : date, optional
+        Last day of the stats window (default: the last closed session)
+    workers : int
+        Threads for the daily fetch
+    panel : main.panel.UniversePanel, optional
+        Daily panel to read instead of fetching
+    stats : pd.DataFrame, optional
+        Precomputed stats for `pairs`, in order (STAT_COLUMNS)
+
+    Returns:
+    --------
+    PrescreenResult
+    """
+    pairs = list(pairs)
+    reports = []
+    errors = {}
+
+    start = time.perf_counter()
+    if stats is None:
+        if panel is not None:
+            stats = panel_stats(panel, pairs, to_date, lookback_days)
+        else:
+            stats, errors = daily_stats(pairs, to_date, lookback_days, workers=workers)
+    stats = stats.reset_index(drop=True)
+    if len(stats) != len(pairs):
+        raise ValueError(f"stats has {len(stats)} rows for {len(pairs)} pairs")
+    keep = np.ones(len(pairs), dtype=bool)
+    reports.append(log_stage(StageReport("daily_stats", time.perf_counter() - start, len(pairs), len(pairs))))
+
+    for name, test in stages(min_turnover, min_price, max_price, max_ema_spread):
+        start = time.perf_counter()
+        candidates = int(keep.sum())
+        with np.errstate(invalid="ignore"):
+            keep &= np.asarray(test(stats), dtype=bool)
+        reports.append(log_stage(StageReport(name, time.perf_counter() - start, candidates, int(keep.sum()))))
+
+    shortlist = [pair for pair, ok in zip(pairs, keep) if ok]
+    return PrescreenResult(shortlist, stats, reports, errors)
@@ -0,0 +1,114 @@
+#PURPOSE OF THIS FILE : sliding-window rate limiting so concurrent callers stay inside
+#the Upstox API request limits.
+
+
+import threading
+import time
+from collections import deque
+
+# Upstox standard API limits: (requests, window in seconds)
+UPSTOX_LIMITS = (
+    (50, 1.0),
+    (500, 60.0),
+    (2000, 1800.0),
+)
+
+
+class SlidingWindow:
+    """
+    At most `limit` requests in any `period` seconds, tracked as a log of
+    the times at which each granted request leaves the window. Unlike a
+    token bucket that starts full and refills at limit / period, a window
+    can never admit more than `limit` requests in one period (a full bucket
+    plus its refill admits close to twice that).
+
+    Not thread-safe on its own; RateLimiter serialises access.
+    """
+
+    __slots__ = ("limit", "period", "log")
+
+    def __init__(self, limit, period):
+        self.limit = int(limit)
+        self.period = float(period)
+        self.log = deque()
+
+    def _expire(self, now):
+        while self.log and self.log[0] <= now:
+            self.log.popleft()
+
+    def wait_time(self, now, tokens=1):
+        """Seconds until `tokens` more requests fit in the window (0 if they fit now)."""
+        if tokens > self.limit:
+            raise ValueError(f"{tokens} requests can never fit in a window of {self.limit}")
+        self._expire(now)
+        excess = len(self.log) + tokens - self.limit
+        if excess <= 0:
+            return 0.0
+        # Stored expiry times keep this strictly positive (no float round-off to 0)
+        return self.log[excess - 1] - now
+
+    def record(self, now, tokens=1):
+        self.log.extend([now + self.period] * tokens)
+
+    def remaining(self, now):
+        """Requests still admissible in the current window."""
+        self._expire(now)
+        return self.limit - len(self.log)
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter enforcing several sliding windows at once
+    (e.g. per-second, per-minute and per-30-minute limits). A request is let
+    through only when it fits in every window.
+
+    :param limits: iterable of (requests, period_seconds) tuples; defaults to UPSTOX_LIMITS
+    :param clock: monotonic time source (tests pass a fake clock)
+    :param sleep: sleep function matching `clock` (time.sleep for the real clock)
+    """
+
+    def __init__(self, limits=UPSTOX_LIMITS, clock=time.monotonic, sleep=time.sleep):
+        self.windows = [SlidingWindow(limit, period) for limit, period in limits]
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """
+        Record `tokens` requests in every window if they all fit.
+
+        :return: 0.0 on success, otherwise the number of seconds to wait before retrying
+        """
+        with self._lock:
+            now = self.clock()
+            wait = max((w.wait_time(now, tokens) for w in self.windows), default=0.0)
+            if wait > 0:
+                return wait
+            for w in self.windows:
+                w.record(now, tokens)
+            return 0.0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until `tokens` requests fit in every window.
+
+        :param timeout: optional maximum seconds to wait
+        :return: True if acquired, False if the timeout expired
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self.sleep(wait)
+
+    def budget(self):
+        """Fraction of the tightest window still available (1.0 when idle)."""
+        with self._lock:
+            now = self.clock()
+            return min((w.remaining(now) / w.limit for w in self.windows), default=1.0)
@@ -0,0 +1,132 @@
+#PURPOSE OF THIS FILE : derive coarser candles (15 min, hourly, daily, ...) locally from the
+#finest candles we fetched, instead of downloading every timeframe separately.
+
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+
+# NSE equity session opens at 09:15 IST; intraday bars are anchored there
+SESSION_OPEN_MINUTES = 9 * 60 + 15
+
+AGGREGATION = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "oi": "last",
+}
+
+_UNIT_MINUTES = {"minutes": 1, "hours": 60}
+
+
+def _group_trading_periods(period_start, interval):
+    """Merge every `interval` consecutive distinct period starts into one group key."""
+    if interval == 1:
+        return period_start
+    codes, uniques = pd.factorize(period_start, sort=True)
+    return uniques[(codes // interval) * interval]
+
+
+def _bin_keys(index, unit, interval):
+    """Return the start timestamp of the target bar for every row of `index`."""
+    day = index.normalize()
+
+    if unit in _UNIT_MINUTES:
+        width = _UNIT_MINUTES[unit] * interval
+        minutes = np.asarray(index.hour * 60 + index.minute)
+        start = (minutes - SESSION_OPEN_MINUTES) // width * width + SESSION_OPEN_MINUTES
+        return day + pd.to_timedelta(start, unit="min")
+
+    if unit == "days":
+        return _group_trading_periods(day, interval)
+
+    if unit == "weeks":
+        monday = day - pd.to_timedelta(np.asarray(day.weekday), unit="D")
+        return _group_trading_periods(monday, interval)
+
+    if unit == "months":
+        first = day - pd.to_timedelta(np.asarray(day.day) - 1, unit="D")
+        return _group_trading_periods(first, interval)
+
+    raise ValueError("unit must be one of: minutes, hours, days, weeks, months")
+
+
+def resample_candles(df, unit="hours", interval=1):
+    """
+    Aggregate candles into a coarser timeframe.
+
+    Intraday bars (minutes/hours) are anchored to the 09:15 IST session open,
+    so hourly bars start at 09:15, 10:15, ... and the last one of the day
+    (15:15-15:30) is short, matching the Upstox hourly candles. Daily, weekly
+    and monthly bars are labelled with the calendar start of the period
+    (00:00 IST), like the API. Multi-day/week/month intervals group
+    consecutive periods that have data. The last bar may still be forming.
+
+    Aggregation: open first, high max, low min, close last, volume sum, oi last.
+
+    :param df: candle DataFrame indexed by tz-aware timestamp (IST), as returned by main.fetch
+    :param unit: target unit: "minutes", "hours", "days", "weeks", "months"
+    :param interval: target interval multiplier (e.g. 15 for 15-minute bars)
+    :return: pandas DataFrame with the same columns, one row per target bar
+    """
+    unit = unit.lower()
+    interval = int(interval)
+
+    if df.empty:
+        return df.copy()
+
+    keys = _bin_keys(df.index, unit, interval)
+    agg = {col: how for col, how in AGGREGATION.items() if col in df.columns}
+    out = df.groupby(keys, sort=True).agg(agg)
+    out.index.name = df.index.name or "timestamp"
+    return out
+
+
+def _minutes_per_bar(unit, interval):
+    """Bar length in minutes for intraday units, None for days/weeks/months."""
+    if unit not in _UNIT_MINUTES:
+        return None
+    return _UNIT_MINUTES[unit] * int(interval)
+
+
+def get_multi_timeframe(symbol, timeframes, exchange="NSE", base=("minutes", 1), from_date=None, to_date=None, **kwargs):
+    """
+    Fetch the base resolution once and derive every requested timeframe from it.
+
+    Example:
+        frames = get_multi_timeframe("NBCC", [("minutes", 15), ("hours", 1), ("days", 1)],
+                                     base=("minutes", 15), from_date="2025-09-01")
+
+    :param symbol: Trading symbol (e.g., "NBCC")
+    :param timeframes: iterable of (unit, interval) tuples to return
+    :param exchange: Exchange name (default "NSE")
+    :param base: (unit, interval) to fetch; must be intraday and divide every intraday timeframe
+    :param from_date: optional start date, passed to main.fetch.get_all_candles
+    :param to_date: optional end date, passed to main.fetch.get_all_candles
+    :param kwargs: extra keyword arguments for main.fetch.get_all_candles
+    :return: dict mapping (unit, interval) -> candle DataFrame
+    """
+    base_unit, base_interval = base[0].lower(), int(base[1])
+    base_minutes = _minutes_per_bar(base_unit, base_interval)
+    if not base_minutes:
+        raise ValueError("base must be an intraday resolution ('minutes' or 'hours')")
+
+    timeframes = [(unit.lower(), int(interval)) for unit, interval in timeframes]
+    for unit, interval in timeframes:
+        minutes = _minutes_per_bar(unit, interval)
+        if minutes and minutes % base_minutes:
+            raise ValueError(f"{interval} {unit} cannot be derived from {base_interval} {base_unit} candles")
+
+    base_df = main.fetch.get_all_candles(symbol, exchange=exchange, unit=base_unit, interval=base_interval,
+                                         from_date=from_date, to_date=to_date, **kwargs)
+
+    result = {}
+    for unit, interval in timeframes:
+        if (unit, interval) == (base_unit, base_interval):
+            result[(unit, interval)] = base_df
+        else:
+            result[(unit, interval)] = resample_candles(base_df, unit, interval)
+    return result
@@ -0,0 +1,108 @@
+#PURPOSE OF THIS FILE : run a per-symbol check over many symbols concurrently, yielding
+#results as they complete and collecting errors per symbol.
+
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from main import metrics
+
+DEFAULT_WORKERS = 8
+
+
+class ScanResult:
+    """
+    Outcome of evaluating one item.
+
+    Attributes:
+    -----------
+    position : int
+        Position of the item in the input sequence (used to restore input order).
+    item : object
+        The input item (e.g. a (symbol, exchange) tuple).
+    value : object
+        Return value of the evaluate function, None if it raised.
+    error : Exception | None
+        Exception raised by the evaluate function, if any.
+    """
+
+    __slots__ = ("position", "item", "value", "error")
+
+    def __init__(self, position, item, value=None, error=None):
+        self.position = position
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return f"ScanResult({self.position}, {self.item!r}, {status})"
+
+
+def _run(position, item, evaluate):
+    start = time.perf_counter()
+    try:
+        result = ScanResult(position, item, value=evaluate(item))
+    except Exception as e:
+        result = ScanResult(position, item, error=e)
+    metrics.observe("scan_symbol_seconds", time.perf_counter() - start)
+    metrics.inc("scan_symbols_total", status="ok" if result.ok else "error")
+    return result
+
+
+def iter_scan(items, evaluate, workers=DEFAULT_WORKERS):
+    """
+    Evaluate `evaluate(item)` for every item on a thread pool and yield
+    ScanResult objects in completion order.
+
+    The HTTP layer in main.fetch is rate limited, so the worker count only
+    bounds how many requests can be in flight at once.
+
+    :param items: iterable of items to evaluate
+    :param evaluate: callable taking one item
+    :param workers: number of worker threads (default 8); 1 runs inline
+    :return: generator of ScanResult
+    """
+    items = list(items)
+    if workers is None or workers <= 1:
+        for position, item in enumerate(items):
+            yield _run(position, item, evaluate)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run, position, item, evaluate) for position, item in enumerate(items)]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Stop queued work if the caller stops iterating early (or on Ctrl-C)
+            for future in futures:
+                future.cancel()
+
+
+def scan(items, evaluate, workers=DEFAULT_WORKERS, on_result=None):
+    """
+    Evaluate every item concurrently and return the results in input order.
+
+    :param items: iterable of items to evaluate
+    :param evaluate: callable taking one item
+    :param workers: number of worker threads (default 8)
+    :param on_result: optional callback invoked with each ScanResult as it completes
+    :return: (results, errors) where results is a list of ScanResult in input
+             order and errors maps item -> exception for the items that failed
+    """
+    results = []
+    errors = {}
+    for result in iter_scan(items, evaluate, workers=workers):
+        if on_result is not None:
+            on_result(result)
+        if not result.ok:
+            errors[result.item] = result.error
+        results.append(result)
+
+    results.sort(key=lambda r: r.position)
+    return results, errors
@@ -0,0 +1,296 @@
+#PURPOSE OF THIS FILE : the EMA cluster screen run by main.py and `python -m main scan` -
+#list equity symbols, fetch their candles and run the private cluster conditions.
+#Scans can be checkpointed (see main.checkpoint) and resumed.
+
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import main.checkpoint
+import main.fetch
+import main.instruments
+import main.metrics
+import main.parallel
+import main.prescreen
+import main.scanner
+
+
+def _conditions():
+    # Imported on first use so the module loads without the private package
+    import private.conditions
+    return private.conditions
+
+
+def extract_equity_symbols(exchanges=None):
+    """
+    Extracts only underlying stock symbols (equities) from the instruments JSON file.
+    Optionally filters by specified exchanges.
+
+    Parameters:
+        exchanges (str | list[str] | None):
+            Exchange(s) to include (e.g., 'NSE', ['NSE_EQ', 'BSE_EQ']).
+            Defaults to None (includes all).
+
+    Returns:
+        pd.DataFrame: DataFrame with 'symbol' and 'exchange' columns for equities only.
+    """
+
+    # Process-wide instrument index (loaded once, reloaded when keys.json changes)
+    index = main.instruments.get_index()
+
+    # Normalize exchanges param to a list
+    if exchanges is not None:
+        if isinstance(exchanges, str):
+            exchanges = [exchanges]
+
+    # Filter for equities only
+    equity_types = ["EQ", "SM"]  # add other equity types if needed
+
+    rows = []
+    for item in index.filter(instrument_types=equity_types, exchanges=exchanges):
+        symbol = item.get("trading_symbol")
+        exchange = item.get("exchange")
+
+        if not symbol or not exchange:
+            continue  # skip incomplete entries
+
+        rows.append({"symbol": symbol, "exchange": exchange})
+
+    df = pd.DataFrame(rows)
+    return df
+
+
+def evaluate_clusters(df, ema_accuracy=0.2):
+    """
+    Run the EMA 3 / EMA 4 cluster checks (private.conditions) on a candle DataFrame.
+
+    Returns:
+        tuple: (cluster_3, cluster_4) results
+    """
+    conditions = _conditions()
+    cluster_3 = conditions.ema_cluster_3(df, task="past", accuracy=ema_accuracy)
+    cluster_4 = conditions.ema_cluster_4(df, task="past", accuracy=ema_accuracy)
+    return cluster_3, cluster_4
+
+
+def is_clustered(clusters):
+    """True if check_ema_clusters() / evaluate_clusters() found an EMA 3 or EMA 4 cluster."""
+    return clusters is not None and bool(clusters[0] or clusters[1])
+
+
+def timed_check_ema_clusters(symbol, exchange, from_date, to_date, ema_accuracy=0.2):
+    """
+    check_ema_clusters() that also reports where the time went.
+
+    Returns:
+        tuple: (clusters, fetch_seconds, eval_seconds) - clusters is
+        (cluster_3, cluster_4) or None if there is no candle data
+    """
+    start = time.perf_counter()
+
+    # Fetch candle data for the symbol
+    df = main.fetch.get_all_candles(
+        symbol,
+        exchange=exchange,
+        from_date=from_date,
+        to_date=to_date
+    )
+    fetched = time.perf_counter()
+
+    if df.empty:
+        return None, fetched - start, 0.0
+
+    return evaluate_clusters(df, ema_accuracy), fetched - start, time.perf_counter() - fetched
+
+
+def check_ema_clusters(symbol, exchange, from_date, to_date, ema_accuracy=0.2):
+    """
+    Fetch candles for one symbol and run the EMA 3 / EMA 4 cluster checks.
+
+    Returns:
+        tuple | None: (cluster_3, cluster_4) results, or None if there is no candle data
+    """
+    return timed_check_ema_clusters(symbol, exchange, from_date, to_date, ema_accuracy)[0]
+
+
+def evaluate_clusters_in_pool(pairs, from_date, to_date, ema_accuracy=0.2, workers=None, processes=None, pool=None):
+    """
+    Fetch candles for every (symbol, exchange) pair (on `workers` threads),
+    then run the EMA 3 / EMA 4 cluster checks on a process pool over
+    shared-memory candle panels (see main.parallel). `pool` reuses an
+    existing pool from main.parallel.process_pool().
+
+    Returns:
+        tuple: (clusters, errors) - clusters maps pair -> (cluster_3, cluster_4)
+        in input order, errors maps pair -> exception or error message
+    """
+    fetched, errors = main.scanner.scan(
+        pairs,
+        lambda pair: main.fetch.get_all_candles(pair[0], exchange=pair[1], from_date=from_date, to_date=to_date),
+        workers=workers or 1
+    )
+    frames = {r.item: r.value for r in fetched if r.ok and not r.value.empty}
+
+    conditions = _conditions()
+    results, eval_errors = main.parallel.evaluate_conditions(
+        frames,
+        [conditions.ema_cluster_3, conditions.ema_cluster_4],
+        processes=processes,
+        pool=pool,
+        task="past",
+        accuracy=ema_accuracy
+    )
+    errors.update(eval_errors)
+
+    return {pair: tuple(values) for pair, values in results.items()}, errors
+
+
+CHECKPOINT_BATCH = 256  # symbols per process-pool round when checkpointing
+
+
+def get_clustered_stocks(days=5, exchanges="NSE", ema_accuracy=0.2, workers=None, processes=None, limit=None,
+                         checkpoint=None, output=None, prescreen=None, with_exchange=False):
+    """
+    Scan all equity symbols and return a list of symbols that have
+    EMA 3 or EMA 4 clusters in the last `days` days.
+
+    Parameters:
+        days (int): Number of days to look back from today (default=5)
+        exchanges (str | list[str] | None): Optional filter for exchanges
+        ema_accuracy (float): EMA cluster tolerance percentage (default=0.2%)
+        workers (int | None): Scan concurrently with this many threads.
+            None scans sequentially. Both modes return the same list.
+        processes (int | None): Evaluate the cluster checks on this many
+            processes after fetching (fetches still use `workers` threads).
+        limit (int | None): Only scan the first `limit` symbols
+        checkpoint (str | None): Record every symbol's outcome in this file
+            (main.checkpoint.ScanCheckpoint). Re-running with the same file and
+            parameters on the same day only scans symbols not yet done;
+            failed symbols are retried.
+        output (str | None): Write the results as a Parquet table (needs pyarrow
+            and `checkpoint`): symbol, exchange, status, cluster timestamps,
+            fetch and eval seconds.
+        prescreen (dict | bool | None): Shortlist symbols with main.prescreen
+            (daily liquidity / price band / EMA spread filters) before the
+            hourly scan. True uses its defaults; a dict is passed to
+            main.prescreen.prescreen() as keyword arguments. Symbols whose
+            daily fetch fails count as failed symbols (logged, and recorded
+            as errors in the checkpoint and output).
+        with_exchange (bool): Return (symbol, exchange) pairs instead of
+            bare symbols, e.g. to fetch the same instruments again
+
+    Returns:
+        list: Symbols (or (symbol, exchange) pairs) with EMA clusters
+    """
+    if output and not checkpoint:
+        raise ValueError("output needs a checkpoint file to collect results in")
+
+    # Get all equity symbols (optionally filtered by exchange)
+    df_equities = extract_equity_symbols(exchanges)
+    if limit is not None:
+        df_equities = df_equities.head(limit)
+
+    to_date = datetime.now()
+    from_date = to_date - timedelta(days=days)
+
+    pairs = list(zip(df_equities["symbol"], df_equities["exchange"])) if not df_equities.empty else []
+
+    prescreen_options = {} if prescreen is True else dict(prescreen or {})
+    prescreen_errors = {}
+    if prescreen:
+        prescreen_options.setdefault("workers", workers or main.scanner.DEFAULT_WORKERS)
+        screened = main.prescreen.prescreen(pairs, **prescreen_options)
+        # Output rows: the shortlist plus the symbols whose daily fetch failed, in universe order
+        reported = set(screened.shortlist) | set(screened.errors)
+        output_pairs = [pair for pair in pairs if pair in reported]
+        pairs, prescreen_errors = screened.shortlist, screened.errors
+    else:
+        output_pairs = pairs
+
+    store = None
+    if checkpoint:
+        params = {
+            "days": days,
+            "exchanges": [exchanges] if isinstance(exchanges, str) else exchanges,
+            "ema_accuracy": ema_accuracy,
+            "limit": limit,
+            "to_date": to_date.date().isoformat(),
+        }
+        if prescreen:
+            params["prescreen"] = {k: v if isinstance(v, (int, float, str, type(None))) else str(v)
+                                   for k, v in prescreen_options.items() if k not in ("workers", "panel", "stats")}
+        store = main.checkpoint.ScanCheckpoint(checkpoint, params=params)
+        # A failed daily fetch is a failed symbol, not one without data; the next run retries it
+        for pair, e in prescreen_errors.items():
+            store.record(pair[0], pair[1], error=e)
+        todo = store.pending(pairs)
+        main.metrics.log_event("scan_resumed", done=len(pairs) - len(todo), remaining=len(todo))
+    else:
+        todo = pairs
+
+    outcomes = {}  # pair -> (cluster_3, cluster_4) or None
+
+    def finish(pair, clusters=None, fetch_seconds=None, eval_seconds=None, error=None):
+        if error is not None:
+            main.metrics.log_event("symbol_failed", logging.ERROR, symbol=pair[0], error=error)
+        else:
+            outcomes[pair] = clusters
+        if store is not None:
+            store.record(pair[0], pair[1], clusters, fetch_seconds, eval_seconds, error)
+
+    started = time.perf_counter()
+    try:
+        if processes:
+            # Per-symbol timings are not available from the pool; batches bound the work lost on a crash.
+            # One pool serves every batch, so workers start (and import pandas) once per scan.
+            batch = CHECKPOINT_BATCH if store is not None else max(len(todo), 1)
+            with main.parallel.process_pool(processes) as pool:
+                for i in range(0, len(todo), batch):
+                    chunk = todo[i:i + batch]
+                    clusters, errors = evaluate_clusters_in_pool(chunk, from_date, to_date, ema_accuracy, workers,
+                                                                 processes, pool=pool)
+                    for pair in chunk:
+                        if pair in errors:
+                            finish(pair, error=errors[pair])
+                        else:
+                            finish(pair, clusters.get(pair))
+
+        elif workers:
+            # Concurrent scan: results arrive as they complete, then get put back in input order
+            def on_result(result):
+                if result.ok:
+                    finish(result.item, *result.value)
+                else:
+                    finish(result.item, error=result.error)
+
+            main.scanner.scan(
+                todo,
+                lambda pair: timed_check_ema_clusters(pair[0], pair[1], from_date, to_date, ema_accuracy),
+                workers=workers,
+                on_result=on_result
+            )
+
+        else:
+            for pair in todo:
+                try:
+                    finish(pair, *timed_check_ema_clusters(pair[0], pair[1], from_date, to_date, ema_accuracy))
+                except Exception as e:
+                    finish(pair, error=e)
+
+        if store is None:
+            clustered = [pair if with_exchange else pair[0] for pair in pairs if is_clustered(outcomes.get(pair))]
+        else:
+            if output:
+                store.write_parquet(output, output_pairs)
+            clustered = store.clustered(pairs, with_exchange=with_exchange)
+
+        main.prescreen.log_stage(main.prescreen.StageReport(
+            "cluster_check", time.perf_counter() - started, len(pairs), len(clustered)
+        ))
+        return clustered
+    finally:
+        if store is not None:
+            store.close()
@@ -0,0 +1,163 @@
+#PURPOSE OF THIS FILE : NSE trading calendar - trading days, session hours (09:15-15:30 IST)
+#and the close times of intraday bars, used to schedule incremental scans.
+
+
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+import main.metrics
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+UNIT_MINUTES = {"minutes": 1, "hours": 60}
+
+# NSE equity segment trading holidays. Add later years (or ad-hoc closures) to
+# HOLIDAYS_FILE as a JSON list of "YYYY-MM-DD" strings. A year with no entries
+# at all is treated as missing: its holidays count as sessions (only weekends
+# are closed, costing an empty fetch per holiday) and the current year logs a
+# `holiday_calendar_missing` warning once.
+NSE_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",
+    "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
+    "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24",
+    "2026-12-25",
+))
+HOLIDAYS_FILE = Path(__file__).parent / "resources" / "holidays.json"
+
+_holidays = None
+_holiday_years = frozenset()
+_warned_years = set()
+
+
+def holidays():
+    """NSE_HOLIDAYS plus the dates in HOLIDAYS_FILE (read once, see reload_holidays)."""
+    global _holidays, _holiday_years
+    if _holidays is None:
+        extra = set()
+        if os.path.exists(HOLIDAYS_FILE):
+            with open(HOLIDAYS_FILE, "r", encoding="utf-8") as f:
+                extra = {date.fromisoformat(d) for d in json.load(f)}
+        _holiday_years = frozenset(d.year for d in NSE_HOLIDAYS | extra)
+        _holidays = NSE_HOLIDAYS | extra
+    return _holidays
+
+
+def reload_holidays():
+    global _holidays
+    _holidays = None
+    return holidays()
+
+
+def to_ist(now=None):
+    """`now` (timezone-aware) converted to IST; the current time if None."""
+    if now is None:
+        return datetime.now(IST)
+    if now.tzinfo is None:
+        raise ValueError("datetime must be timezone-aware")
+    return now.astimezone(IST)
+
+
+def check_calendar(day):
+    """
+    Warn once if `day` falls in the current year and the holiday calendar has
+    no entries for it. Returns False when the year's holidays are unknown.
+    Earlier and later years without entries (history fetches, look-ahead
+    across New Year) are not reported.
+    """
+    holidays()
+    if day.year in _holiday_years:
+        return True
+    if day.year == datetime.now(IST).year and day.year not in _warned_years:
+        _warned_years.add(day.year)
+        main.metrics.log_event("holiday_calendar_missing", logging.WARNING, year=day.year, file=HOLIDAYS_FILE)
+    return False
+
+
+def is_trading_day(day):
+    """True for weekdays that are not NSE holidays (any weekday in a year without a holiday calendar)."""
+    check_calendar(day)
+    return day.weekday() < 5 and day not in holidays()
+
+
+def next_trading_day(day):
+    """First trading day strictly after `day`."""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def previous_trading_day(day):
+    """Last trading day strictly before `day`."""
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def session_bounds(day):
+    """(open, close) of `day`'s session as IST datetimes."""
+    return datetime.combine(day, SESSION_OPEN, IST), datetime.combine(day, SESSION_CLOSE, IST)
+
+
+def is_session_open(now=None):
+    now = to_ist(now)
+    if not is_trading_day(now.date()):
+        return False
+    open_, close = session_bounds(now.date())
+    return open_ <= now < close
+
+
+def bar_width(unit, interval):
+    """Bar length as a timedelta for intraday units."""
+    if unit not in UNIT_MINUTES:
+        raise ValueError("unit must be 'minutes' or 'hours'")
+    return timedelta(minutes=UNIT_MINUTES[unit] * int(interval))
+
+
+def bar_close(start, unit, interval):
+    """
+    Close time of the bar starting at `start`.
+
+    Bars are anchored at 09:15, so the session's last bar is cut short at
+    15:30 (e.g. the 15:15 hourly bar). Daily bars close with the session.
+    """
+    start = to_ist(start)
+    close = session_bounds(start.date())[1]
+    if unit == "days":
+        return close
+    return min(start + bar_width(unit, interval), close)
+
+
+def bar_closes(day, unit, interval):
+    """All bar close times of `day`'s session (empty on non-trading days)."""
+    if not is_trading_day(day):
+        return []
+    open_, close = session_bounds(day)
+    if unit == "days":
+        return [close]
+    width = bar_width(unit, interval)
+    closes = []
+    start = open_
+    while start < close:
+        closes.append(min(start + width, close))
+        start += width
+    return closes
+
+
+def next_bar_close(now=None, unit="hours", interval=1):
+    """The first bar close strictly after `now`, looking ahead across non-trading days."""
+    now = to_ist(now)
+    day = now.date()
+    while True:
+        for close in bar_closes(day, unit, interval):
+            if close > now:
+                return close
+        day = next_trading_day(day)
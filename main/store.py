@@ -0,0 +1,229 @@
+#PURPOSE OF THIS FILE : persist fetched candles on disk so repeated scans and backfills
+#only ask the API for the sessions that are not stored yet.
+
+
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from main import decode
+from main import sessions
+
+STORE_FILE = Path(__file__).parent / "resources" / "candles.sqlite"
+CANDLE_COLUMNS = decode.CANDLE_COLUMNS
+
+# Units whose candles never change once their session has closed.
+# Weekly/monthly candles keep changing until the period ends, so they are not stored.
+CACHEABLE_UNITS = ("minutes", "hours", "days")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    instrument_key TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume INTEGER, oi INTEGER,
+    PRIMARY KEY (instrument_key, unit, interval, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sessions (
+    instrument_key TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    session TEXT NOT NULL,
+    PRIMARY KEY (instrument_key, unit, interval, session)
+) WITHOUT ROWID;
+"""
+
+
+def _date_range(start, end):
+    d = start
+    while d <= end:
+        yield d
+        d += timedelta(days=1)
+
+
+def _runs(dates):
+    """Group sorted dates into contiguous (start, end) runs."""
+    runs = []
+    for d in dates:
+        if runs and runs[-1][1] + timedelta(days=1) == d:
+            runs[-1][1] = d
+        else:
+            runs.append([d, d])
+    return [(start, end) for start, end in runs]
+
+
+class CandleStore:
+    """
+    SQLite-backed candle store, partitioned by (instrument_key, unit, interval).
+
+    Besides the candles themselves, the store records which closed sessions
+    (calendar days before today, IST) have been fetched for each partition.
+    A recorded session is immutable: it is never requested from the API again.
+    Sessions come back without candles on weekends and holidays, which are
+    recorded, but also before a session's data is published, so an empty
+    trading day is not recorded and gets requested again.
+
+    The store is safe to share between threads; each thread gets its own
+    SQLite connection.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or STORE_FILE)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.session_hits = 0
+        self.session_misses = 0
+        self.api_calls = 0
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------
+    # Session bookkeeping
+    # -------------------------------
+    def covered_sessions(self, instrument_key, unit, interval, from_date, to_date):
+        """Return the set of closed session dates already stored in [from_date, to_date]."""
+        rows = self._conn().execute(
+            "SELECT session FROM sessions WHERE instrument_key=? AND unit=? AND interval=? "
+            "AND session BETWEEN ? AND ?",
+            (instrument_key, unit, int(interval), from_date.isoformat(), to_date.isoformat()),
+        ).fetchall()
+        return {date.fromisoformat(r[0]) for r in rows}
+
+    def missing_ranges(self, instrument_key, unit, interval, from_date, to_date, today):
+        """
+        Return the (start, end) date ranges in [from_date, to_date] that still
+        have to be fetched. Sessions on or after `today` are always returned,
+        since they may still change.
+        """
+        closed_end = min(to_date, today - timedelta(days=1))
+        covered = set()
+        if from_date <= closed_end:
+            covered = self.covered_sessions(instrument_key, unit, interval, from_date, closed_end)
+
+        missing = [d for d in _date_range(from_date, to_date) if d not in covered]
+        hits = sum(1 for d in _date_range(from_date, closed_end) if d in covered)
+        misses = sum(1 for d in missing if d < today)
+        with self._stats_lock:
+            self.session_hits += hits
+            self.session_misses += misses
+
+        return _runs(missing)
+
+    def mark_closed(self, instrument_key, unit, interval, from_date, to_date, today, with_data=()):
+        """
+        Record the settled sessions in [from_date, to_date] before `today` as
+        stored: days in `with_data` (dates the fetch returned candles for) and
+        days the NSE calendar has no session on (see main.sessions). Trading
+        days without candles are left to be fetched again.
+        """
+        end = min(to_date, today - timedelta(days=1))
+        if from_date > end:
+            return
+        with_data = set(with_data)
+        settled = [d for d in _date_range(from_date, end) if d in with_data or not sessions.is_trading_day(d)]
+        if not settled:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?)",
+            [(instrument_key, unit, int(interval), d.isoformat()) for d in settled],
+        )
+        conn.commit()
+
+    def record_api_call(self, count=1):
+        with self._stats_lock:
+            self.api_calls += count
+
+    # -------------------------------
+    # Candle IO
+    # -------------------------------
+    def read(self, instrument_key, unit, interval, from_date, to_date):
+        """
+        Read stored candles with timestamps on dates [from_date, to_date].
+
+        :return: pandas DataFrame in the same shape as main.fetch.get_historical_candle
+        """
+        rows = self._conn().execute(
+            "SELECT ts, open, high, low, close, volume, oi FROM candles "
+            "WHERE instrument_key=? AND unit=? AND interval=? AND ts >= ? AND ts < ? ORDER BY ts",
+            (instrument_key, unit, int(interval), from_date.isoformat(),
+             (to_date + timedelta(days=1)).isoformat()),
+        ).fetchall()
+
+        df = pd.DataFrame(rows, columns=CANDLE_COLUMNS)
+        df.index = decode.parse_timestamps(df.pop("timestamp").tolist())
+        df.index.name = "timestamp"
+        # Same dtypes as decoded API rows (stores created with REAL columns hold floats)
+        return df.astype({"volume": "int64", "oi": "int64"})
+
+    def write(self, instrument_key, unit, interval, df):
+        """Insert or replace the candles of `df` (indexed by timestamp) in the store."""
+        if df.empty:
+            return
+        records = [
+            (instrument_key, unit, int(interval), ts.isoformat(),
+             float(row.open), float(row.high), float(row.low), float(row.close),
+             int(row.volume), int(row.oi))
+            for ts, row in zip(df.index, df.itertuples(index=False))
+        ]
+        conn = self._conn()
+        conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+        conn.commit()
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self):
+        """
+        Return hit/miss counters for this process.
+
+        session_hits / session_misses count closed sessions served from disk
+        vs. requested from the API; api_calls counts historical requests made
+        on behalf of the store.
+        """
+        with self._stats_lock:
+            total = self.session_hits + self.session_misses
+            return {
+                "session_hits": self.session_hits,
+                "session_misses": self.session_misses,
+                "hit_ratio": self.session_hits / total if total else 0.0,
+                "api_calls": self.api_calls,
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.session_hits = 0
+            self.session_misses = 0
+            self.api_calls = 0
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide CandleStore at STORE_FILE, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = CandleStore()
+    return _default_store
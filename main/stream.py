@@ -0,0 +1,365 @@
+#PURPOSE OF THIS FILE : build candles in memory from a live tick/quote feed instead of
+#re-polling get_intraday_candle for the whole session.
+
+
+import json
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from main import decode
+from main import sessions
+
+IST_SECONDS = 5 * 3600 + 30 * 60
+# Bars are anchored to the 09:15 IST open, like main.resample, and the last one ends at 15:30
+SESSION_OPEN_SECONDS = sessions.SESSION_OPEN.hour * 3600 + sessions.SESSION_OPEN.minute * 60
+SESSION_CLOSE_SECONDS = sessions.SESSION_CLOSE.hour * 3600 + sessions.SESSION_CLOSE.minute * 60
+_UNIT_SECONDS = {"minutes": 60, "hours": 3600}
+
+
+def _to_epoch(ts):
+    """Epoch seconds from epoch seconds/milliseconds, an ISO string or a datetime."""
+    if isinstance(ts, (int, float)):
+        return ts / 1000.0 if ts > 1e11 else float(ts)
+    if isinstance(ts, str):
+        if ts.isdigit():
+            return _to_epoch(int(ts))
+        ts = datetime.fromisoformat(ts)
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=decode.IST_OFFSET)
+        return ts.timestamp()
+    raise ValueError(f"Unsupported tick timestamp: {ts!r}")
+
+
+def normalize_tick(message):
+    """
+    Turn one feed message into a tick dict.
+
+    Accepts the keys used by recorded/replayed ticks and common quote payloads:
+    instrument_key, ts|timestamp|ltt (epoch s/ms or ISO), ltp|price,
+    ltq|volume (quantity traded in this tick), oi.
+
+    :return: dict with instrument_key, ts (epoch seconds), price, volume, oi
+    """
+    return {
+        "instrument_key": message["instrument_key"],
+        "ts": _to_epoch(message.get("ts", message.get("timestamp", message.get("ltt")))),
+        "price": float(message.get("ltp", message.get("price"))),
+        "volume": float(message.get("ltq", message.get("volume", 0)) or 0),
+        "oi": message.get("oi"),
+    }
+
+
+class CandleAggregator:
+    """
+    Incrementally aggregates ticks into intraday candles per instrument.
+
+    Bars are anchored to the 09:15 IST session open and the last bar of the
+    day ends at the 15:30 close (so the 15:15 hourly bar closes at 15:30, as
+    in main.sessions.bar_close). Ticks outside 09:15-15:30 IST are dropped.
+    A bar is closed (and `on_bar_close(instrument_key, bar)` called) when a
+    tick for a later bar arrives or when flush() is called after the bar's
+    end time; ticks for a bar already closed are dropped.
+
+    Parameters:
+    -----------
+    unit : str
+        "minutes" or "hours" (default "minutes")
+    interval : int
+        Interval multiplier (default 1)
+    on_bar_close : callable, optional
+        Called with (instrument_key, bar dict) for every closed bar
+    instruments : iterable of str, optional
+        Subscribed instrument keys; ticks for other instruments are ignored.
+        None accepts every instrument.
+    max_bars : int, optional
+        Closed bars kept in memory per instrument (default 5000)
+    """
+
+    def __init__(self, unit="minutes", interval=1, on_bar_close=None, instruments=None, max_bars=5000):
+        unit = unit.lower()
+        if unit not in _UNIT_SECONDS:
+            raise ValueError("unit must be 'minutes' or 'hours' for live candles")
+        self.unit = unit
+        self.interval = int(interval)
+        self.width = _UNIT_SECONDS[unit] * self.interval
+        self.on_bar_close = on_bar_close
+        self.instruments = None if instruments is None else set(instruments)
+        self.max_bars = max_bars
+
+        self._lock = threading.Lock()
+        self._closed = {}   # instrument_key -> list of closed bar dicts
+        self._forming = {}  # instrument_key -> bar dict still being built
+
+    def subscribe(self, instrument_keys):
+        with self._lock:
+            if self.instruments is None:
+                self.instruments = set()
+            self.instruments.update(instrument_keys)
+
+    def unsubscribe(self, instrument_keys):
+        with self._lock:
+            if self.instruments is not None:
+                self.instruments.difference_update(instrument_keys)
+
+    def in_session(self, epoch):
+        """True if `epoch` falls inside the 09:15-15:30 IST session."""
+        seconds = (int(epoch) + IST_SECONDS) % 86400
+        return SESSION_OPEN_SECONDS <= seconds < SESSION_CLOSE_SECONDS
+
+    def bar_start(self, epoch):
+        """Epoch seconds of the start of the bar containing `epoch` (a time inside the session)."""
+        local = int(epoch) + IST_SECONDS
+        day = local - local % 86400
+        offset = local % 86400 - SESSION_OPEN_SECONDS
+        return day + offset // self.width * self.width + SESSION_OPEN_SECONDS - IST_SECONDS
+
+    def bar_end(self, start):
+        """Epoch seconds at which the bar starting at `start` closes: start + width, at most the session close."""
+        local = int(start) + IST_SECONDS
+        close = local - local % 86400 + SESSION_CLOSE_SECONDS - IST_SECONDS
+        return min(start + self.width, close)
+
+    def add_tick(self, instrument_key, ts, price, volume=0, oi=None):
+        """
+        Add one trade/quote tick.
+
+        :param ts: epoch seconds
+        :return: the bar that was closed by this tick, or None
+        """
+        if self.instruments is not None and instrument_key not in self.instruments:
+            return None
+        if not self.in_session(ts):
+            return None
+
+        start = self.bar_start(ts)
+        closed = None
+        with self._lock:
+            bar = self._forming.get(instrument_key)
+            if bar is None:
+                done = self._closed.get(instrument_key)
+                if done and start <= done[-1]["start"]:
+                    return None  # late tick for a bar already closed by flush()
+            elif start < bar["start"]:
+                return None  # late tick for a bar already closed
+            elif start > bar["start"]:
+                closed = self._close(instrument_key, bar)
+                bar = None
+
+            if bar is None:
+                self._forming[instrument_key] = {
+                    "start": start, "open": price, "high": price, "low": price,
+                    "close": price, "volume": volume, "oi": oi or 0,
+                }
+            else:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                bar["volume"] += volume
+                if oi is not None:
+                    bar["oi"] = oi
+
+        if closed is not None and self.on_bar_close is not None:
+            self.on_bar_close(instrument_key, closed)
+        return closed
+
+    def add(self, tick):
+        """Add a tick dict as produced by normalize_tick()."""
+        return self.add_tick(tick["instrument_key"], tick["ts"], tick["price"], tick["volume"], tick["oi"])
+
+    def _close(self, instrument_key, bar):
+        bars = self._closed.setdefault(instrument_key, [])
+        bars.append(bar)
+        if len(bars) > self.max_bars:
+            del bars[: len(bars) - self.max_bars]
+        return bar
+
+    def flush(self, now=None):
+        """
+        Close every forming bar whose end time has passed (no tick needed).
+
+        :param now: epoch seconds (default: current time)
+        :return: list of (instrument_key, bar) closed
+        """
+        now = time.time() if now is None else now
+        closed = []
+        with self._lock:
+            for instrument_key, bar in list(self._forming.items()):
+                if self.bar_end(bar["start"]) <= now:
+                    closed.append((instrument_key, self._close(instrument_key, bar)))
+                    del self._forming[instrument_key]
+
+        if self.on_bar_close is not None:
+            for instrument_key, bar in closed:
+                self.on_bar_close(instrument_key, bar)
+        return closed
+
+    def frame(self, instrument_key, include_forming=True):
+        """
+        Return the candles of one instrument in the get_all_candles schema.
+
+        Index: timestamp (datetime, IST); columns: open, high, low, close, volume, oi
+        """
+        with self._lock:
+            bars = list(self._closed.get(instrument_key, []))
+            if include_forming and instrument_key in self._forming:
+                bars.append(dict(self._forming[instrument_key]))
+
+        starts = np.array([b["start"] for b in bars], dtype="int64")
+        index = pd.DatetimeIndex(starts.astype("datetime64[s]").astype("datetime64[ns]"))
+        index = index.tz_localize("UTC").tz_convert(decode.IST_OFFSET)
+        df = pd.DataFrame({c: [b[c] for b in bars] for c in decode.CANDLE_COLUMNS[1:]}, index=index)
+        df.index.name = "timestamp"
+        return df
+
+
+# -------------------------------
+# Feed sources
+# -------------------------------
+def socket_feed(host, port, timeout=None):
+    """
+    Yield messages from a TCP stream of newline-delimited JSON ticks
+    (as served by ReplayServer). Ends when the server closes the connection.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        with sock.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def websocket_feed(url, headers=None, subscribe_message=None, decoder=json.loads):
+    """
+    Yield decoded messages from a websocket market feed.
+
+    Needs the optional `websocket-client` package. The Upstox v3 market data
+    feed sends protobuf frames; pass a `decoder` that turns one frame into a
+    message dict (or a list of them) for that feed.
+
+    :param url: wss:// URL (for Upstox, the authorized feed URL)
+    :param headers: optional dict of HTTP headers for the handshake
+    :param subscribe_message: optional dict sent as JSON after connecting
+    :param decoder: callable(frame) -> dict | list[dict] | None
+    """
+    try:
+        import websocket
+    except ImportError:
+        raise ImportError("websocket_feed needs the 'websocket-client' package: pip install websocket-client")
+
+    header = [f"{k}: {v}" for k, v in (headers or {}).items()]
+    ws = websocket.create_connection(url, header=header)
+    try:
+        if subscribe_message is not None:
+            ws.send(json.dumps(subscribe_message))
+        while True:
+            frame = ws.recv()
+            if not frame:
+                break
+            decoded = decoder(frame)
+            if decoded is None:
+                continue
+            if isinstance(decoded, list):
+                yield from decoded
+            else:
+                yield decoded
+    finally:
+        ws.close()
+
+
+def run_feed(feed, aggregator, stop_event=None, flush_interval=1.0, clock=time.time):
+    """
+    Consume `feed` into `aggregator` until the feed ends or `stop_event` is set.
+
+    A timer thread calls aggregator.flush(clock()) every `flush_interval`
+    seconds, so bars close on time even while the feed is quiet (the feed
+    iterator may block between ticks). Recorded ticks replayed faster than
+    real time carry timestamps far behind the wall clock; pass clock=None to
+    flush on the feed's own timestamps instead.
+
+    :param feed: iterable of feed messages (see normalize_tick)
+    :param aggregator: CandleAggregator
+    :param stop_event: optional threading.Event
+    :param flush_interval: seconds between flushes
+    :param clock: callable returning epoch seconds (default time.time), or None for feed time
+    :return: number of ticks consumed
+    """
+    done = threading.Event()
+    if clock is not None:
+        def flush_loop():
+            while not done.wait(flush_interval):
+                aggregator.flush(now=clock())
+
+        threading.Thread(target=flush_loop, name="candle-flush", daemon=True).start()
+
+    count = 0
+    last_flush = None
+    try:
+        for message in feed:
+            if stop_event is not None and stop_event.is_set():
+                break
+            tick = normalize_tick(message)
+            aggregator.add(tick)
+            count += 1
+
+            if clock is None and (last_flush is None or tick["ts"] - last_flush >= flush_interval):
+                aggregator.flush(now=tick["ts"])
+                last_flush = tick["ts"]
+    finally:
+        done.set()
+    return count
+
+
+# -------------------------------
+# Local replay server
+# -------------------------------
+def load_ticks(path):
+    """Read recorded ticks from a newline-delimited JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    """
+    Local TCP server that streams recorded ticks as newline-delimited JSON
+    to every client, for exercising the ingestion path without the live feed.
+
+    :param ticks: list of tick dicts (see load_ticks)
+    :param address: (host, port); port 0 picks a free port
+    :param speed: replay speed multiplier on the recorded gaps; 0 streams as fast as possible
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, ticks, address=("127.0.0.1", 0), speed=0):
+        self.ticks = list(ticks)
+        self.speed = speed
+        super().__init__(address, _ReplayHandler)
+
+    def start(self):
+        """Serve in a background thread; returns the (host, port) bound."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address
+
+
+class _ReplayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        previous = None
+        for tick in self.server.ticks:
+            if self.server.speed and previous is not None:
+                gap = _to_epoch(tick.get("ts", tick.get("timestamp"))) - previous
+                if gap > 0:
+                    time.sleep(gap / self.server.speed)
+            if self.server.speed:
+                previous = _to_epoch(tick.get("ts", tick.get("timestamp")))
+            try:
+                self.wfile.write((json.dumps(tick) + "\n").encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                return
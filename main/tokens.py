@@ -0,0 +1,350 @@
+#PURPOSE OF THIS FILE : pool of Upstox access tokens (one per app / account). Every request
+#goes out on the least-loaded healthy token, each token has its own rate limiter, expired or
+#throttled tokens are benched, and refreshed tokens are picked up from disk without a restart.
+
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from main import metrics
+from main import ratelimit
+
+# Written by main.auth; {"account name": "access token", ...}
+TOKENS_FILE = Path(os.environ.get("UPSTOX_TOKENS_FILE",
+                                  Path(__file__).resolve().parent.parent / "private" / "tokens.json"))
+RELOAD_INTERVAL = 5.0      # seconds between checks of the tokens file for refreshed tokens
+THROTTLE_COOLDOWN = 1.0    # seconds a token sits out after a 429 without Retry-After
+
+
+class NoHealthyTokenError(RuntimeError):
+    """Every token in the pool has expired (HTTP 401) and no refreshed token is available."""
+
+
+def _no_token_error(configured):
+    if not configured:
+        return NoHealthyTokenError("no access token configured (UPSTOX_ACCESS_TOKEN, "
+                                   "private/credentials.py or the tokens file)")
+    return NoHealthyTokenError(f"all {configured} access tokens have expired; refresh them with main.auth")
+
+
+class Token:
+    """
+    One access token and its state in the pool.
+
+    Attributes:
+    -----------
+    name : str
+        Account / app label
+    value : str
+        The access token
+    limiter : ratelimit.RateLimiter
+        This token's own request budget
+    in_flight : int
+        Requests currently using the token
+    expired : bool
+        Set after a 401; cleared when a new value for `name` is loaded
+    cooldown_until : float
+        time.monotonic() before which the token is not used (after a 429)
+    requests, failures : int
+        Requests sent / answered with 401 or 429
+    """
+
+    __slots__ = ("name", "value", "limiter", "in_flight", "expired", "cooldown_until", "requests", "failures")
+
+    def __init__(self, name, value, limits=ratelimit.UPSTOX_LIMITS):
+        self.name = name
+        self.value = value
+        self.limiter = ratelimit.RateLimiter(limits)
+        self.in_flight = 0
+        self.expired = False
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.value}"}
+
+    def budget(self):
+        """Fraction of the tightest rate window still available."""
+        return self.limiter.budget()
+
+    def __repr__(self):
+        state = "expired" if self.expired else "ok"
+        return f"Token({self.name!r}, {state}, in_flight={self.in_flight}, requests={self.requests})"
+
+
+def _parse(data):
+    """Tokens file content -> [(name, value)]: {"name": "token"} or [{"name": ..., "access_token": ...}]."""
+    if isinstance(data, dict):
+        return [(str(name), value) for name, value in data.items() if value]
+    if isinstance(data, list):
+        return [(str(item.get("name", i)), item["access_token"]) for i, item in enumerate(data) if item.get("access_token")]
+    raise ValueError("tokens file must hold a JSON object or list")
+
+
+def read_tokens_file(path=None):
+    """[(name, value)] from a tokens file; empty if it does not exist."""
+    path = Path(path or TOKENS_FILE)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return _parse(json.load(f))
+
+
+def save_token(name, value, path=None):
+    """
+    Add or replace one account's token in the tokens file (atomically), so
+    running pools pick it up on their next reload.
+    """
+    path = Path(path or TOKENS_FILE)
+    tokens = dict(read_tokens_file(path))
+    tokens[name] = value
+    os.makedirs(path.parent, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tokens, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+class TokenPool:
+    """
+    Thread-safe set of tokens that requests are spread across.
+
+    acquire() returns the healthy token with the fewest requests in flight
+    (then the most rate budget left) once its own limiter admits the
+    request; release() records the outcome - a 401 benches the token until a
+    new value for it is loaded, a 429 cools it down for Retry-After seconds.
+    With N accounts the pool admits N times the per-token request rate.
+
+    Parameters:
+    -----------
+    tokens : iterable of (str, str) | dict
+        Fixed (name, token) pairs, e.g. from the environment
+    path : str | Path, optional
+        Tokens file merged over `tokens` and re-read whenever it changes
+        (checked at most every `reload_interval` seconds)
+    limits : iterable of (int, float)
+        Rate limits per token (default ratelimit.UPSTOX_LIMITS)
+    """
+
+    def __init__(self, tokens=(), path=None, limits=ratelimit.UPSTOX_LIMITS, reload_interval=RELOAD_INTERVAL):
+        self.static = list(tokens.items()) if isinstance(tokens, dict) else list(tokens)
+        self.path = Path(path) if path else None
+        self.limits = tuple(limits)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._mtime = None
+        self._checked = 0.0
+        self.reload()
+
+    # -------------------------------
+    # Loading
+    # -------------------------------
+    def set_tokens(self, pairs):
+        """
+        Replace the pool's tokens. A name whose value is unchanged keeps its
+        state; a new value for a name starts fresh (healthy); names no longer
+        listed are dropped once their in-flight requests finish.
+        """
+        with self._lock:
+            tokens = {}
+            for name, value in pairs:
+                current = self._tokens.get(name)
+                if current is not None and current.value == value:
+                    tokens[name] = current
+                else:
+                    tokens[name] = Token(name, value, self.limits)
+                    if current is not None:
+                        metrics.log_event("token_refreshed", token=name)
+            self._tokens = tokens
+
+    def reload(self):
+        """Re-read the tokens file (if any) and merge it over the fixed tokens."""
+        pairs = dict(self.static)
+        if self.path is not None:
+            self._mtime = os.path.getmtime(self.path) if self.path.exists() else None
+            pairs.update(read_tokens_file(self.path))
+        self.set_tokens(pairs.items())
+
+    def _maybe_reload(self, force=False):
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        mtime = os.path.getmtime(self.path) if self.path.exists() else None
+        if mtime != self._mtime:
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                # Half-written or invalid file: keep the current tokens, retry on the next check
+                metrics.log_event("tokens_reload_failed", logging.WARNING, path=self.path, error=e)
+
+    # -------------------------------
+    # Routing
+    # -------------------------------
+    def acquire(self, timeout=None):
+        """
+        Take a rate-limit slot on the least-loaded healthy token, waiting for
+        one to free up if all are at their limit or cooling down.
+
+        :param timeout: optional maximum seconds to wait
+        :return: Token - pass it to release() when the response arrives
+        :raises NoHealthyTokenError: if the pool is empty or every token has expired
+        :raises TimeoutError: if `timeout` expires first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        forced = False
+        while True:
+            self._maybe_reload()
+            waits = []
+            with self._lock:
+                now = time.monotonic()
+                live = [t for t in self._tokens.values() if not t.expired]
+                for token in sorted(live, key=lambda t: (t.in_flight, -t.budget())):
+                    if token.cooldown_until > now:
+                        waits.append(token.cooldown_until - now)
+                        continue
+                    wait = token.limiter.try_acquire()
+                    if wait == 0.0:
+                        token.in_flight += 1
+                        token.requests += 1
+                        metrics.inc("token_requests_total", token=token.name)
+                        return token
+                    waits.append(wait)
+                configured = len(self._tokens)
+
+            if not live:
+                if not forced:
+                    # Look for refreshed tokens right away rather than failing the request
+                    forced = True
+                    self._maybe_reload(force=True)
+                    continue
+                raise _no_token_error(configured)
+
+            wait = min(waits)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("timed out waiting for an access token")
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def peek(self):
+        """
+        The token acquire() would hand out next, without taking a rate-limit
+        slot or counting a request - e.g. to read its headers for a request
+        made outside main.client.get.
+
+        :raises NoHealthyTokenError: if the pool is empty or every token has expired
+        """
+        for force in (False, True):
+            self._maybe_reload(force=force)
+            with self._lock:
+                now = time.monotonic()
+                live = [t for t in self._tokens.values() if not t.expired]
+                if live:
+                    return min(live, key=lambda t: (t.cooldown_until > now, t.in_flight, -t.budget()))
+                configured = len(self._tokens)
+        raise _no_token_error(configured)
+
+    def release(self, token, status=None, retry_after=None):
+        """
+        Return a token taken with acquire().
+
+        :param status: HTTP status of the response (None for network errors)
+        :param retry_after: seconds from a 429's Retry-After header, if any
+        """
+        with self._lock:
+            token.in_flight -= 1
+            if status == 401 and not token.expired:
+                token.expired = True
+                token.failures += 1
+                metrics.inc("token_failures_total", token=token.name, reason="expired")
+                metrics.log_event("token_expired", logging.WARNING, token=token.name,
+                                  remaining=sum(1 for t in self._tokens.values() if not t.expired))
+            elif status == 429:
+                token.failures += 1
+                token.cooldown_until = time.monotonic() + (THROTTLE_COOLDOWN if retry_after is None else retry_after)
+                metrics.inc("token_failures_total", token=token.name, reason="throttled")
+
+    def stats(self):
+        """One dict per token: name, healthy, in_flight, requests, failures."""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "name": t.name,
+                "healthy": not t.expired and t.cooldown_until <= now,
+                "in_flight": t.in_flight,
+                "requests": t.requests,
+                "failures": t.failures,
+            } for t in self._tokens.values()]
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __repr__(self):
+        return f"TokenPool({list(self._tokens.values())})"
+
+
+# -------------------------------
+# Process-wide pool
+# -------------------------------
+def _configured_tokens():
+    """
+    Fixed tokens from, in order: UPSTOX_ACCESS_TOKENS ("name=token,..." or
+    "token,..."), UPSTOX_ACCESS_TOKEN, else private.credentials
+    (ACCESS_TOKENS as a dict or list, and/or ACCESS_TOKEN).
+    """
+    listed = os.environ.get("UPSTOX_ACCESS_TOKENS")
+    if listed:
+        pairs = []
+        for i, item in enumerate(t.strip() for t in listed.split(",")):
+            if item:
+                name, _, value = item.partition("=") if "=" in item else (str(i), "", item)
+                pairs.append((name, value))
+        return pairs
+    single = os.environ.get("UPSTOX_ACCESS_TOKEN")
+    if single:
+        return [("default", single)]
+
+    try:
+        from private import credentials
+    except ImportError:
+        return []
+    pairs = []
+    many = getattr(credentials, "ACCESS_TOKENS", None)
+    if many:
+        pairs.extend(_parse(many))
+    if getattr(credentials, "ACCESS_TOKEN", ""):
+        pairs.append(("default", credentials.ACCESS_TOKEN))
+    return pairs
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide TokenPool (configured tokens plus TOKENS_FILE), built on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TokenPool(_configured_tokens(), path=TOKENS_FILE)
+    return _pool
+
+
+def set_pool(pool):
+    """Replace the process-wide pool (None rebuilds it from the configuration on next use)."""
+    global _pool
+    with _pool_lock:
+        _pool = pool
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fake_upstox import FakeUpstoxServer  # noqa: E402
+from tests import support  # noqa: E402
+
+# Credentials and cluster conditions stand in for the private package when it is absent
+support.install_standins()
+
+SYMBOLS = 12
+
+
+@pytest.fixture
+def fake_upstox(tmp_path, monkeypatch):
+    """main.fetch pointed at a local FakeUpstoxServer, with SYMBOLS instruments and an empty candle store."""
+    import main.fetch
+    import main.instruments
+    import main.store
+
+    server = FakeUpstoxServer()
+    keys = tmp_path / "keys.json"
+    support.write_instruments(str(keys), SYMBOLS)
+    monkeypatch.setattr(main.fetch, "BASE_URL", server.start())
+    monkeypatch.setattr(main.instruments, "KEYS_FILE", keys)
+    monkeypatch.setattr(main.store, "_default_store", main.store.CandleStore(str(tmp_path / "candles.sqlite")))
+    main.fetch._intraday_cache.clear()
+    yield server
+    server.stop()
@@ -0,0 +1,58 @@
+#PURPOSE OF THIS FILE : shared stand-ins for the tests and the offline benchmarks - credentials
+#and cluster conditions in place of the private package, and a small instrument master for
+#benchmarks.fake_upstox.FakeUpstoxServer.
+#Import as `from tests import support` from the repo root.
+
+
+import json
+import sys
+import types
+
+import main.indicators
+
+# EMA set of the stand-in cluster conditions; the real ones live in private.conditions
+STANDIN_PERIODS = (9, 21, 50, 100)
+
+
+# Module-level so the process-pool scan can pickle them by reference
+def ema_cluster_3(df, task="past", accuracy=0.2):
+    return list(main.indicators.find_ema_clusters(df, STANDIN_PERIODS, accuracy=accuracy, size=3))
+
+
+def ema_cluster_4(df, task="past", accuracy=0.2):
+    return list(main.indicators.find_ema_clusters(df, STANDIN_PERIODS, accuracy=accuracy, size=4))
+
+
+def install_standins():
+    """
+    Install private.credentials / private.conditions stand-ins, each only when
+    the real module cannot be imported.
+    """
+    try:
+        import private.credentials  # noqa: F401
+    except ImportError:
+        private = sys.modules.setdefault("private", types.ModuleType("private"))
+        private.__path__ = getattr(private, "__path__", [])
+        credentials = types.ModuleType("private.credentials")
+        credentials.ACCESS_TOKEN = "benchmark"
+        credentials.API_KEY = credentials.API_SECRET = credentials.REDIRECT_URL = ""
+        sys.modules["private.credentials"] = private.credentials = credentials
+
+    try:
+        import private.conditions  # noqa: F401
+    except ImportError:
+        conditions = types.ModuleType("private.conditions")
+        conditions.ema_cluster_3 = ema_cluster_3
+        conditions.ema_cluster_4 = ema_cluster_4
+        sys.modules["private.conditions"] = sys.modules["private"].conditions = conditions
+
+
+def write_instruments(path, count):
+    """Instrument master with `count` NSE equities BENCH0..BENCH{count-1}, as the fake server serves them."""
+    instruments = [
+        {"trading_symbol": f"BENCH{i}", "exchange": "NSE", "instrument_type": "EQ",
+         "instrument_key": f"NSE_EQ|BENCH{i:05d}"}
+        for i in range(count)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(instruments, f)
@@ -0,0 +1,47 @@
+import json
+import types
+
+import pytest
+
+from main import auth
+
+APPS = {
+    "first": {"API_KEY": "k1", "API_SECRET": "s1", "REDIRECT_URL": "http://localhost/cb"},
+    "second": {"API_KEY": "k2", "API_SECRET": "s2", "REDIRECT_URL": "http://localhost/cb"},
+}
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_apps_and_unknown_names():
+    single = types.SimpleNamespace(API_KEY="k", API_SECRET="s", REDIRECT_URL="r")
+    assert auth.load_apps(single) == {"default": {"API_KEY": "k", "API_SECRET": "s", "REDIRECT_URL": "r"}}
+    assert auth.get_app(None, APPS)[0] == "first"
+    with pytest.raises(ValueError, match="Unknown app 'third'"):
+        auth.get_app("third", APPS)
+
+
+def test_login_saves_the_token_in_the_tokens_file_only(monkeypatch, tmp_path):
+    posted = []
+    monkeypatch.setattr(auth.webbrowser, "open", lambda url: None)
+    monkeypatch.setattr("builtins.input", lambda prompt: " the-code ")
+    monkeypatch.setattr(auth.requests, "post",
+                        lambda url, data: posted.append(data) or _Response({"access_token": "fresh"}))
+
+    path = auth.login("second", APPS, path=tmp_path / "tokens.json")
+    assert json.loads(path.read_text()) == {"second": "fresh"}
+    assert posted[0]["code"] == "the-code" and posted[0]["client_id"] == "k2"
+    assert list(tmp_path.iterdir()) == [path]
+
+    monkeypatch.setattr(auth.requests, "post", lambda url, data: _Response({"errors": []}))
+    with pytest.raises(ValueError):
+        auth.login("first", APPS, path=tmp_path / "tokens.json")
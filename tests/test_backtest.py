@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main.backtest
+
+PERIODS = (2, 3, 4)
+
+# Flat closes keep every EMA at 100, so the 3-EMA cluster fires on bars 0-4 and
+# the climb from bar 5 on pulls the EMAs apart. Opens gap away from the previous
+# close, so entering at the next open differs from close-to-close.
+CLOSES = [100.0, 100.0, 100.0, 100.0, 100.0, 105.0, 110.0, 115.0, 120.0, 125.0]
+OPENS = [100.0, 99.0, 101.0, 98.0, 95.0, 102.0, 106.0, 111.0, 116.0, 121.0]
+
+
+@pytest.fixture
+def candles():
+    index = pd.date_range("2025-10-06 09:15", periods=len(CLOSES), freq="h", tz="Asia/Kolkata", name="timestamp")
+    return pd.DataFrame({
+        "open": OPENS, "high": np.maximum(OPENS, CLOSES) + 1, "low": np.minimum(OPENS, CLOSES) - 1,
+        "close": CLOSES, "volume": 1000, "oi": 0,
+    }, index=index)
+
+
+def test_forward_returns_enter_at_the_next_open():
+    returns = main.backtest.forward_returns(OPENS, CLOSES, horizons=(1, 3, 10))
+    assert returns.shape == (len(CLOSES), 3)
+    for t in range(len(CLOSES)):
+        for k, h in enumerate((1, 3)):
+            if t + h < len(CLOSES):
+                assert returns[t, k] == pytest.approx(CLOSES[t + h] / OPENS[t + 1] - 1)
+            else:
+                assert np.isnan(returns[t, k])
+    assert np.isnan(returns[:, 2]).all()    # horizon longer than the history
+
+
+def test_signal_mask_from_timestamps_and_masks(candles):
+    mask = np.zeros(len(candles), dtype=bool)
+    mask[[2, 4]] = True
+    assert (main.backtest.signal_mask(candles, mask) == mask).all()
+    assert (main.backtest.signal_mask(candles, list(candles.index[[2, 4]])) == mask).all()
+    assert not main.backtest.signal_mask(candles, None).any()
+    with pytest.raises(ValueError):
+        main.backtest.signal_mask(candles, mask[:-1])
+
+
+def test_ema_cluster_signal_is_causal(candles):
+    signal = main.backtest.ema_cluster_signal(PERIODS, size=3, accuracy=0.2)
+    mask = main.backtest.signal_mask(candles, signal(candles))
+    assert list(np.flatnonzero(mask)) == [0, 1, 2, 3, 4]
+
+    # No lookahead: a bar's signal only depends on bars up to it
+    for end in range(1, len(candles) + 1):
+        assert (main.backtest.signal_mask(candles.iloc[:end], signal(candles.iloc[:end])) == mask[:end]).all()
+
+
+def test_backtest_trades_and_statistics(candles):
+    result = main.backtest.backtest([("X", "NSE")], main.backtest.ema_cluster_signal(PERIODS, size=3, accuracy=0.2),
+                                    horizons=(1, 2), loader=lambda symbol, exchange: candles, workers=1)
+    assert (result.signal_bars, result.symbols, result.bars, result.errors) == (5, 1, len(CLOSES), {})
+
+    signals = result.signals
+    assert list(signals["timestamp"]) == list(candles.index[:5])
+    expected_1 = [CLOSES[t + 1] / OPENS[t + 1] - 1 for t in range(5)]
+    expected_2 = [CLOSES[t + 2] / OPENS[t + 1] - 1 for t in range(5)]
+    np.testing.assert_allclose(signals["return_1"], expected_1)
+    np.testing.assert_allclose(signals["return_2"], expected_2)
+
+    # The last signal bar's own drop from its 95 open is not part of the trade
+    assert signals["return_1"].iloc[-1] == pytest.approx(105 / 102 - 1)
+
+    stats = result.stats
+    assert list(stats["signals"]) == [5, 5]
+    assert stats.loc[1, "mean_return"] == pytest.approx(np.mean(expected_1))
+    assert stats.loc[1, "hit_rate"] == pytest.approx(np.mean(np.array(expected_1) > 0))
+    assert stats.loc[2, "max_return"] == pytest.approx(max(expected_2))
+    baseline = [CLOSES[t + 1] / OPENS[t + 1] - 1 for t in range(len(CLOSES) - 1)]
+    assert stats.loc[1, "baseline_mean"] == pytest.approx(np.mean(baseline))
+    assert stats.loc[1, "edge"] == pytest.approx(np.mean(expected_1) - np.mean(baseline))
+
+
+def test_backtest_reports_failing_symbols(candles):
+    def loader(symbol, exchange):
+        if symbol == "BAD":
+            raise RuntimeError("boom")
+        return candles
+
+    result = main.backtest.backtest([("X", "NSE"), ("BAD", "NSE")], main.backtest.ema_cluster_signal(PERIODS),
+                                    horizons=(1,), loader=loader, workers=2, chunk_size=1)
+    assert result.symbols == 1
+    assert list(result.errors) == [("BAD", "NSE")]
@@ -0,0 +1,89 @@
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main.charts
+import main.screener
+from benchmarks.fake_upstox import synthetic_candles
+from main import decode, metrics
+
+
+@pytest.fixture(scope="module")
+def minutes():
+    """Three sessions of one-minute bars."""
+    return decode.candles_to_frame(synthetic_candles("NSE_EQ|CHART", "minutes", 1, date(2025, 10, 6), date(2025, 10, 8)))
+
+
+@pytest.mark.parametrize("threshold", [3, 50, 400])
+def test_lttb_keeps_the_ends_and_the_size(minutes, threshold):
+    close = minutes["close"].to_numpy()
+    kept = main.charts.lttb(np.arange(len(close)), close, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == len(close) - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_short_series_whole():
+    assert list(main.charts.lttb([0, 1, 2, 3], [1, 5, 2, 4], 10)) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("buckets", [1, 60, 300])
+def test_minmax_keeps_the_ends_and_every_extreme(minutes, buckets):
+    close = minutes["close"].to_numpy()
+    kept = main.charts.minmax_indices(close, buckets)
+    assert kept[0] == 0 and kept[-1] == len(close) - 1
+    assert len(kept) <= 2 * buckets + 2
+    assert (np.diff(kept) > 0).all()
+    assert np.argmin(close) in kept and np.argmax(close) in kept
+
+
+@pytest.mark.parametrize("buckets", [1, 75, 1000])
+def test_aggregate_ohlc_keeps_the_ends_and_the_size(minutes, buckets):
+    out, ends = main.charts.aggregate_ohlc(minutes, buckets)
+    assert len(out) == min(buckets, len(minutes)) == len(ends)
+    assert out["open"].iloc[0] == minutes["open"].iloc[0]
+    assert out["close"].iloc[-1] == minutes["close"].iloc[-1]
+    assert out.index[0] == minutes.index[0] and ends[-1] == len(minutes) - 1
+    assert out["volume"].sum() == minutes["volume"].sum()
+
+
+def test_aggregate_ohlc_matches_a_resample(minutes):
+    day = minutes[minutes.index.date == date(2025, 10, 6)]          # 375 bars, 09:15-15:29
+    out, _ = main.charts.aggregate_ohlc(day, 75)
+    expected = day.resample("5min", origin="start").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    )
+    pd.testing.assert_frame_equal(out, expected.astype("float64"), check_freq=False, check_index_type=False)
+
+
+def test_render_batch_writes_pngs_and_reports_failures(minutes, tmp_path):
+    pytest.importorskip("matplotlib")
+
+    def loader(symbol, exchange):
+        if symbol == "BAD":
+            raise RuntimeError("no data")
+        return minutes
+
+    paths, errors = main.charts.render_batch(["GOOD", ("BAD", "NSE")], str(tmp_path), loader=loader,
+                                             workers=2, emas=(9, 21), width=400, height=200)
+    assert list(paths) == [("GOOD", "NSE")] and list(errors) == [("BAD", "NSE")]
+    with open(paths[("GOOD", "NSE")], "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+def test_scan_charts_cover_the_scan_window(monkeypatch, tmp_path):
+    import main.__main__
+
+    monkeypatch.setattr(metrics.logger, "handlers", list(metrics.logger.handlers))
+    monkeypatch.setattr(metrics.logger, "propagate", metrics.logger.propagate)
+    monkeypatch.setattr(metrics.logger, "level", metrics.logger.level)
+    monkeypatch.setattr(main.screener, "get_clustered_stocks", lambda **kwargs: [("BENCH0", "NSE")])
+    calls = []
+    monkeypatch.setattr(main.charts, "render_batch", lambda pairs, directory, **kwargs: calls.append(kwargs))
+
+    assert main.__main__.main(["scan", "--days", "7", "--charts", os.path.join(str(tmp_path), "charts")]) == 0
+    from_date = calls[0]["from_date"]
+    assert abs(from_date - (datetime.now() - timedelta(days=7))) < timedelta(minutes=1)
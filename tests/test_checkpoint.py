@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main.checkpoint
+import main.screener
+
+
+def test_scalar_condition_results(tmp_path):
+    with main.checkpoint.ScanCheckpoint(str(tmp_path / "scan.jsonl")) as store:
+        store.record("A", "NSE", (np.bool_(True), np.False_))
+        store.record("B", "NSE", (np.False_, False))
+        store.record("C", "NSE", ([pd.Timestamp("2025-10-08 09:15", tz="Asia/Kolkata")], []))
+
+    _, records = main.checkpoint.read_checkpoint(str(tmp_path / "scan.jsonl"))
+    assert (records[("A", "NSE")]["cluster_3"], records[("A", "NSE")]["cluster_4"]) == (["true"], [])
+    assert (records[("B", "NSE")]["cluster_3"], records[("B", "NSE")]["cluster_4"]) == ([], [])
+    assert records[("C", "NSE")]["cluster_3"] == ["2025-10-08T09:15:00+05:30"]
+    assert [r["status"] for r in records.values()] == ["ok", "ok", "ok"]
+
+
+def test_interrupted_scan_resumes_where_it_stopped(fake_upstox, monkeypatch, tmp_path):
+    path = str(tmp_path / "scan.jsonl")
+    expected = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05)
+
+    real = main.screener.timed_check_ema_clusters
+    checked = []
+    interrupt = ["BENCH5"]
+
+    def check(symbol, *args, **kwargs):
+        if symbol in interrupt:
+            interrupt.remove(symbol)
+            raise KeyboardInterrupt
+        checked.append(symbol)
+        return real(symbol, *args, **kwargs)
+
+    monkeypatch.setattr(main.screener, "timed_check_ema_clusters", check)
+    with pytest.raises(KeyboardInterrupt):
+        main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, checkpoint=path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "record", "symbol": "BENCH5", "exch')   # torn last line
+
+    del checked[:]
+    assert main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, checkpoint=path) == expected
+    assert checked == [f"BENCH{i}" for i in range(5, 12)]
+
+    # A different scan must not pick up these records
+    with pytest.raises(ValueError):
+        main.screener.get_clustered_stocks(days=5, ema_accuracy=0.05, checkpoint=path)
+
+
+def test_parquet_output_matches_the_checkpoint(fake_upstox, tmp_path):
+    pytest.importorskip("pyarrow")
+    path, output = str(tmp_path / "scan.jsonl"), str(tmp_path / "scan.parquet")
+    clustered = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, checkpoint=path, output=output)
+
+    table = main.checkpoint.load_results(output)
+    records = main.checkpoint.load_results(path)
+    assert list(table["symbol"]) == [f"BENCH{i}" for i in range(12)] == list(records["symbol"])
+    assert set(table["status"]) == {"ok"} and clustered
+    assert [s for s, c3, c4 in zip(table["symbol"], table["cluster_3"], table["cluster_4"])
+            if len(c3) or len(c4)] == clustered
+
+    # Timestamps survive the round trip in IST
+    import pyarrow.parquet as pq
+    column = pq.read_table(output).column("cluster_3")
+    assert str(column.type.value_type.tz) == "Asia/Kolkata"
+    for stamps, isoformats in zip(column.to_pylist(), records["cluster_3"]):
+        assert [pd.Timestamp(t) for t in stamps] == [pd.Timestamp(t) for t in isoformats]
@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+from main import client
+from main import ratelimit
+
+
+def _response(status, body=b"{}", headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp._content_consumed = True
+    resp.headers.update(headers or {})
+    resp.url = "http://upstox.test/v3/candles"
+    return resp
+
+
+class StubSession:
+    """Answers get() from a script of responses / exceptions and records every call."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(client.time, "sleep", sleeps.append)
+    monkeypatch.setattr(client.random, "uniform", lambda lo, hi: hi)   # jitter at its upper bound
+
+    def install(*script):
+        session = StubSession(script)
+        monkeypatch.setattr(client, "get_session", lambda: session)
+        return session, sleeps
+    return install
+
+
+def _get(**kwargs):
+    return client.get("http://upstox.test/v3/candles", limiter=ratelimit.RateLimiter([]), **kwargs)
+
+
+def test_429_waits_for_retry_after(stub):
+    session, sleeps = stub(_response(429, headers={"Retry-After": "7"}), _response(200))
+    assert _get().status_code == 200
+    assert session.calls == 2
+    assert sleeps == [7.0]
+
+
+def test_retry_after_is_capped(stub):
+    session, sleeps = stub(_response(503, headers={"Retry-After": "3600"}), _response(200))
+    _get()
+    assert sleeps == [client.BACKOFF_MAX]
+
+
+def test_server_errors_back_off_exponentially(stub):
+    session, sleeps = stub(_response(500), _response(502), requests.ConnectionError("reset"), _response(504),
+                           _response(200))
+    assert _get().status_code == 200
+    assert session.calls == 5
+    assert sleeps == [client.BACKOFF_BASE * 2 ** k for k in range(4)]
+
+
+def test_gives_up_after_max_retries(stub):
+    session, sleeps = stub(*[_response(503)] * 4)
+    with pytest.raises(requests.HTTPError):
+        _get(retries=3)
+    assert session.calls == 4 and len(sleeps) == 3
+
+    session, sleeps = stub(*[requests.Timeout("slow")] * 3)
+    with pytest.raises(requests.Timeout):
+        _get(retries=2)
+    assert session.calls == 3
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_client_errors_are_not_retried(stub, status):
+    session, sleeps = stub(_response(status), _response(200))
+    with pytest.raises(requests.HTTPError):
+        _get()
+    assert session.calls == 1 and sleeps == []
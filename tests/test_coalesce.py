@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from main import metrics
+from main.coalesce import SingleFlight, TTLCache
+
+CALLERS = 5
+
+
+def _run_concurrently(flight, key, fn):
+    """do(key, fn) from CALLERS threads; returns each thread's (value, shared) or exception."""
+    outcomes = [None] * CALLERS
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def _wait_for_followers(name, before=0):
+    # Followers count themselves just before they block on the leader's call
+    deadline = time.monotonic() + 10
+    while metrics.REGISTRY.counter_value("requests_coalesced_total", flight=name) - before < CALLERS - 1:
+        assert time.monotonic() < deadline, "followers never joined the call"
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    name = "test-share"
+    flight = SingleFlight(name)
+    calls = []
+    before = metrics.REGISTRY.counter_value("requests_coalesced_total", flight=name)
+
+    def fn():
+        calls.append(threading.current_thread().name)
+        _wait_for_followers(name, before)
+        return {"candles": [1, 2, 3]}
+
+    outcomes = _run_concurrently(flight, ("NSE_EQ|X", "hours"), fn)
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * (CALLERS - 1)
+    assert all(value is outcomes[0][0] for value, _ in outcomes)
+
+    # Completed keys are forgotten: the next call runs again
+    assert flight.do(("NSE_EQ|X", "hours"), lambda: "again") == ("again", False)
+
+
+def test_an_exception_reaches_every_waiter():
+    name = "test-error"
+    flight = SingleFlight(name)
+    calls = []
+    before = metrics.REGISTRY.counter_value("requests_coalesced_total", flight=name)
+
+    def fn():
+        calls.append(1)
+        _wait_for_followers(name, before)
+        raise RuntimeError("upstream down")
+
+    outcomes = _run_concurrently(flight, "key", fn)
+    assert len(calls) == 1
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert len({id(outcome) for outcome in outcomes}) == 1
+    with pytest.raises(KeyError):
+        flight._calls["key"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=30, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    cache.set("c", 3, ttl=0)        # not stored
+
+    clock.now += 29.9
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, 2, None)
+    clock.now += 0.1
+    assert (cache.get("a"), cache.get("b")) == (None, 2)
+    assert len(cache) == 1
+    clock.now += 30
+    assert cache.get("b") is None
+
+
+def test_full_cache_drops_expired_then_oldest_entries():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, max_entries=3, clock=clock)
+    cache.set("old", 1, ttl=1)
+    cache.set("a", 2)
+    cache.set("b", 3)
+    clock.now += 5
+    cache.set("c", 4)               # "old" has expired and goes first
+    assert [cache.get(k) for k in ("a", "b", "c")] == [2, 3, 4]
+    cache.set("d", 5)               # then the oldest live entry
+    assert [cache.get(k) for k in ("a", "b", "c", "d")] == [None, 3, 4, 5]
@@ -0,0 +1,23 @@
+import pytest
+
+import main.screener
+import test_main
+
+
+def test_test_limit_forwards_to_limit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.screener, "get_clustered_stocks", lambda **kwargs: calls.append(kwargs) or [])
+
+    test_main.get_clustered_stocks(days=5, exchanges="NSE", test_limit=10)
+    test_main.get_clustered_stocks(5, "NSE", 0.1, 3, 4)              # original positional order
+    test_main.get_clustered_stocks(limit=7, checkpoint="scan.jsonl")
+    assert [(c["limit"], c["ema_accuracy"], c["workers"]) for c in calls] == [(10, 0.2, None), (3, 0.1, 4), (7, 0.2, None)]
+    assert calls[2]["checkpoint"] == "scan.jsonl"
+
+    with pytest.raises(TypeError):
+        test_main.get_clustered_stocks(test_limit=10, limit=10)
+
+
+def test_test_limit_scans_the_first_symbols(fake_upstox):
+    assert test_main.get_clustered_stocks(days=10, ema_accuracy=0.05, test_limit=4) == \
+        main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, limit=4)
@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+import main.daemon
+import main.fetch
+import main.indicators
+import main.screener
+from main import sessions
+from tests import support
+
+DAY = date(2025, 10, 8)     # a Wednesday session
+ACCURACY = 0.2              # the scan's default; some synthetic bars cluster, most do not
+
+
+def _at(hour, minute):
+    return datetime(DAY.year, DAY.month, DAY.day, hour, minute, tzinfo=sessions.IST)
+
+
+def _pairs(count):
+    return [(f"BENCH{i}", "NSE") for i in range(count)]
+
+
+def _published(symbol, watcher, now):
+    """Every bar the server has for `symbol` from the watcher's window start, as one frame."""
+    start = watcher._window_start(now).date()
+    frames = [
+        main.fetch.get_historical_candle(symbol, exchange="NSE", unit="hours", interval=1,
+                                         from_date=start, to_date=sessions.previous_trading_day(DAY)),
+        main.fetch.get_intraday_candle(symbol, exchange="NSE", unit="hours", interval=1),
+    ]
+    return pd.concat(frames).sort_index()
+
+
+def test_poll_applies_only_the_newest_bars(fake_upstox):
+    fake_upstox.today = DAY
+    watcher = main.daemon.ClusterWatcher(_pairs(3), ema_accuracy=ACCURACY, workers=2)
+
+    # Seeded before the session's intraday bars reach the historical endpoint
+    watcher.seed(now=_at(11, 20))
+    requests = fake_upstox.requests
+    watcher.poll(now=_at(12, 20))
+
+    # One intraday request per symbol; the seed already covered earlier sessions
+    assert fake_upstox.requests - requests == 3
+    now = _at(12, 20)
+    for symbol, exchange in watcher.pairs:
+        state = watcher.states[(symbol, exchange)]
+        expected = watcher._completed(_published(symbol, watcher, now), now)
+        expected = expected[expected.index >= watcher._window_start(now)]
+        assert state.timestamp == pd.Timestamp(_at(11, 15))
+        pd.testing.assert_index_equal(state.candles.index, expected.index)
+        assert state.clusters == main.screener.evaluate_clusters(expected, ACCURACY)
+
+
+def test_poll_backfills_a_symbol_seeded_without_bars(fake_upstox, monkeypatch):
+    fake_upstox.today = DAY
+    watcher = main.daemon.ClusterWatcher(_pairs(2), ema_accuracy=ACCURACY, workers=2)
+
+    # BENCH1's seed comes back empty, as for a symbol the store had nothing for yet
+    get_all_candles = main.fetch.get_all_candles
+
+    def seed_fetch(symbol, **kwargs):
+        df = get_all_candles(symbol, **kwargs)
+        return df.iloc[:0] if symbol == "BENCH1" else df
+
+    monkeypatch.setattr(main.fetch, "get_all_candles", seed_fetch)
+    watcher.seed(now=_at(11, 20))
+    state = watcher.states[("BENCH1", "NSE")]
+    assert state.timestamp is None and state.clusters is None
+
+    watcher.poll(now=_at(12, 20))
+    now = _at(12, 20)
+    expected = watcher._completed(_published("BENCH1", watcher, now), now)
+    expected = expected[expected.index >= watcher._window_start(now)]
+    pd.testing.assert_index_equal(state.candles.index, expected.index)
+    pd.testing.assert_index_equal(state.candles.index, watcher.states[("BENCH0", "NSE")].candles.index)
+
+
+def test_streaming_emas_match_a_recompute(fake_upstox):
+    fake_upstox.today = DAY
+    watcher = main.daemon.ClusterWatcher(_pairs(3), ema_accuracy=ACCURACY, periods=support.STANDIN_PERIODS,
+                                         workers=2)
+    seed_at = _at(11, 20)
+    watcher.seed(now=seed_at)
+    for hour in (12, 13, 14):
+        watcher.poll(now=_at(hour, 20))
+
+    now = _at(14, 20)
+    for symbol, exchange in watcher.pairs:
+        state = watcher.states[(symbol, exchange)]
+        assert state.candles is None
+
+        # Same EMAs computed over every bar since the seed window, then cut to the current window
+        bars = watcher._completed(_published(symbol, watcher, seed_at), now)
+        bars = bars[bars.index >= watcher._window_start(seed_at)]
+        for size, hits in zip((3, 4), state.clusters):
+            expected = main.indicators.find_ema_clusters(bars, support.STANDIN_PERIODS, accuracy=ACCURACY, size=size)
+            assert hits == [t for t in expected if t >= watcher._window_start(now)]
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from main import decode
+
+ROWS = [  # newest first, as the API returns them
+    ["2025-10-03T11:15:00+05:30", 111.39, 112.70, 111.38, 112.32, 1878543, 0],
+    ["2025-10-03T10:15:00+05:30", 110.00, 111.50, 109.80, 111.40, 2000000, 0],
+    ["2025-10-03T09:15:00+05:30", 109.10, 110.20, 108.90, 110.00, 2500000, 0],
+]
+
+
+def test_decode_matches_a_pandas_reference():
+    df = decode.decode_candles(json.dumps({"status": "success", "data": {"candles": ROWS}}))
+
+    expected = pd.DataFrame(ROWS[::-1], columns=decode.CANDLE_COLUMNS)
+    expected.index = pd.DatetimeIndex(pd.to_datetime(expected.pop("timestamp")), name="timestamp")
+    pd.testing.assert_frame_equal(df, expected, check_index_type=False)
+    assert df.index.is_monotonic_increasing
+    assert str(df.index.tz) == "UTC+05:30"
+    assert df.index[0].hour == 9 and df.index[0].minute == 15
+
+
+def test_rows_without_oi_and_empty_payloads():
+    df = decode.candles_to_frame([row[:6] for row in ROWS])
+    assert (df["oi"] == 0).all()
+    assert list(df.columns) == decode.CANDLE_COLUMNS[1:]
+
+    empty = decode.decode_candles(b'{"status": "success", "data": {"candles": []}}')
+    assert empty.empty and list(empty.columns) == decode.CANDLE_COLUMNS[1:]
+    assert decode.decode_candles(b'{"status": "success", "data": null}').empty
+
+
+def test_compact_dtypes():
+    df = decode.candles_to_frame(ROWS, compact=True)
+    assert df["close"].dtype == np.float32
+    assert df["volume"].dtype == np.int64
+    assert df["oi"].dtype == np.uint32
+    assert df["close"].iloc[-1] == np.float32(112.32)
+
+
+def test_unsorted_rows_and_other_offsets():
+    shuffled = [ROWS[1], ROWS[0], ROWS[2]]
+    assert list(decode.candles_to_frame(shuffled)["close"]) == [110.00, 111.40, 112.32]
+
+    index = decode.parse_timestamps(["2025-10-03T03:45:00Z", "2025-10-03T09:15:00+05:30"])
+    assert index[0] == index[1]
+    assert str(index.tz) == "UTC+05:30"
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import indicators
+
+
+def _candles(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-09-01 09:15", periods=n, freq="h", tz="Asia/Kolkata")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+                         "volume": 1000, "oi": 0}, index=index)
+
+
+@pytest.mark.parametrize("period", [3, 9, 21, 50])
+def test_streaming_ema_matches_pandas_ewm(period):
+    df = _candles()
+    reference = df["close"].ewm(span=period, adjust=False).mean()
+
+    ema = indicators.StreamingMovingAverage.from_dataframe(df.iloc[:100], period=period)
+    assert ema.value == pytest.approx(reference.iloc[99], rel=1e-12)
+    for ts, close in df["close"].iloc[100:].items():
+        value = ema.update(close, timestamp=ts)
+        assert value == pytest.approx(reference.loc[ts], rel=1e-12)
+
+    cold = indicators.StreamingMovingAverage(period=period)
+    values = [cold.update(close) for close in df["close"]]
+    np.testing.assert_allclose(values, reference.to_numpy(), rtol=1e-12)
+
+
+def test_revising_the_forming_candle_matches_a_recompute():
+    df = _candles(60)
+    ema = indicators.StreamingMovingAverage.from_dataframe(df.iloc[:-1], period=10)
+    last = df.index[-1]
+    ema.update(df["close"].iloc[-1] * 0.97, timestamp=last)    # first tick of the forming bar
+    value = ema.update(df["close"].iloc[-1], timestamp=last)   # same bar, final price
+    assert value == pytest.approx(df["close"].ewm(span=10, adjust=False).mean().iloc[-1], rel=1e-12)
+
+    restored = indicators.StreamingMovingAverage.from_dict(ema.to_dict())
+    assert restored.update(101.0) == pytest.approx(ema.update(101.0), rel=1e-15)
+
+
+def test_streaming_sma_matches_pandas_rolling():
+    df = _candles(80)
+    sma = indicators.StreamingMovingAverage(period=14, MA="simple")
+    values = [sma.update(close) for close in df["close"]]
+    np.testing.assert_allclose(values, df["close"].rolling(14, min_periods=1).mean().to_numpy(), rtol=1e-12)
+
+
+def test_ema_bank_matches_moving_average():
+    df = _candles()
+    periods = (5, 12, 26)
+    bank = indicators.ema_bank(df, periods)
+    for k, period in enumerate(periods):
+        np.testing.assert_allclose(bank[:, k], indicators.moving_average(df, period).to_numpy(), rtol=1e-12)
+
+
+def _ragged_frames():
+    # Different starts, ends and missing bars, so the aligned panel is NaN-padded
+    return {
+        "A": _candles(300, seed=1),
+        "B": _candles(300, seed=2).iloc[40:],
+        "C": _candles(300, seed=3).iloc[:250].drop(_candles(300).index[100:120]),
+        "D": _candles(300, seed=4).iloc[::3],
+    }
+
+
+@pytest.mark.parametrize("MA", ["simple", "exponential"])
+@pytest.mark.parametrize("period", [1, 5, 21, 50, 200])
+def test_moving_average_panel_matches_moving_average(MA, period):
+    frames = _ragged_frames()
+    panel = indicators.moving_average_panel(frames, period=period, MA=MA)
+    assert list(panel.columns) == list(frames)
+
+    for symbol, df in frames.items():
+        column = panel[symbol]
+        expected = indicators.moving_average(df, period=period, MA=MA)
+        np.testing.assert_allclose(column.loc[df.index].to_numpy(), expected.to_numpy(), rtol=1e-10)
+        assert column.drop(df.index).isna().all()
+
+
+def test_ema_bank_panel_matches_moving_average():
+    frames = _ragged_frames()
+    periods = (9, 21, 50, 100)
+    index, symbols, _ = indicators.align_panel(frames)
+    bank = indicators.ema_bank(frames, periods)
+    assert bank.shape == (len(index), len(symbols), len(periods))
+
+    for j, symbol in enumerate(symbols):
+        rows = index.get_indexer(frames[symbol].index)
+        for k, period in enumerate(periods):
+            np.testing.assert_allclose(bank[rows, j, k], indicators.moving_average(frames[symbol], period).to_numpy(),
+                                       rtol=1e-10)
@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from main import instruments
+
+INSTRUMENTS = [
+    {"trading_symbol": "RELIANCE", "exchange": "NSE", "instrument_type": "EQ", "instrument_key": "NSE_EQ|INE002A01018"},
+    {"trading_symbol": "RELIANCE", "exchange": "BSE", "instrument_type": "EQ", "instrument_key": "BSE_EQ|INE002A01018"},
+    {"trading_symbol": "NIFTY25OCTFUT", "exchange": "NSE_FO", "instrument_type": "FUT", "instrument_key": "NSE_FO|1"},
+    {"asset_symbol": " nbcc ", "exchange": "NSE", "instrument_type": "EQ", "instrument_key": "NSE_EQ|INE095N01031"},
+    {"trading_symbol": "RELIANCE", "exchange": "NSE", "instrument_type": "EQ", "instrument_key": "NSE_EQ|DUPLICATE"},
+    {"trading_symbol": "GOLDBEES", "exchange": "NSE", "instrument_type": "ETF", "instrument_key": "NSE_EQ|INF204KB17I5"},
+]
+
+
+def _write(path, items, mtime=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def keys(tmp_path):
+    instruments.clear_index()
+    path = tmp_path / "keys.json"
+    _write(path, INSTRUMENTS, mtime=1_700_000_000)
+    yield path
+    instruments.clear_index()
+
+
+def test_lookup(keys):
+    index = instruments.get_index(keys)
+    assert index.lookup("reliance ", "nse")["instrument_key"] == "NSE_EQ|INE002A01018"   # first in file order wins
+    assert index.lookup("RELIANCE", "BSE")["instrument_key"] == "BSE_EQ|INE002A01018"
+    assert index.lookup("NBCC")["instrument_key"] == "NSE_EQ|INE095N01031"
+    assert index.lookup("RELIANCE", "MCX") is None
+    assert instruments.resolve_keys([("NBCC", "NSE"), ("TCS", "NSE")], keys) == {
+        ("NBCC", "NSE"): "NSE_EQ|INE095N01031", ("TCS", "NSE"): None
+    }
+
+
+def test_filter_by_type_and_exchange_prefix(keys):
+    index = instruments.get_index(keys)
+
+    def instrument_keys(items):
+        return [i["instrument_key"] for i in items]
+
+    assert instrument_keys(index.filter("EQ", "NSE")) == ["NSE_EQ|INE002A01018", "NSE_EQ|INE095N01031", "NSE_EQ|DUPLICATE"]
+    assert instrument_keys(index.filter(["ETF", "EQ"], "BSE")) == ["BSE_EQ|INE002A01018"]
+    assert instrument_keys(index.filter(["ETF", "FUT"], None)) == ["NSE_FO|1", "NSE_EQ|INF204KB17I5"]   # file order
+    assert instrument_keys(index.filter(None, "NSE_")) == ["NSE_FO|1"]
+    assert len(index.filter(None, ["NSE", "BSE"])) == len(INSTRUMENTS)
+    assert index.filter("OPT", "NSE") == []
+    assert sorted(index.exchanges_with_prefix("NSE")) == ["NSE", "NSE_FO"]
+
+
+def test_index_reloads_when_the_file_changes(keys):
+    first = instruments.get_index(keys)
+    assert instruments.get_index(keys) is first          # unchanged file: no reload
+
+    # Rewritten in place, with the mtime bumped as a download would
+    _write(keys, INSTRUMENTS[:1] + [
+        {"trading_symbol": "TCS", "exchange": "NSE", "instrument_type": "EQ", "instrument_key": "NSE_EQ|INE467B01029"}
+    ], mtime=1_700_000_060)
+    second = instruments.get_index(keys)
+    assert second is not first and second.mtime == 1_700_000_060
+    assert second.lookup("TCS")["instrument_key"] == "NSE_EQ|INE467B01029"
+    assert second.lookup("NBCC") is None
+    assert instruments.get_index(keys) is second
+
+
+def test_missing_or_invalid_file(tmp_path, keys):
+    with pytest.raises(FileNotFoundError):
+        instruments.get_index(tmp_path / "missing.json")
+    _write(tmp_path / "bad.json", {"not": "a list"})
+    with pytest.raises(ValueError):
+        instruments.get_index(tmp_path / "bad.json")
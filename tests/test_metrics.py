@@ -0,0 +1,23 @@
+import io
+import logging
+import subprocess
+import sys
+
+from main import metrics
+
+
+def test_events_are_silent_until_logging_is_configured():
+    # A fresh interpreter: no handlers anywhere, so only logging.lastResort could print
+    code = "import logging, main.metrics; main.metrics.log_event('http_retry', logging.WARNING, attempt=1)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stderr == ""
+
+
+def test_configure_logging_still_emits(monkeypatch):
+    monkeypatch.setattr(metrics.logger, "handlers", list(metrics.logger.handlers))
+    monkeypatch.setattr(metrics.logger, "propagate", metrics.logger.propagate)
+    monkeypatch.setattr(metrics.logger, "level", metrics.logger.level)
+    stream = io.StringIO()
+    metrics.configure_logging(logging.INFO, json_lines=True, stream=stream)
+    metrics.log_event("http_retry", logging.WARNING, attempt=1)
+    assert '"http_retry"' in stream.getvalue()
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import main.fetch
+from main import decode
+from main.panel import UniversePanel
+
+
+def test_refresh_backfills_instruments_that_failed_earlier(fake_upstox, monkeypatch, tmp_path):
+    from_date = (datetime.now(decode.IST_OFFSET) - timedelta(days=10)).date()
+    real = main.fetch.get_all_candles
+    calls = []
+    failing = {"BENCH3"}
+
+    def flaky(symbol, **kwargs):
+        calls.append((symbol, kwargs["from_date"]))
+        if symbol in failing:
+            raise RuntimeError("boom")
+        return real(symbol, **kwargs)
+
+    monkeypatch.setattr(main.fetch, "get_all_candles", flaky)
+    panel = UniversePanel.from_instruments(tmp_path / "panel", exchanges="NSE")
+    added, errors = panel.refresh(from_date=from_date, workers=4)
+    assert added and list(errors) == [("BENCH3", "NSE")]
+    column = panel.symbols.index(("BENCH3", "NSE"))
+    assert panel.last_rows()[column] == -1
+
+    calls.clear()
+    failing.clear()
+    panel.refresh(workers=4)
+    starts = dict(calls)
+    assert starts["BENCH3"] == panel.index[0].date()           # backfilled from the panel's start
+    assert starts["BENCH0"] == panel.index[panel.last_rows()[0]].date()
+
+    backfilled = panel.frame(("BENCH3", "NSE"))
+    reference = real("BENCH3", exchange="NSE", from_date=panel.index[0].date())
+    assert len(backfilled) == len(reference[reference.index <= panel.index[-1]])
+    np.testing.assert_allclose(backfilled["close"], reference["close"].iloc[:len(backfilled)])
+    assert (panel.last_rows() >= 0).all()
+
+
+def test_last_rows_scans_back_in_blocks(tmp_path):
+    panel = UniversePanel.create(tmp_path / "panel", ["A", "B", "C"], unit="hours")
+    index = pd.date_range("2025-10-06 09:15", periods=10, freq="h", tz=decode.IST_OFFSET, name="timestamp")
+    frame = pd.DataFrame({"close": np.arange(10.0)}, index=index)
+    panel.append({"A": frame, "B": frame.iloc[:3]})
+    assert panel.last_rows(block=4).tolist() == [9, 2, -1]
+    assert panel.last_rows(block=100).tolist() == [9, 2, -1]
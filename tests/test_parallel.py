@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from datetime import date
+from multiprocessing import resource_tracker
+
+import pandas as pd
+
+import main.parallel
+from benchmarks.fake_upstox import synthetic_candles
+from main import decode
+from tests import support
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONDITIONS = [support.ema_cluster_3, support.ema_cluster_4]
+
+
+def _frames(count):
+    frames = {
+        f"SYM{i}": decode.candles_to_frame(synthetic_candles(f"NSE_EQ|SYM{i}", "hours", 1,
+                                                             date(2025, 9, 1), date(2025, 10, 3)))
+        for i in range(count)
+    }
+    frames["EMPTY"] = frames["SYM0"].iloc[:0]
+    return frames
+
+
+def test_shared_memory_scan_matches_the_serial_scan():
+    frames = _frames(9)
+    serial = {symbol: [c(df, accuracy=0.05) for c in CONDITIONS] for symbol, df in frames.items() if len(df)}
+
+    results, errors = main.parallel.evaluate_conditions(frames, CONDITIONS, processes=2, chunksize=2, accuracy=0.05)
+    assert errors == {}
+    assert list(results) == list(serial)     # input order, empty frames skipped
+    assert results == serial
+    assert any(c3 or c4 for c3, c4 in serial.values())
+
+
+def test_shared_frames_match_the_source():
+    frames = _frames(3)
+    with main.parallel.SharedCandlePanel.from_frames(frames) as panel:
+        attached = main.parallel.SharedCandlePanel.attach(panel.spec)
+        try:
+            for i, symbol in enumerate(panel.symbols):
+                pd.testing.assert_frame_equal(attached.frame(i), frames[symbol].astype("float64"),
+                                              check_index_type=False)
+        finally:
+            attached.close()
+
+
+def test_attach_leaves_the_block_to_its_creator(monkeypatch):
+    with main.parallel.SharedCandlePanel.from_frames(_frames(1)) as panel:
+        registered = []
+        monkeypatch.setattr(resource_tracker, "register", lambda name, rtype: registered.append(name))
+        main.parallel.SharedCandlePanel.attach(panel.spec).close()
+        assert registered == []
+
+
+def test_pool_scan_leaves_the_resource_tracker_quiet():
+    # The tracker reports leaks and failed unregisters on stderr when the interpreter exits
+    script = (
+        "from tests import support; support.install_standins()\n"
+        "from tests.test_parallel import CONDITIONS, _frames\n"
+        "import main.parallel\n"
+        "main.parallel.evaluate_conditions(_frames(4), CONDITIONS, processes=2, accuracy=0.05)\n"
+    )
+    done = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
+    assert "resource_tracker" not in done.stderr and "KeyError" not in done.stderr
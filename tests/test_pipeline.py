@@ -0,0 +1,85 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fake_upstox import synthetic_candles
+from main import decode, pipeline
+
+
+@pytest.fixture(scope="module")
+def candles():
+    """Two weeks of hourly bars, seven a session."""
+    return decode.candles_to_frame(synthetic_candles("NSE_EQ|PIPE", "hours", 1, date(2025, 9, 22), date(2025, 10, 3)))
+
+
+def _assert_column(actual, expected):
+    # Same values and the same NaN (warm-up) positions
+    np.testing.assert_array_equal(np.isnan(actual), expected.isna().to_numpy())
+    np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-10, equal_nan=True)
+
+
+def test_macd(candles):
+    out = pipeline.compute(candles, pipeline.MACD(12, 26, 9), pipeline.EMA(12))
+    close = candles["close"]
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+    _assert_column(out["macd"], line)
+    _assert_column(out["macd_signal"], signal)
+    _assert_column(out["macd_hist"], line - signal)
+    _assert_column(out["ema_12"], close.ewm(span=12, adjust=False).mean())
+
+
+def test_rsi(candles):
+    out = pipeline.compute(candles, ("rsi", 14))
+    change = candles["close"].diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False, ignore_na=True).mean()
+    loss = (-change.clip(upper=0)).ewm(alpha=1 / 14, adjust=False, ignore_na=True).mean()
+    expected = 100 * gain / (gain + loss)
+    assert np.isnan(out["rsi_14"].iloc[0])
+    _assert_column(out["rsi_14"], expected)
+    assert ((out["rsi_14"].iloc[1:] >= 0) & (out["rsi_14"].iloc[1:] <= 100)).all()
+
+
+def test_atr(candles):
+    out = pipeline.compute(candles, pipeline.ATR(14))
+    prev_close = candles["close"].shift()
+    true_range = pd.concat([
+        candles["high"] - candles["low"],
+        (candles["high"] - prev_close).abs(),
+        (candles["low"] - prev_close).abs(),
+    ], axis=1).max(axis=1)
+    _assert_column(out["atr_14"], true_range.ewm(alpha=1 / 14, adjust=False).mean())
+
+
+def test_bollinger(candles):
+    out = pipeline.compute(candles, pipeline.Bollinger(20, 2), pipeline.SMA(20))
+    close = candles["close"]
+    mid = close.rolling(20).mean()
+    std = close.rolling(20).std(ddof=0)
+    assert out["bb_20_mid"].iloc[:19].isna().all() and out["bb_20_mid"].iloc[19:].notna().all()
+    _assert_column(out["bb_20_mid"], mid)
+    _assert_column(out["bb_20_upper"], mid + 2 * std)
+    _assert_column(out["bb_20_lower"], mid - 2 * std)
+    _assert_column(out["sma_20"], close.rolling(20, min_periods=1).mean())
+
+
+def test_vwap_restarts_every_session(candles):
+    out = pipeline.compute(candles, "vwap")
+    typical = (candles["high"] + candles["low"] + candles["close"]) / 3
+    session = candles.index.date
+    expected = (typical * candles["volume"]).groupby(session).cumsum() / candles["volume"].groupby(session).cumsum()
+    _assert_column(out["vwap"], expected)
+
+    # The first bar of every session is its own typical price
+    firsts = ~pd.Series(session, index=candles.index).duplicated()
+    np.testing.assert_allclose(out["vwap"][firsts.to_numpy()], typical[firsts.to_numpy()])
+
+
+def test_shared_intermediates_are_planned_once():
+    pipe = pipeline.Pipeline([pipeline.MACD(), pipeline.EMA(12), pipeline.EMA(26)])
+    emas = [node for node in pipe.plan if node[0] == "ema" and node[1] == ("column", "close")]
+    assert sorted(node[2] for node in emas) == [12, 26]
+    with pytest.raises(ValueError):
+        pipeline.Pipeline([pipeline.EMA(12), pipeline.EMA(14, name="ema_12")])
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from main import planner
+from main import sessions
+
+
+def test_windows_cover_the_range_within_the_api_limits():
+    start, end = date(2024, 1, 1), date(2025, 3, 31)
+    for unit, interval, span in (("minutes", 1, 30), ("minutes", 30, 90), ("hours", 1, 90), ("days", 1, 3650)):
+        windows = planner.plan_windows(unit, interval, start, end)
+        assert windows[0][0] == start and windows[-1][1] == end
+        for (a, b), (c, _) in zip(windows, windows[1:]):
+            assert c == b + timedelta(days=1)
+        assert all((b - a).days + 1 <= span for a, b in windows)
+    assert planner.plan_windows("weeks", 1, start, end) == [(start, end)]
+    assert planner.plan_windows("days", 1, end, start) == []
+    with pytest.raises(ValueError):
+        planner.max_window_days("seconds", 1)
+
+
+def _at(day, hour, minute=0):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=sessions.IST)
+
+
+def test_intraday_only_while_todays_session_is_in_range():
+    friday = date(2025, 10, 17)
+    plan = planner.plan_fetch("hours", date(2025, 10, 13), friday, _at(friday, 11))
+    assert plan.intraday and plan.historical == (date(2025, 10, 13), date(2025, 10, 16))
+
+    assert not planner.plan_fetch("hours", date(2025, 10, 13), friday, _at(friday, 9)).intraday
+    assert not planner.plan_fetch("days", date(2025, 10, 13), friday, _at(friday, 11)).intraday
+    assert not planner.plan_fetch("hours", date(2025, 10, 13), date(2025, 10, 16), _at(friday, 11)).intraday
+
+    saturday = date(2025, 10, 18)
+    assert not planner.plan_fetch("hours", date(2025, 10, 13), saturday, _at(saturday, 11)).intraday
+
+
+def test_historical_is_skipped_for_ranges_without_a_session():
+    monday = date(2025, 10, 6)
+    # Saturday-Sunday only
+    assert planner.plan_fetch("hours", date(2025, 10, 4), date(2025, 10, 5), _at(monday, 11)).historical is None
+    # Today only: the historical endpoint never has it
+    assert planner.plan_fetch("hours", monday, monday, _at(monday, 11)).historical is None
+    # A holiday (Gandhi Jayanti) plus the weekend
+    plan = planner.plan_fetch("hours", date(2025, 10, 2), date(2025, 10, 5), _at(monday, 11))
+    assert plan.historical == (date(2025, 10, 2), date(2025, 10, 5))
+    assert planner.plan_fetch("hours", date(2025, 10, 2), date(2025, 10, 2), _at(monday, 11)).empty
+    assert planner.plan_fetch("hours", None, monday, _at(monday, 11)).historical == (None, date(2025, 10, 5))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main.checkpoint
+import main.fetch
+import main.prescreen
+import main.screener
+
+OPEN = {"min_turnover": None, "min_price": None}   # every symbol with daily data passes
+
+
+def _failing(monkeypatch, symbols):
+    """Make the daily fetch of `symbols` raise until the returned set is emptied."""
+    symbols = set(symbols)
+    real = main.fetch.get_all_candles
+
+    def fetch(symbol, **kwargs):
+        if symbol in symbols and kwargs.get("unit") == "days":
+            raise RuntimeError("daily fetch failed")
+        return real(symbol, **kwargs)
+
+    monkeypatch.setattr(main.fetch, "get_all_candles", fetch)
+    return symbols
+
+
+def test_stats_from_padded_arrays():
+    pairs = [("A", "NSE"), ("B", "NSE"), ("C", "NSE")]
+    close = np.array([[10.0, 100.0, np.nan], [11.0, np.nan, np.nan], [12.0, 102.0, np.nan]])
+    volume = np.array([[5.0, 1.0, np.nan], [5.0, np.nan, np.nan], [10.0, 3.0, np.nan]])
+    stats = main.prescreen.stats_from_arrays(pairs, close, volume, periods=(1, 2), turnover_bars=2)
+
+    assert list(stats["bars"]) == [3, 2, 0]
+    np.testing.assert_allclose(stats["last_close"], [12.0, 102.0, np.nan])
+    np.testing.assert_allclose(stats["avg_turnover"], [(55 + 120) / 2, 306.0, np.nan])
+    ema_2 = pd.Series([10.0, 11.0, 12.0]).ewm(span=2, adjust=False).mean().iloc[-1]
+    assert stats["ema_spread"].iloc[0] == pytest.approx((12.0 - ema_2) / 12.0 * 100)
+
+
+def test_stages_filter_precomputed_stats():
+    pairs = [("A", "NSE"), ("B", "NSE"), ("C", "NSE"), ("D", "NSE")]
+    stats = pd.DataFrame({
+        "symbol": [p[0] for p in pairs], "exchange": "NSE",
+        "bars": [60, 60, 0, 60],
+        "last_close": [250.0, 5.0, np.nan, 900.0],
+        "avg_turnover": [5e7, 5e7, np.nan, 1e6],
+        "ema_spread": [1.0, 1.0, np.nan, 1.0],
+    }, columns=main.prescreen.STAT_COLUMNS)
+    result = main.prescreen.prescreen(pairs, min_turnover=1e7, min_price=10, stats=stats)
+
+    assert result.shortlist == [("A", "NSE")]
+    assert [(r.name, r.candidates, r.survivors) for r in result.reports] == [
+        ("daily_stats", 4, 4), ("has_data", 4, 3), ("liquidity", 3, 2), ("price_band", 2, 1)
+    ]
+    assert result.errors == {}
+
+
+def test_failed_daily_fetches_are_reported(fake_upstox, monkeypatch):
+    _failing(monkeypatch, {"BENCH3", "BENCH7"})
+    pairs = [(f"BENCH{i}", "NSE") for i in range(12)]
+    result = main.prescreen.prescreen(pairs, workers=4, **OPEN)
+
+    assert sorted(result.errors) == [("BENCH3", "NSE"), ("BENCH7", "NSE")]
+    assert all(isinstance(e, RuntimeError) for e in result.errors.values())
+    assert result.shortlist == [p for p in pairs if p not in result.errors]
+    assert list(result.stats.loc[result.stats["symbol"].isin(["BENCH3", "BENCH7"]), "bars"]) == [0, 0]
+
+
+def test_scan_records_prescreen_failures_as_errors(fake_upstox, monkeypatch, tmp_path):
+    failing = _failing(monkeypatch, {"BENCH3"})
+    path = str(tmp_path / "scan.jsonl")
+    clustered = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, workers=4, prescreen=OPEN,
+                                                   checkpoint=path)
+
+    _, records = main.checkpoint.read_checkpoint(path)
+    assert records[("BENCH3", "NSE")]["status"] == "error"
+    assert "daily fetch failed" in records[("BENCH3", "NSE")]["error"]
+    assert "BENCH3" not in clustered
+    assert {r["status"] for pair, r in records.items() if pair != ("BENCH3", "NSE")} == {"ok"}
+    assert len(records) == 12
+
+    # Re-run once the daily fetch works again: the failed symbol is screened and scanned
+    failing.clear()
+    main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, workers=4, prescreen=OPEN, checkpoint=path)
+    _, records = main.checkpoint.read_checkpoint(path)
+    assert records[("BENCH3", "NSE")]["status"] == "ok"
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from main import ratelimit
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _max_in_window(times, period):
+    """Most grants inside any half-open window [t, t + period)."""
+    # A grant at g has left the window once g + period <= t (the limiter's own test)
+    best = 0
+    lo = 0
+    for hi, t in enumerate(times):
+        while times[lo] + period <= t:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+def _drive(limits, seconds, seed=0):
+    """Hammer a limiter on a fake clock for `seconds` and return the grant times."""
+    rng = random.Random(seed)
+    clock = FakeClock()
+    limiter = ratelimit.RateLimiter(limits, clock=clock)
+    end = clock.now + seconds
+    grants = []
+    while clock.now < end:
+        wait = limiter.try_acquire()
+        if wait == 0.0:
+            grants.append(clock.now)
+            # Callers arrive in bursts: mostly back to back, sometimes after a pause
+            clock.advance(0.0 if rng.random() < 0.8 else rng.random() * 0.05)
+        else:
+            assert wait > 0
+            clock.advance(wait)
+    return grants
+
+
+@pytest.mark.parametrize("limits, seconds", [
+    (((5, 1.0), (20, 10.0), (50, 60.0)), 400.0),
+    (ratelimit.UPSTOX_LIMITS, 2 * 3600.0),
+])
+def test_no_window_exceeds_its_quota(limits, seconds):
+    grants = _drive(limits, seconds)
+    for limit, period in limits:
+        assert _max_in_window(grants, period) <= limit
+    # The longest window is saturated, not just respected
+    limit, period = limits[-1]
+    assert _max_in_window(grants, period) == limit
+
+
+def test_first_minute_admits_the_minute_quota_only():
+    clock = FakeClock()
+    limiter = ratelimit.RateLimiter(ratelimit.UPSTOX_LIMITS, clock=clock)
+    granted = 0
+    while clock.now < 1000.0 + 60.0:
+        wait = limiter.try_acquire()
+        if wait:
+            clock.advance(wait)
+        else:
+            granted += 1
+    assert granted == 500
+
+
+def test_wait_time_is_when_the_oldest_grant_leaves_the_window():
+    clock = FakeClock()
+    limiter = ratelimit.RateLimiter([(2, 10.0)], clock=clock)
+    assert limiter.try_acquire() == 0.0
+    clock.advance(3.0)
+    assert limiter.try_acquire() == 0.0
+    clock.advance(1.0)
+    assert limiter.try_acquire() == pytest.approx(6.0)
+    clock.advance(6.0)
+    assert limiter.try_acquire() == 0.0
+    assert limiter.budget() == 0.0
+
+
+def test_request_larger_than_a_window_is_rejected():
+    limiter = ratelimit.RateLimiter([(2, 1.0)], clock=FakeClock())
+    with pytest.raises(ValueError):
+        limiter.try_acquire(3)
+
+
+def test_acquire_waits_on_the_injected_clock():
+    clock = FakeClock()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.advance(seconds)
+
+    limiter = ratelimit.RateLimiter([(2, 1.0)], clock=clock, sleep=sleep)
+    start = clock.now
+    times = []
+    for _ in range(6):
+        assert limiter.acquire()
+        times.append(clock.now - start)
+    assert times == pytest.approx([0.0, 0.0, 1.0, 1.0, 2.0, 2.0])
+    assert sleeps == pytest.approx([1.0, 1.0])
+
+    # The timeout is measured on the same clock: never sleeps past the deadline
+    sleeps.clear()
+    assert not limiter.acquire(timeout=0.25)
+    assert sum(sleeps) == pytest.approx(0.25)
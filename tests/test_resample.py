@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from main import decode
+from main import resample
+
+
+def _minute_candles(days=("2025-10-01", "2025-10-03")):
+    """One-minute candles for full 09:15-15:30 sessions, with a deterministic price path."""
+    frames = []
+    for day in days:
+        index = pd.date_range(f"{day} 09:15", f"{day} 15:29", freq="1min", tz=decode.IST_OFFSET)
+        frames.append(pd.DataFrame({"close": 100 + np.sin(np.arange(len(index)) / 17.0) * 5}, index=index))
+    df = pd.concat(frames)
+    df["open"] = df["close"].shift(1).fillna(df["close"].iloc[0])
+    df["high"] = df[["open", "close"]].max(axis=1) + 0.1
+    df["low"] = df[["open", "close"]].min(axis=1) - 0.1
+    df["volume"] = np.arange(len(df)) % 97 + 1
+    df["oi"] = 0
+    df.index.name = "timestamp"
+    return df[decode.CANDLE_COLUMNS[1:]]
+
+
+def test_hourly_bars_are_anchored_at_the_open_and_the_last_is_short():
+    df = _minute_candles()
+    hourly = resample.resample_candles(df, "hours", 1)
+
+    first_day = hourly[hourly.index.date == hourly.index[0].date()]
+    assert [t.strftime("%H:%M") for t in first_day.index] == [
+        "09:15", "10:15", "11:15", "12:15", "13:15", "14:15", "15:15"
+    ]
+    last = df.loc["2025-10-01 15:15":"2025-10-01 15:29"]
+    bar = first_day.iloc[-1]
+    assert bar["open"] == last["open"].iloc[0]
+    assert bar["high"] == last["high"].max()
+    assert bar["low"] == last["low"].min()
+    assert bar["close"] == last["close"].iloc[-1]
+    assert bar["volume"] == last["volume"].sum()
+
+
+def test_matches_a_pandas_resample_reference():
+    df = _minute_candles()
+    out = resample.resample_candles(df, "minutes", 15)
+    expected = df.resample("15min", origin="start_day", offset="15min").agg(resample.AGGREGATION).dropna()
+    pd.testing.assert_frame_equal(out, expected, check_freq=False, check_dtype=False)
+
+
+def test_daily_bars_skip_days_without_data():
+    df = _minute_candles()
+    daily = resample.resample_candles(df, "days", 1)
+    assert [t.strftime("%Y-%m-%d %H:%M") for t in daily.index] == ["2025-10-01 00:00", "2025-10-03 00:00"]
+    two_day = resample.resample_candles(df, "days", 2)
+    assert len(two_day) == 1
+    assert two_day["volume"].iloc[0] == df["volume"].sum()
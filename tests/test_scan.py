@@ -0,0 +1,56 @@
+import pytest
+
+import main.parallel
+import main.screener
+
+
+@pytest.mark.parametrize("workers", [2, 6])
+def test_threaded_scan_returns_the_sequential_result(fake_upstox, workers):
+    sequential = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, with_exchange=True)
+    threaded = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, workers=workers, with_exchange=True)
+    assert threaded == sequential
+
+    # Same answer as checking each symbol on its own, in instrument order
+    pairs = list(main.screener.extract_equity_symbols("NSE").itertuples(index=False, name=None))
+    assert sequential == [pair for pair in pairs if main.screener.is_clustered(
+        main.screener.check_ema_clusters(pair[0], pair[1], *_scan_range(10), ema_accuracy=0.05)
+    )]
+
+
+def test_threaded_scan_reports_failures_like_the_sequential_scan(fake_upstox, monkeypatch):
+    real = main.fetch.get_all_candles
+
+    def flaky(symbol, **kwargs):
+        if symbol in ("BENCH2", "BENCH5"):
+            raise RuntimeError("boom")
+        return real(symbol, **kwargs)
+
+    monkeypatch.setattr(main.fetch, "get_all_candles", flaky)
+    sequential = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05)
+    threaded = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, workers=4)
+    assert threaded == sequential
+    assert "BENCH2" not in sequential and "BENCH5" not in sequential
+
+
+def _scan_range(days):
+    from datetime import datetime, timedelta
+    to_date = datetime.now()
+    return to_date - timedelta(days=days), to_date
+
+
+def test_checkpointed_process_scan_reuses_one_pool(fake_upstox, monkeypatch, tmp_path):
+    sequential = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05)
+
+    pools = []
+    real_pool = main.parallel.process_pool
+
+    def counting_pool(processes=None):
+        pools.append(processes)
+        return real_pool(processes)
+
+    monkeypatch.setattr(main.parallel, "process_pool", counting_pool)
+    monkeypatch.setattr(main.screener, "CHECKPOINT_BATCH", 5)
+    pooled = main.screener.get_clustered_stocks(days=10, ema_accuracy=0.05, workers=4, processes=2,
+                                                checkpoint=str(tmp_path / "scan.jsonl"))
+    assert pooled == sequential
+    assert pools == [2]   # 12 symbols in 3 batches, one pool
@@ -0,0 +1,41 @@
+import logging
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from main import sessions
+
+
+@pytest.fixture
+def calendar(monkeypatch, tmp_path):
+    """Point the calendar at a temporary holidays file and rebuild it afterwards."""
+    monkeypatch.setattr(sessions, "HOLIDAYS_FILE", tmp_path / "holidays.json")
+    yield sessions
+    monkeypatch.undo()
+    sessions.reload_holidays()
+
+
+def test_known_holidays_are_not_trading_days(calendar):
+    calendar.reload_holidays()
+    assert not calendar.is_trading_day(date(2025, 10, 2))
+    assert not calendar.is_trading_day(date(2026, 1, 26))
+    assert calendar.next_trading_day(date(2026, 4, 2)) == date(2026, 4, 6)   # Good Friday + weekend
+
+
+def test_current_year_without_a_calendar_warns_once_and_closes_weekends_only(calendar, monkeypatch, caplog):
+    this_year = datetime.now(sessions.IST).year
+    monkeypatch.setattr(sessions, "NSE_HOLIDAYS", frozenset(d for d in sessions.NSE_HOLIDAYS if d.year != this_year))
+    monkeypatch.setattr(sessions, "_warned_years", set())
+    calendar.reload_holidays()
+
+    with caplog.at_level(logging.WARNING, logger="yfin"):
+        days = [date(this_year, 3, 2) + timedelta(days=i) for i in range(14)]
+        assert [calendar.is_trading_day(day) for day in days] == [day.weekday() < 5 for day in days]
+        calendar.is_trading_day(date(this_year - 8, 3, 4))    # history: not reported
+        calendar.is_trading_day(date(this_year + 1, 3, 4))    # look-ahead: not reported
+    warnings = [r for r in caplog.records if r.getMessage() == "holiday_calendar_missing"]
+    assert len(warnings) == 1 and warnings[0].fields["year"] == this_year
+
+    (calendar.HOLIDAYS_FILE).write_text(f'["{this_year}-03-04"]')
+    calendar.reload_holidays()
+    assert not calendar.is_trading_day(date(this_year, 3, 4))
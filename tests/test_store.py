@@ -0,0 +1,61 @@
+from datetime import date
+
+import pandas as pd
+
+import main.fetch
+from main.store import CandleStore
+
+TODAY = date(2025, 10, 6)
+
+
+def test_second_fetch_only_requests_the_gap(fake_upstox, monkeypatch, tmp_path):
+    store = CandleStore(tmp_path / "candles.sqlite")
+    requested = []
+    real = main.fetch.get_historical_candle_chunked
+
+    def recording(symbol, **kwargs):
+        requested.append((kwargs["from_date"], kwargs["to_date"]))
+        return real(symbol, **kwargs)
+
+    monkeypatch.setattr(main.fetch, "get_historical_candle_chunked", recording)
+    first = main.fetch.get_stored_historical_candle("BENCH1", from_date="2025-09-01", to_date="2025-09-19",
+                                                    store=store)
+    assert requested == [(date(2025, 9, 1), date(2025, 9, 19))]
+
+    requested.clear()
+    wider = main.fetch.get_stored_historical_candle("BENCH1", from_date="2025-08-25", to_date="2025-09-30",
+                                                    store=store)
+    assert requested == [(date(2025, 8, 25), date(2025, 8, 31)), (date(2025, 9, 20), date(2025, 9, 30))]
+
+    requested.clear()
+    again = main.fetch.get_stored_historical_candle("BENCH1", from_date="2025-08-25", to_date="2025-09-30",
+                                                    store=store)
+    assert requested == []
+    pd.testing.assert_frame_equal(again, wider)
+    pd.testing.assert_frame_equal(wider.loc["2025-09-01":"2025-09-19"], first)
+
+
+def test_reopened_store_returns_the_api_frame(fake_upstox, tmp_path):
+    path = tmp_path / "candles.sqlite"
+    fetched = main.fetch.get_stored_historical_candle("BENCH2", from_date="2025-09-01", to_date="2025-09-12",
+                                                      store=CandleStore(path))
+    key = main.fetch.get_instrument_key("BENCH2", "NSE")
+    stored = CandleStore(path).read(key, "hours", 1, date(2025, 9, 1), date(2025, 9, 12))
+
+    api = main.fetch.get_historical_candle("BENCH2", from_date="2025-09-01", to_date="2025-09-12")
+    assert stored["volume"].dtype == api["volume"].dtype == "int64"
+    pd.testing.assert_frame_equal(stored, api, check_index_type=False)
+    pd.testing.assert_frame_equal(fetched, api, check_index_type=False)
+
+
+def test_empty_trading_days_are_not_marked_closed(tmp_path):
+    store = CandleStore(tmp_path / "candles.sqlite")
+    # Thu 2025-10-02 is a holiday, Fri 10-03 has data, the weekend is closed,
+    # and Wed 10-01 came back empty (not published yet)
+    store.mark_closed("K", "hours", 1, date(2025, 10, 1), date(2025, 10, 6), TODAY, with_data=[date(2025, 10, 3)])
+    assert store.covered_sessions("K", "hours", 1, date(2025, 9, 1), TODAY) == {
+        date(2025, 10, 2), date(2025, 10, 3), date(2025, 10, 4), date(2025, 10, 5)
+    }
+    assert store.missing_ranges("K", "hours", 1, date(2025, 10, 1), date(2025, 10, 6), TODAY) == [
+        (date(2025, 10, 1), date(2025, 10, 1)), (date(2025, 10, 6), date(2025, 10, 6))
+    ]
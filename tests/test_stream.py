@@ -0,0 +1,113 @@
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from main import decode
+from main import stream
+
+KEYS = ("NSE_EQ|AAA", "NSE_EQ|BBB")
+
+
+def _epoch(hour, minute, second=0, day=(2026, 10, 16)):
+    return datetime(*day, hour, minute, second, tzinfo=decode.IST_OFFSET).timestamp()
+
+
+def _recorded_ticks():
+    """Two instruments ticking every 20 s from 09:05 (pre-open) to 10:40, in time order."""
+    ticks = []
+    for i, ts in enumerate(range(int(_epoch(9, 5)), int(_epoch(10, 40)), 20)):
+        for k, key in enumerate(KEYS):
+            ticks.append({"instrument_key": key, "ts": ts, "ltp": 100 + k * 50 + (i * 7 % 13) / 4, "ltq": 10 + i % 5})
+    return ticks
+
+
+def _expected_bars(ticks, key, minutes):
+    """pandas reference: in-session ticks of `key` aggregated into bars anchored at 09:15."""
+    df = pd.DataFrame([t for t in ticks if t["instrument_key"] == key])
+    df.index = pd.to_datetime(df["ts"], unit="s", utc=True).dt.tz_convert(decode.IST_OFFSET)
+    df = df[df.index >= df.index[0].normalize() + pd.Timedelta(hours=9, minutes=15)]
+    bars = df.resample(f"{minutes}min", origin="start_day", offset="15min").agg(
+        {"ltp": ["first", "max", "min", "last"], "ltq": "sum"}
+    )
+    bars.columns = ["open", "high", "low", "close", "volume"]
+    return bars.dropna()
+
+
+def test_replayed_ticks_aggregate_into_session_anchored_bars():
+    ticks = _recorded_ticks()
+    server = stream.ReplayServer(ticks)
+    host, port = server.start()
+    closed = []
+    aggregator = stream.CandleAggregator("minutes", 15, on_bar_close=lambda key, bar: closed.append((key, bar["start"])))
+    try:
+        count = stream.run_feed(stream.socket_feed(host, port, timeout=10), aggregator, clock=None)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert count == len(ticks)
+    for key in KEYS:
+        frame = aggregator.frame(key)
+        expected = _expected_bars(ticks, key, 15)
+        assert list(frame.index) == list(expected.index)
+        assert frame.index[0].strftime("%H:%M") == "09:15"   # 09:05 pre-open ticks were dropped
+        for column in ("open", "high", "low", "close", "volume"):
+            assert frame[column].to_numpy() == pytest.approx(expected[column].to_numpy())
+    # Every bar but the last (still forming at the end of the feed) was closed exactly once
+    for key in KEYS:
+        starts = [start for k, start in closed if k == key]
+        assert starts == sorted(set(starts))
+        assert len(starts) == len(aggregator.frame(key)) - 1
+
+
+def test_last_hourly_bar_closes_at_the_session_close():
+    aggregator = stream.CandleAggregator("hours", 1)
+    aggregator.add_tick(KEYS[0], _epoch(15, 20), 10.0, 1)
+    start = aggregator.bar_start(_epoch(15, 20))
+    assert start == _epoch(15, 15)
+    assert aggregator.bar_end(start) == _epoch(15, 30)
+    assert aggregator.flush(now=_epoch(15, 29, 59)) == []
+    assert [key for key, _ in aggregator.flush(now=_epoch(15, 30))] == [KEYS[0]]
+
+
+def test_ticks_outside_the_session_are_dropped():
+    aggregator = stream.CandleAggregator("minutes", 5)
+    for ts in (_epoch(9, 0), _epoch(9, 14, 59), _epoch(15, 30), _epoch(16, 0)):
+        assert aggregator.add_tick(KEYS[0], ts, 10.0, 1) is None
+    assert aggregator.frame(KEYS[0]).empty
+    aggregator.add_tick(KEYS[0], _epoch(9, 15), 10.0, 1)
+    assert len(aggregator.frame(KEYS[0])) == 1
+
+
+def test_late_tick_after_a_flush_does_not_reopen_the_bar():
+    aggregator = stream.CandleAggregator("minutes", 1)
+    aggregator.add_tick(KEYS[0], _epoch(10, 0, 10), 10.0, 1)
+    aggregator.flush(now=_epoch(10, 1))
+    aggregator.add_tick(KEYS[0], _epoch(10, 0, 50), 99.0, 1)
+    frame = aggregator.frame(KEYS[0])
+    assert len(frame) == 1
+    assert frame["close"].iloc[0] == 10.0
+
+
+def test_quiet_feed_still_closes_bars_on_the_timer():
+    now = [_epoch(10, 0, 30)]
+    closed = threading.Event()
+    release = threading.Event()
+    aggregator = stream.CandleAggregator("minutes", 1, on_bar_close=lambda key, bar: closed.set())
+
+    def feed():
+        yield {"instrument_key": KEYS[0], "ts": _epoch(10, 0, 30), "ltp": 10.0, "ltq": 1}
+        release.wait(10)   # the feed goes quiet: no tick arrives to close the bar
+
+    worker = threading.Thread(target=stream.run_feed, args=(feed(), aggregator),
+                              kwargs={"flush_interval": 0.01, "clock": lambda: now[0]})
+    worker.start()
+    try:
+        assert not closed.wait(0.1)
+        now[0] = _epoch(10, 1)
+        assert closed.wait(5)
+    finally:
+        release.set()
+        worker.join(5)
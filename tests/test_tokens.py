@@ -0,0 +1,87 @@
+import pytest
+
+from main import tokens
+
+LIMITS = [(3, 60.0)]   # per token: 3 requests a minute
+
+
+def test_peek_takes_no_rate_limit_slot():
+    pool = tokens.TokenPool([("a", "A"), ("b", "B")], limits=LIMITS)
+    for _ in range(10):
+        assert pool.peek().name in ("a", "b")
+    assert [t["requests"] for t in pool.stats()] == [0, 0]
+    assert all(t.budget() == 1.0 for t in pool._tokens.values())
+
+    with pytest.raises(tokens.NoHealthyTokenError):
+        tokens.TokenPool([], limits=LIMITS).peek()
+
+
+def test_requests_rotate_across_tokens_within_their_limits():
+    pool = tokens.TokenPool([("a", "A"), ("b", "B")], limits=LIMITS)
+    names = []
+    for _ in range(6):
+        token = pool.acquire(timeout=0)
+        names.append(token.name)
+        pool.release(token, 200)
+    assert sorted(names) == ["a", "a", "a", "b", "b", "b"]
+    assert names[:2] in (["a", "b"], ["b", "a"])      # spread, not one token drained first
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)                  # both tokens at their own limit
+
+    # Requests in flight steer new ones to the other token
+    pool = tokens.TokenPool([("a", "A"), ("b", "B")], limits=LIMITS)
+    first = pool.acquire()
+    assert pool.acquire().name != first.name
+
+
+def test_401_ejects_the_token_until_it_is_refreshed(tmp_path):
+    path = tmp_path / "tokens.json"
+    tokens.save_token("a", "A", path)
+    tokens.save_token("b", "B", path)
+    pool = tokens.TokenPool(path=path, limits=LIMITS, reload_interval=0.0)
+
+    token = pool.acquire()
+    pool.release(token, 401)
+    others = [pool.acquire() for _ in range(3)]
+    assert {t.name for t in others} == {"a", "b"} - {token.name}
+
+    for t in others:
+        pool.release(t, 401)
+    with pytest.raises(tokens.NoHealthyTokenError):
+        pool.acquire()
+
+    tokens.save_token(token.name, "refreshed", path)
+    assert pool.acquire().name == token.name
+
+
+def test_429_cools_the_token_down(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tokens.time, "monotonic", lambda: now[0])
+    pool = tokens.TokenPool([("a", "A"), ("b", "B")], limits=[(100, 60.0)])
+
+    token = pool.acquire()
+    pool.release(token, 429, retry_after=30)
+    other = "b" if token.name == "a" else "a"
+    for _ in range(5):
+        t = pool.acquire()
+        assert t.name == other
+        pool.release(t, 200)
+    assert {s["name"]: s["healthy"] for s in pool.stats()} == {token.name: False, other: True}
+
+    now[0] += 30
+    assert token.name in {pool.acquire().name, pool.acquire().name}
+
+
+def test_fetches_spread_over_tokens_against_the_fake_server(fake_upstox, monkeypatch):
+    import main.fetch
+
+    fake_upstox.tokens = {"A", "B"}               # "X" is answered with 401
+    pool = tokens.TokenPool([("a", "A"), ("b", "B"), ("x", "X")])
+    monkeypatch.setattr(tokens, "_pool", pool)
+
+    for i in range(8):
+        assert not main.fetch.get_historical_candle(f"BENCH{i}", from_date="2025-09-01", to_date="2025-09-05").empty
+    # The expired token is tried once (it has the most budget left), benched, and the request retried
+    assert fake_upstox.unauthorized == 1
+    assert fake_upstox.requests_by_token == {"A": 4, "B": 4}
+    assert {s["name"]: s["healthy"] for s in pool.stats()} == {"a": True, "b": True, "x": False}